@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Fachada asíncrona sobre Database.
+
+Las consultas se ejecutan en un pool de hilos y el resultado vuelve al hilo
+principal de Kivy mediante Clock.schedule_once, de modo que la interfaz nunca
+espera a SQLite. Database mantiene una conexión por hilo, así que cada worker
+usa la suya.
+
+    request = app.async_db.submit(
+        'get_stories_page', cursor=None, limit=20,
+        callback=self.on_stories, tag='feed'
+    )
+    ...
+    app.async_db.cancel_tag('feed')   # p. ej. al salir de la pantalla
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+def clock_dispatch(fn):
+    """Ejecuta fn en el siguiente frame del hilo principal de Kivy."""
+    from kivy.clock import Clock
+    Clock.schedule_once(lambda dt: fn(), 0)
+
+
+class DbRequest:
+    """Consulta en curso. Se puede cancelar o esperar con await."""
+
+    def __init__(self, future, tag=None):
+        self.future = future
+        self.tag = tag
+        self._cancelled = False
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def cancel(self):
+        """Descarta el resultado; si la consulta aún no empezó, no se ejecuta."""
+        self._cancelled = True
+        self.future.cancel()
+
+    def done(self):
+        return self.future.done()
+
+    def result(self, timeout=None):
+        """Bloquea hasta tener el resultado. Solo para hilos que no son la UI."""
+        return self.future.result(timeout)
+
+    def __await__(self):
+        return asyncio.wrap_future(self.future).__await__()
+
+
+class AsyncDatabase:
+    """Ejecuta métodos de Database en hilos de trabajo.
+
+    dispatch recibe una función sin argumentos y debe ejecutarla en el hilo de
+    la interfaz; por defecto usa Clock.schedule_once. Las pruebas pueden pasar
+    un dispatch síncrono.
+    """
+
+    def __init__(self, db, max_workers=2, dispatch=None):
+        self.db = db
+        self.dispatch = dispatch or clock_dispatch
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='db')
+        self._lock = threading.Lock()
+        self._pending = set()
+
+    def submit(self, method, *args, callback=None, on_error=None, tag=None, **kwargs):
+        """Llama a db.<method>(*args, **kwargs) en un worker.
+
+        callback(resultado) u on_error(excepción) se llaman en el hilo de la
+        interfaz, salvo que la petición se haya cancelado antes.
+        """
+        fn = getattr(self.db, method)
+        return self.run(fn, *args, callback=callback, on_error=on_error, tag=tag, **kwargs)
+
+    def run(self, fn, *args, callback=None, on_error=None, tag=None, **kwargs):
+        """Como submit, pero con cualquier función (p. ej. varias consultas seguidas)."""
+        future = self._executor.submit(fn, *args, **kwargs)
+        request = DbRequest(future, tag)
+        with self._lock:
+            self._pending.add(request)
+        future.add_done_callback(lambda f: self._finished(request, callback, on_error))
+        return request
+
+    def when_done(self, future, callback, on_error=None):
+        """Entrega en el hilo de la interfaz el resultado de un Future ajeno
+        (p. ej. de WriteQueue)."""
+        def done(f):
+            error = f.exception()
+            if error is not None:
+                if on_error:
+                    self.dispatch(lambda: on_error(error))
+                else:
+                    print(f"Error en escritura asíncrona: {error}")
+            else:
+                self.dispatch(lambda: callback(f.result()))
+        future.add_done_callback(done)
+
+    def _finished(self, request, callback, on_error):
+        if request.cancelled or request.future.cancelled():
+            self._forget(request)
+            return
+
+        error = request.future.exception()
+        if error is not None:
+            handler, value = on_error, error
+            if not on_error:
+                print(f"Error en consulta asíncrona: {error}")
+        else:
+            handler, value = callback, request.future.result()
+
+        if handler is None:
+            self._forget(request)
+            return
+        # La petición sigue pendiente hasta entregarse, así cancel_tag también
+        # descarta resultados que ya terminaron pero esperan el siguiente frame
+        self.dispatch(lambda: self._deliver(request, handler, value))
+
+    def _deliver(self, request, handler, value):
+        self._forget(request)
+        if not request.cancelled:
+            handler(value)
+
+    def _forget(self, request):
+        with self._lock:
+            self._pending.discard(request)
+
+    def cancel_tag(self, tag):
+        """Cancela todas las peticiones pendientes con esa etiqueta."""
+        with self._lock:
+            requests = [r for r in self._pending if r.tag == tag]
+        for request in requests:
+            request.cancel()
+        return len(requests)
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def shutdown(self, wait=True):
+        """Detiene los workers y cierra sus conexiones."""
+        self._executor.shutdown(wait=wait)
+        self.db.close()
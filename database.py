@@ -8,150 +8,299 @@ except Exception:
     bcrypt = None
     HAS_BCRYPT = False
 from datetime import datetime
+import base64
 import os
+import re
+import threading
+
+import migrations
+from query_stats import InstrumentedCursor, QueryStats
+
+
+class ManagedConnection(sqlite3.Connection):
+    """Conexión que recuerda si fue cerrada para que el gestor pueda reabrirla.
+
+    Si el gestor tiene la instrumentación activa, los cursores se envuelven
+    en InstrumentedCursor para medir cada sentencia.
+    """
+    closed = False
+    manager = None
+
+    def close(self):
+        self.closed = True
+        super().close()
+
+    def cursor(self, *args, **kwargs):
+        cursor = super().cursor(*args, **kwargs)
+        stats = self.manager.stats if self.manager is not None else None
+        if stats is not None:
+            return InstrumentedCursor(cursor, stats)
+        return cursor
+
+    # Connection.execute no pasa por cursor(); se redirige para medirlo también
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, script):
+        return self.cursor().executescript(script)
+
+
+# Perfiles de almacenamiento: PRAGMAs que se aplican a cada conexión.
+# cache_size negativo está en KiB; mmap_size en bytes; busy_timeout en ms.
+STORAGE_PROFILES = {
+    # Por defecto. WAL permite leer mientras se escribe; synchronous=NORMAL
+    # en WAL no pierde datos si la app se cierra, solo ante un corte de luz.
+    'mobile-safe': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -4096,
+        'mmap_size': 0,
+        'temp_store': 'DEFAULT',
+        'busy_timeout': 5000,
+        'query_only': False,
+    },
+    # Equipos con memoria de sobra: caché y mmap grandes, temporales en RAM
+    'throughput': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -65536,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 10000,
+        'query_only': False,
+    },
+    # Invitados: solo lectura; cualquier escritura falla
+    'read-only-guest': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -2048,
+        'mmap_size': 64 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 2000,
+        'query_only': True,
+    },
+    # Valores por defecto de SQLite; sirve de referencia en las mediciones
+    'legacy': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'cache_size': -2000,
+        'mmap_size': 0,
+        'temp_store': 'DEFAULT',
+        'busy_timeout': 5000,
+        'query_only': False,
+    },
+}
+
+DEFAULT_STORAGE_PROFILE = 'mobile-safe'
+
+
+def resolve_storage_profile(profile):
+    """Acepta el nombre de un perfil o un dict que sobrescribe al perfil por defecto."""
+    if profile is None:
+        profile = DEFAULT_STORAGE_PROFILE
+    if isinstance(profile, dict):
+        return {**STORAGE_PROFILES[DEFAULT_STORAGE_PROFILE], **profile}
+    if profile not in STORAGE_PROFILES:
+        raise ValueError(f'Perfil de almacenamiento desconocido: {profile!r}')
+    return dict(STORAGE_PROFILES[profile])
+
+
+class ConnectionManager:
+    """Mantiene una conexión reutilizable por hilo hacia un archivo SQLite.
+
+    Cada hilo obtiene siempre la misma conexión, configurada una sola vez
+    (row_factory y PRAGMAs del perfil de almacenamiento). Las conexiones
+    viven hasta llamar a close().
+    """
+
+    def __init__(self, db_name, profile=None):
+        self.db_name = db_name
+        self.profile = resolve_storage_profile(profile)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self.stats = None  # QueryStats cuando la instrumentación está activa
+
+    def _connect(self):
+        # check_same_thread=False solo para poder cerrar todas las conexiones
+        # desde close(); cada conexión se usa únicamente desde su propio hilo.
+        conn = sqlite3.connect(self.db_name, factory=ManagedConnection, check_same_thread=False)
+        conn.manager = self
+        conn.row_factory = sqlite3.Row
+        self.configure(conn)
+        return conn
+
+    def configure(self, conn):
+        """Configuración que se aplica una única vez al abrir cada conexión."""
+        profile = self.profile
+        pragmas = [
+            'PRAGMA foreign_keys = ON',
+            f"PRAGMA busy_timeout = {int(profile['busy_timeout'])}",
+            # journal_mode se guarda en el archivo; en bases en memoria o de
+            # solo lectura SQLite lo ignora o falla, y se sigue con el resto
+            f"PRAGMA journal_mode = {profile['journal_mode']}",
+            f"PRAGMA synchronous = {profile['synchronous']}",
+            f"PRAGMA cache_size = {int(profile['cache_size'])}",
+            f"PRAGMA mmap_size = {int(profile['mmap_size'])}",
+            f"PRAGMA temp_store = {profile['temp_store']}",
+            f"PRAGMA query_only = {'ON' if profile['query_only'] else 'OFF'}",
+        ]
+        for pragma in pragmas:
+            try:
+                conn.execute(pragma).fetchall()
+            except sqlite3.Error as e:
+                print(f"Error al aplicar {pragma}: {e}")
+
+    def get(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or conn.closed:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._lock:
+                self._connections = [c for c in self._connections if not c.closed]
+                self._connections.append(conn)
+        return conn
+
+    def release(self):
+        """Cierra la conexión del hilo actual, si tiene una.
+
+        Para hilos de corta vida (p. ej. ImportJob): sin esto su conexión
+        seguiría abierta en _connections hasta close().
+        """
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is None:
+            return
+        with self._lock:
+            self._connections = [c for c in self._connections if c is not conn and not c.closed]
+        if not conn.closed:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def close(self):
+        """Cierra las conexiones de todos los hilos."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            if not conn.closed:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+        self._local = threading.local()
+
+
+# Marcadores que search_stories pone alrededor de cada coincidencia en 'snippet'.
+# Son caracteres de control para que la interfaz decida cómo resaltarlos.
+SNIPPET_START = '\x02'
+SNIPPET_END = '\x03'
+
+
+# Columnas que dibuja una tarjeta (StoryCard). Las listas (feed, búsqueda,
+# perfil) traen solo esto; el contenido completo se pide con get_story_by_id.
+CARD_COLUMNS = '''
+    h.id, h.user_id, h.preview, h.location, h.category, h.is_anonymous,
+    h.created_at, u.username,
+    COALESCE(s.likes, 0) as likes,
+    COALESCE(s.miedo, 0) as miedo,
+    COALESCE(s.sorpresa, 0) as sorpresa,
+    COALESCE(s.incredulidad, 0) as incredulidad,
+    COALESCE(s.comentarios, 0) as comentarios
+'''
+
+# Like y reacción del usuario que mira la lista (dos parámetros: su id dos
+# veces; con None ambas columnas quedan vacías)
+VIEWER_COLUMNS = '''
+    EXISTS(SELECT 1 FROM likes l WHERE l.story_id = h.id AND l.user_id = ?) as liked,
+    (SELECT r.tipo FROM reacciones r WHERE r.story_id = h.id AND r.user_id = ? ORDER BY r.id LIMIT 1) as reaction
+'''
+
+# Imágenes de la historia: '|' entre imágenes y IMAGE_FIELD_SEP entre la
+# ruta original y sus miniaturas (grid, carousel, full); _format_story lo separa
+IMAGE_FIELD_SEP = '\x1f'
+IMAGES_COLUMN = '''(SELECT GROUP_CONCAT(
+        si.path || char(31) || IFNULL(si.grid_path, '') || char(31) ||
+        IFNULL(si.carousel_path, '') || char(31) || IFNULL(si.full_path, ''), '|')
+    FROM story_images si WHERE si.story_id = h.id ORDER BY si.sort_order, si.id) as images'''
+
+
+def encode_cursor(created_at, row_id):
+    """Codifica la posición (created_at, id) como un cursor opaco para paginar."""
+    raw = f'{created_at}|{row_id}'.encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Decodifica un cursor de encode_cursor. Lanza ValueError si es inválido."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        created_at, row_id = raw.rsplit('|', 1)
+        return created_at, int(row_id)
+    except Exception:
+        raise ValueError(f'Cursor inválido: {cursor!r}')
+
 
 class Database:
-    def __init__(self, db_name='paranormal_stories.db'):
+    def __init__(self, db_name='paranormal_stories.db', profile=None):
+        """profile: nombre de STORAGE_PROFILES o dict de PRAGMAs (por defecto 'mobile-safe')."""
         self.db_name = db_name
+        self.connections = ConnectionManager(db_name, profile)
+        self._fts_available = None
         self.init_database()
 
-    def get_connection(self):
-        conn = sqlite3.connect(self.db_name)
-        conn.row_factory = sqlite3.Row
-        # Activar claves foráneas para cada conexión
-        try:
-            conn.execute('PRAGMA foreign_keys = ON')
-        except Exception:
-            pass
-        return conn
+    def __enter__(self):
+        return self
 
-    def init_database(self):
-        conn = self.get_connection()
-        cursor = conn.cursor()
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
 
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS usuarios (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+    def enable_instrumentation(self, slow_ms=100, slow_log=None):
+        """Activa la medición de cada sentencia y devuelve el QueryStats.
 
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS historias (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                content TEXT NOT NULL,
-                location TEXT,
-                category TEXT DEFAULT 'Aparición',
-                is_anonymous INTEGER DEFAULT 0,
-                photo_path TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES usuarios(id)
-            )
-        ''')
+        Las sentencias que tarden slow_ms o más se guardan con su plan de
+        ejecución en stats.slow_queries y, si se indica, en el archivo slow_log.
+        """
+        self.connections.stats = QueryStats(slow_ms=slow_ms, slow_log=slow_log, source_file=__file__)
+        return self.connections.stats
 
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS reacciones (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                story_id INTEGER NOT NULL,
-                user_id INTEGER NOT NULL,
-                tipo TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(story_id, user_id, tipo),
-                FOREIGN KEY (story_id) REFERENCES historias(id),
-                FOREIGN KEY (user_id) REFERENCES usuarios(id)
-            )
-        ''')
+    def disable_instrumentation(self):
+        self.connections.stats = None
 
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS likes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                story_id INTEGER NOT NULL,
-                user_id INTEGER NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(story_id, user_id),
-                FOREIGN KEY (story_id) REFERENCES historias(id),
-                FOREIGN KEY (user_id) REFERENCES usuarios(id)
-            )
-        ''')
+    def query_report(self, limit=20):
+        """Resumen de las sentencias más costosas (vacío si no hay instrumentación)."""
+        stats = self.connections.stats
+        return stats.format_report(limit) if stats is not None else ''
 
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS comentarios (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                story_id INTEGER NOT NULL,
-                user_id INTEGER NOT NULL,
-                content TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (story_id) REFERENCES historias(id),
-                FOREIGN KEY (user_id) REFERENCES usuarios(id)
-            )
-        ''')
+    def get_connection(self):
+        """Devuelve la conexión persistente del hilo actual."""
+        return self.connections.get()
 
-        # Tabla para múltiples imágenes por historia
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS story_images (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                story_id INTEGER NOT NULL,
-                path TEXT NOT NULL,
-                sort_order INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (story_id) REFERENCES historias(id)
-            )
-        ''')
+    def release_connection(self):
+        """Cierra la conexión del hilo actual (ver ConnectionManager.release)."""
+        self.connections.release()
 
-        # Tabla para reportes de contenido
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS reportes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                story_id INTEGER NOT NULL,
-                reporter_id INTEGER NOT NULL,
-                motivo TEXT NOT NULL,
-                descripcion TEXT,
-                estado TEXT DEFAULT 'pendiente',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (story_id) REFERENCES historias(id),
-                FOREIGN KEY (reporter_id) REFERENCES usuarios(id)
-            )
-        ''')
+    def close(self):
+        """Cierra todas las conexiones abiertas por esta instancia."""
+        self.connections.close()
 
-        # Tabla para notificaciones
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS notificaciones (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                tipo TEXT NOT NULL,
-                titulo TEXT NOT NULL,
-                mensaje TEXT NOT NULL,
-                story_id INTEGER,
-                actor_id INTEGER,
-                leida INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES usuarios(id),
-                FOREIGN KEY (story_id) REFERENCES historias(id),
-                FOREIGN KEY (actor_id) REFERENCES usuarios(id)
-            )
-        ''')
-
-        conn.commit()
-        # Crear índices útiles para rendimiento
-        self.ensure_indices(cursor)
-        conn.close()
-
-    def ensure_indices(self, cursor):
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_historias_created_at ON historias(created_at)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_historias_category ON historias(category)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_historias_location ON historias(location)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_historias_user_id ON historias(user_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_likes_story_id ON likes(story_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_reacciones_story_id ON reacciones(story_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_story_images_story_id ON story_images(story_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_reportes_story_id ON reportes(story_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_reportes_estado ON reportes(estado)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_notificaciones_user_id ON notificaciones(user_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_notificaciones_leida ON notificaciones(leida)')
+    def init_database(self):
+        """Aplica las migraciones pendientes; si el esquema está al día solo lee user_version."""
+        conn = self.get_connection()
+        if not self.connections.profile['query_only']:
+            migrations.migrate(conn)
+            return
+        # Perfil de solo lectura: se permite escribir únicamente para migrar
+        conn.execute('PRAGMA query_only = OFF')
+        try:
+            migrations.migrate(conn)
+        finally:
+            conn.execute('PRAGMA query_only = ON')
 
     def hash_password_sha256(self, password):
         return hashlib.sha256(password.encode()).hexdigest()
@@ -177,17 +326,16 @@ class Database:
     def create_user(self, username, email, password):
         try:
             conn = self.get_connection()
-            cursor = conn.cursor()
-            # Si hay bcrypt disponible, usarlo; de lo contrario, SHA-256
-            password_hash = self.hash_password_bcrypt(password) if HAS_BCRYPT else self.hash_password_sha256(password)
+            with conn:
+                cursor = conn.cursor()
+                # Si hay bcrypt disponible, usarlo; de lo contrario, SHA-256
+                password_hash = self.hash_password_bcrypt(password) if HAS_BCRYPT else self.hash_password_sha256(password)
 
-            cursor.execute(
-                'INSERT INTO usuarios (username, email, password_hash) VALUES (?, ?, ?)',
-                (username, email, password_hash)
-            )
+                cursor.execute(
+                    'INSERT INTO usuarios (username, email, password_hash) VALUES (?, ?, ?)',
+                    (username, email, password_hash)
+                )
 
-            conn.commit()
-            conn.close()
             return True
         except sqlite3.IntegrityError:
             return False
@@ -199,7 +347,6 @@ class Database:
         cursor.execute('SELECT * FROM usuarios WHERE username = ?', (username,))
         row = cursor.fetchone()
         if not row:
-            conn.close()
             return None
 
         user = dict(row)
@@ -212,200 +359,465 @@ class Database:
                 try:
                     if not (stored_hash.startswith('$2a$') or stored_hash.startswith('$2b$') or stored_hash.startswith('$2y$')):
                         new_hash = self.hash_password_bcrypt(password)
-                        cursor.execute('UPDATE usuarios SET password_hash = ? WHERE id = ?', (new_hash, user['id']))
-                        conn.commit()
+                        with conn:
+                            cursor.execute('UPDATE usuarios SET password_hash = ? WHERE id = ?', (new_hash, user['id']))
                 except Exception:
                     pass
-            conn.close()
             return user
 
-        conn.close()
         return None
 
     def create_story(self, user_id, content, location=None, category='Aparición', is_anonymous=False, photo_path=None):
         try:
             conn = self.get_connection()
-            cursor = conn.cursor()
-
-            cursor.execute(
-                '''INSERT INTO historias (user_id, content, location, category, is_anonymous, photo_path)
-                   VALUES (?, ?, ?, ?, ?, ?)''',
-                (user_id, content, location, category, 1 if is_anonymous else 0, photo_path)
-            )
+            with conn:
+                self._create_story(conn.cursor(), user_id, content, location, category, is_anonymous, photo_path)
 
-            conn.commit()
-            conn.close()
             return True
         except Exception as e:
             print(f"Error al crear historia: {e}")
             return False
 
+    def publish_story(self, user_id, content, location=None, category='Aparición', is_anonymous=False, image_paths=()):
+        """Crea la historia con sus imágenes en una transacción y devuelve su id (None si falla)."""
+        try:
+            conn = self.get_connection()
+            with conn:
+                cursor = conn.cursor()
+                story_id = self._create_story(cursor, user_id, content, location, category, is_anonymous)
+                self._add_story_images(cursor, story_id, image_paths)
+            return story_id
+        except Exception as e:
+            print(f"Error al publicar historia: {e}")
+            return None
+
+    def _create_story(self, cursor, user_id, content, location=None, category='Aparición', is_anonymous=False, photo_path=None):
+        cursor.execute(
+            '''INSERT INTO historias (user_id, content, location, category, is_anonymous, photo_path)
+               VALUES (?, ?, ?, ?, ?, ?)''',
+            (user_id, content, location, category, 1 if is_anonymous else 0, photo_path)
+        )
+        return cursor.lastrowid
+
     def get_all_stories(self, limit=20, offset=0):
         conn = self.get_connection()
         cursor = conn.cursor()
 
-        cursor.execute('''
-            SELECT h.*, u.username,
-                   (SELECT COUNT(*) FROM likes WHERE story_id = h.id) as likes,
-                   (SELECT COUNT(*) FROM reacciones WHERE story_id = h.id AND tipo = 'miedo') as miedo,
-                   (SELECT COUNT(*) FROM reacciones WHERE story_id = h.id AND tipo = 'sorpresa') as sorpresa,
-                   (SELECT COUNT(*) FROM reacciones WHERE story_id = h.id AND tipo = 'incredulidad') as incredulidad,
-                   (SELECT GROUP_CONCAT(si.path, '|') FROM story_images si WHERE si.story_id = h.id ORDER BY si.sort_order, si.id) as images
+        # Columnas de tarjeta: preview en vez del texto completo
+        cursor.execute(f'''
+            SELECT {CARD_COLUMNS},
+                   {IMAGES_COLUMN}
             FROM historias h
             LEFT JOIN usuarios u ON h.user_id = u.id
-            ORDER BY h.created_at DESC
+            LEFT JOIN story_stats s ON s.story_id = h.id
+            ORDER BY h.created_at DESC, h.id DESC
             LIMIT ? OFFSET ?
         ''', (limit, offset))
 
         stories = [dict(row) for row in cursor.fetchall()]
-        conn.close()
 
         for story in stories:
-            story['created_at'] = self.format_date(story['created_at'])
-            if story.get('images'):
-                story['images'] = [p for p in story['images'].split('|') if p]
-            else:
-                story['images'] = []
+            self._format_story(story)
 
         return stories
 
+    def get_stories_page(self, cursor=None, limit=20, viewer_id=None):
+        """Obtiene una página del feed a partir de un cursor opaco.
+
+        Devuelve (historias, next_cursor). next_cursor es None en la última
+        página. A diferencia de OFFSET, el costo no crece con la profundidad
+        y no se duplican ni saltan historias si se publican nuevas mientras
+        se pagina. Con viewer_id cada historia trae también 'liked' y
+        'reaction' de ese usuario.
+        """
+        where = ''
+        params = []
+        if cursor:
+            created_at, story_id = decode_cursor(cursor)
+            where = 'WHERE (h.created_at, h.id) < (?, ?)'
+            params = [created_at, story_id]
+
+        conn = self.get_connection()
+        db_cursor = conn.cursor()
+
+        # Se pide una fila extra para saber si existe una página siguiente
+        db_cursor.execute(f'''
+            SELECT {CARD_COLUMNS},
+                   {VIEWER_COLUMNS},
+                   {IMAGES_COLUMN}
+            FROM historias h
+            LEFT JOIN usuarios u ON h.user_id = u.id
+            LEFT JOIN story_stats s ON s.story_id = h.id
+            {where}
+            ORDER BY h.created_at DESC, h.id DESC
+            LIMIT ?
+        ''', [viewer_id, viewer_id] + params + [limit + 1])
+
+        stories = [dict(row) for row in db_cursor.fetchall()]
+
+        next_cursor = None
+        if len(stories) > limit:
+            stories = stories[:limit]
+            last = stories[-1]
+            next_cursor = encode_cursor(last['created_at'], last['id'])
+
+        for story in stories:
+            self._format_story(story)
+
+        return stories, next_cursor
+
+    def _format_story(self, story):
+        story['created_at'] = self.format_date(story['created_at'])
+        if 'liked' in story:
+            story['liked'] = bool(story['liked'])
+        # images: rutas originales; image_variants: además sus miniaturas
+        # (ver thumbnails.pick_source)
+        variants = []
+        for item in (story.get('images') or '').split('|'):
+            if not item:
+                continue
+            path, grid, carousel, full = (item.split(IMAGE_FIELD_SEP) + ['', '', ''])[:4]
+            variants.append({'path': path, 'grid': grid or None,
+                             'carousel': carousel or None, 'full': full or None})
+        story['images'] = [v['path'] for v in variants]
+        story['image_variants'] = variants
+        return story
+
     def add_story_images(self, story_id, image_paths):
         if not image_paths:
             return True
         try:
             conn = self.get_connection()
-            cursor = conn.cursor()
-            for idx, path in enumerate(image_paths[:4]):
-                cursor.execute(
-                    'INSERT INTO story_images (story_id, path, sort_order) VALUES (?, ?, ?)',
-                    (story_id, path, idx)
-                )
-            conn.commit()
-            conn.close()
+            with conn:
+                self._add_story_images(conn.cursor(), story_id, image_paths)
             return True
         except Exception as e:
             print(f"Error al guardar imágenes: {e}")
             return False
 
+    def _add_story_images(self, cursor, story_id, image_paths):
+        for idx, path in enumerate(list(image_paths)[:4]):
+            # Si la imagen viene del MediaStore queda enlazada a su
+            # fila en media (el trigger suma la referencia)
+            cursor.execute(
+                '''INSERT INTO story_images (story_id, path, sort_order, media_hash)
+                   VALUES (?, ?, ?, (SELECT hash FROM media WHERE path = ?))''',
+                (story_id, path, idx, path)
+            )
+
+    def get_pending_images(self, story_id=None):
+        """Imágenes a las que aún no se les generan miniaturas."""
+        where = 'WHERE width IS NULL'
+        params = ()
+        if story_id is not None:
+            where += ' AND story_id = ?'
+            params = (story_id,)
+        rows = self.get_connection().execute(
+            f'SELECT id, story_id, path FROM story_images {where} ORDER BY id', params
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def set_image_variants(self, image_id, width, height, variants):
+        """Guarda el tamaño original y las rutas de las miniaturas de una imagen."""
+        try:
+            conn = self.get_connection()
+            with conn:
+                conn.execute(
+                    '''UPDATE story_images
+                       SET width = ?, height = ?, grid_path = ?, carousel_path = ?, full_path = ?
+                       WHERE id = ?''',
+                    (width, height, variants.get('grid'), variants.get('carousel'),
+                     variants.get('full'), image_id)
+                )
+            return True
+        except Exception as e:
+            print(f"Error al guardar miniaturas: {e}")
+            return False
+
+    def register_media(self, digest, path, size):
+        """Registra un archivo del MediaStore; si el hash ya existe no hace nada."""
+        try:
+            conn = self.get_connection()
+            with conn:
+                conn.execute(
+                    'INSERT OR IGNORE INTO media (hash, path, size) VALUES (?, ?, ?)',
+                    (digest, path, size)
+                )
+            return True
+        except Exception as e:
+            print(f"Error al registrar imagen: {e}")
+            return False
+
+    def get_media(self, digest):
+        row = self.get_connection().execute(
+            'SELECT hash, path, size, refcount FROM media WHERE hash = ?', (digest,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def collect_orphan_media(self, older_than_hours=24):
+        """Elimina de media los archivos sin referencias y devuelve sus rutas."""
+        try:
+            conn = self.get_connection()
+            with conn:
+                rows = conn.execute(
+                    '''SELECT hash, path FROM media
+                       WHERE refcount <= 0 AND created_at <= datetime('now', ?)''',
+                    (f'-{int(older_than_hours)} hours',)
+                ).fetchall()
+                conn.executemany('DELETE FROM media WHERE hash = ? AND refcount <= 0',
+                                 [(row['hash'],) for row in rows])
+            return [row['path'] for row in rows]
+        except Exception as e:
+            print(f"Error al limpiar imágenes: {e}")
+            return []
+
     def get_user_stories(self, user_id):
         conn = self.get_connection()
         cursor = conn.cursor()
 
-        cursor.execute('''
-            SELECT h.*, u.username,
-                   (SELECT COUNT(*) FROM likes WHERE story_id = h.id) as likes,
-                   (SELECT COUNT(*) FROM reacciones WHERE story_id = h.id AND tipo = 'miedo') as miedo,
-                   (SELECT COUNT(*) FROM reacciones WHERE story_id = h.id AND tipo = 'sorpresa') as sorpresa,
-                   (SELECT COUNT(*) FROM reacciones WHERE story_id = h.id AND tipo = 'incredulidad') as incredulidad
+        cursor.execute(f'''
+            SELECT {CARD_COLUMNS}
             FROM historias h
             LEFT JOIN usuarios u ON h.user_id = u.id
+            LEFT JOIN story_stats s ON s.story_id = h.id
             WHERE h.user_id = ?
-            ORDER BY h.created_at DESC
+            ORDER BY h.created_at DESC, h.id DESC
         ''', (user_id,))
 
         stories = [dict(row) for row in cursor.fetchall()]
-        conn.close()
 
         for story in stories:
             story['created_at'] = self.format_date(story['created_at'])
 
         return stories
 
-    def search_stories(self, query):
+    def get_user_stories_page(self, user_id, cursor=None, limit=20):
+        """Historias de un autor por páginas, igual que get_stories_page."""
+        where = ''
+        params = [user_id]
+        if cursor:
+            created_at, story_id = decode_cursor(cursor)
+            where = 'AND (h.created_at, h.id) < (?, ?)'
+            params += [created_at, story_id]
+
+        conn = self.get_connection()
+        db_cursor = conn.cursor()
+
+        db_cursor.execute(f'''
+            SELECT {CARD_COLUMNS}
+            FROM historias h
+            LEFT JOIN usuarios u ON h.user_id = u.id
+            LEFT JOIN story_stats s ON s.story_id = h.id
+            WHERE h.user_id = ? {where}
+            ORDER BY h.created_at DESC, h.id DESC
+            LIMIT ?
+        ''', params + [limit + 1])
+
+        stories = [dict(row) for row in db_cursor.fetchall()]
+
+        next_cursor = None
+        if len(stories) > limit:
+            stories = stories[:limit]
+            last = stories[-1]
+            next_cursor = encode_cursor(last['created_at'], last['id'])
+
+        for story in stories:
+            story['created_at'] = self.format_date(story['created_at'])
+
+        return stories, next_cursor
+
+    def get_profile_stats(self, user_id):
+        """Totales del perfil en una sola consulta sobre story_stats.
+
+        Devuelve historias publicadas y likes, reacciones y comentarios
+        recibidos en todas ellas.
+        """
         conn = self.get_connection()
         cursor = conn.cursor()
 
         cursor.execute('''
-            SELECT h.*, u.username,
-                   (SELECT COUNT(*) FROM likes WHERE story_id = h.id) as likes,
-                   (SELECT COUNT(*) FROM reacciones WHERE story_id = h.id AND tipo = 'miedo') as miedo,
-                   (SELECT COUNT(*) FROM reacciones WHERE story_id = h.id AND tipo = 'sorpresa') as sorpresa,
-                   (SELECT COUNT(*) FROM reacciones WHERE story_id = h.id AND tipo = 'incredulidad') as incredulidad
+            SELECT COUNT(*) as historias,
+                   COALESCE(SUM(s.likes), 0) as likes,
+                   COALESCE(SUM(s.miedo + s.sorpresa + s.incredulidad), 0) as reacciones,
+                   COALESCE(SUM(s.comentarios), 0) as comentarios
+            FROM historias h
+            LEFT JOIN story_stats s ON s.story_id = h.id
+            WHERE h.user_id = ?
+        ''', (user_id,))
+
+        return dict(cursor.fetchone())
+
+    def search_stories(self, query, limit=20, offset=0):
+        """Busca historias por contenido, ubicación o categoría.
+
+        Usa el índice FTS5 (historias_fts): ignora mayúsculas y acentos,
+        acepta prefijos ("fantas" encuentra "fantasmas") y ordena por
+        relevancia BM25. Cada resultado incluye 'snippet', un fragmento del
+        contenido con las coincidencias entre SNIPPET_START y SNIPPET_END.
+        """
+        if not self._has_fts():
+            return self._search_stories_like(query, limit, offset)
+
+        terms = re.findall(r'\w+', query or '')
+        if not terms:
+            return []
+        # Cada término se cita (evita interpretar la sintaxis de FTS5) y se
+        # busca como prefijo; los términos se combinan con AND implícito.
+        match = ' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(f'''
+            SELECT {CARD_COLUMNS},
+                   snippet(historias_fts, 0, ?, ?, '...', 24) as snippet
+            FROM historias_fts
+            JOIN historias h ON h.id = historias_fts.rowid
+            LEFT JOIN usuarios u ON h.user_id = u.id
+            LEFT JOIN story_stats s ON s.story_id = h.id
+            WHERE historias_fts MATCH ?
+            ORDER BY bm25(historias_fts, 1.0, 2.0, 2.0), h.id DESC
+            LIMIT ? OFFSET ?
+        ''', (SNIPPET_START, SNIPPET_END, match, limit, offset))
+
+        stories = [dict(row) for row in cursor.fetchall()]
+
+        for story in stories:
+            story['created_at'] = self.format_date(story['created_at'])
+
+        return stories
+
+    def _search_stories_like(self, query, limit, offset):
+        # Respaldo para SQLite compilado sin FTS5
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(f'''
+            SELECT {CARD_COLUMNS}
             FROM historias h
             LEFT JOIN usuarios u ON h.user_id = u.id
+            LEFT JOIN story_stats s ON s.story_id = h.id
             WHERE h.content LIKE ? OR h.location LIKE ? OR h.category LIKE ?
-            ORDER BY h.created_at DESC
-        ''', (f'%{query}%', f'%{query}%', f'%{query}%'))
+            ORDER BY h.created_at DESC, h.id DESC
+            LIMIT ? OFFSET ?
+        ''', (f'%{query}%', f'%{query}%', f'%{query}%', limit, offset))
 
         stories = [dict(row) for row in cursor.fetchall()]
-        conn.close()
 
         for story in stories:
             story['created_at'] = self.format_date(story['created_at'])
 
         return stories
 
+    def _has_fts(self):
+        if self._fts_available is None:
+            row = self.get_connection().execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'historias_fts'"
+            ).fetchone()
+            self._fts_available = row is not None
+        return self._fts_available
+
+    def get_story_counters(self, story_id):
+        """Contadores actuales de una historia (likes, reacciones y comentarios)."""
+        conn = self.get_connection()
+        return self._story_counters(conn.cursor(), [story_id])[story_id]
+
+    def _story_counters(self, cursor, story_ids):
+        # Un único SELECT por clave primaria sobre story_stats
+        story_ids = list(dict.fromkeys(story_ids))
+        counters = {
+            story_id: dict(likes=0, miedo=0, sorpresa=0, incredulidad=0, comentarios=0)
+            for story_id in story_ids
+        }
+        placeholders = ', '.join('?' * len(story_ids))
+        cursor.execute(f'''
+            SELECT story_id, likes, miedo, sorpresa, incredulidad, comentarios
+            FROM story_stats
+            WHERE story_id IN ({placeholders})
+        ''', story_ids)
+        for row in cursor.fetchall():
+            counters[row[0]] = dict(
+                likes=row[1], miedo=row[2], sorpresa=row[3],
+                incredulidad=row[4], comentarios=row[5]
+            )
+        return counters
+
     def add_like(self, story_id, user_id):
         try:
             conn = self.get_connection()
-            cursor = conn.cursor()
+            with conn:
+                return self._add_like(conn.cursor(), story_id, user_id)
+        except sqlite3.IntegrityError:
+            return False
 
-            # Verificar si ya existe el like
-            cursor.execute(
-                'SELECT id FROM likes WHERE story_id = ? AND user_id = ?',
-                (story_id, user_id)
-            )
+    def _add_like(self, cursor, story_id, user_id):
+        # Verificar si ya existe el like
+        cursor.execute(
+            'SELECT id FROM likes WHERE story_id = ? AND user_id = ?',
+            (story_id, user_id)
+        )
 
-            if cursor.fetchone():
-                conn.close()
-                return False  # Ya existe el like
+        if cursor.fetchone():
+            return False  # Ya existe el like
 
-            # Agregar el like
-            cursor.execute(
-                'INSERT INTO likes (story_id, user_id) VALUES (?, ?)',
-                (story_id, user_id)
-            )
+        # Agregar el like
+        cursor.execute(
+            'INSERT INTO likes (story_id, user_id) VALUES (?, ?)',
+            (story_id, user_id)
+        )
+
+        # Obtener información de la historia para la notificación
+        cursor.execute(
+            'SELECT user_id, content FROM historias WHERE id = ?',
+            (story_id,)
+        )
+        story_info = cursor.fetchone()
 
-            # Obtener información de la historia para la notificación
+        if story_info and story_info[0] != user_id:  # No notificar al propio autor
+            # Crear notificación de like
             cursor.execute(
-                'SELECT user_id, content FROM historias WHERE id = ?',
-                (story_id,)
+                'INSERT INTO notificaciones (user_id, tipo, titulo, mensaje, story_id, actor_id) VALUES (?, ?, ?, ?, ?, ?)',
+                (story_info[0], 'like', 'Nuevo like', f'Alguien le dio like a tu historia', story_id, user_id)
             )
-            story_info = cursor.fetchone()
 
-            if story_info and story_info[0] != user_id:  # No notificar al propio autor
-                # Crear notificación de like
-                cursor.execute(
-                    'INSERT INTO notificaciones (user_id, tipo, titulo, mensaje, story_id, actor_id) VALUES (?, ?, ?, ?, ?, ?)',
-                    (story_info[0], 'like', 'Nuevo like', f'Alguien le dio like a tu historia', story_id, user_id)
-                )
-
-            conn.commit()
-            conn.close()
-            return True
-        except sqlite3.IntegrityError:
-            return False
+        return True
 
     def add_comment(self, story_id, user_id, content):
         try:
             conn = self.get_connection()
-            cursor = conn.cursor()
+            with conn:
+                self._add_comment(conn.cursor(), story_id, user_id, content)
+            return True
+        except Exception as e:
+            print(f"Error al agregar comentario: {e}")
+            return False
 
-            cursor.execute(
-                'INSERT INTO comentarios (story_id, user_id, content) VALUES (?, ?, ?)',
-                (story_id, user_id, content)
-            )
+    def _add_comment(self, cursor, story_id, user_id, content):
+        """Inserta el comentario y devuelve {'id', 'created_at'} de la fila nueva."""
+        cursor.execute(
+            'INSERT INTO comentarios (story_id, user_id, content) VALUES (?, ?, ?)',
+            (story_id, user_id, content)
+        )
+        comment_id = cursor.lastrowid
+        created_at = cursor.execute(
+            'SELECT created_at FROM comentarios WHERE id = ?', (comment_id,)
+        ).fetchone()[0]
+
+        # Obtener información de la historia para la notificación
+        cursor.execute(
+            'SELECT user_id, content FROM historias WHERE id = ?',
+            (story_id,)
+        )
+        story_info = cursor.fetchone()
 
-            # Obtener información de la historia para la notificación
+        if story_info and story_info[0] != user_id:  # No notificar al propio autor
+            # Crear notificación de comentario
             cursor.execute(
-                'SELECT user_id, content FROM historias WHERE id = ?',
-                (story_id,)
+                'INSERT INTO notificaciones (user_id, tipo, titulo, mensaje, story_id, actor_id) VALUES (?, ?, ?, ?, ?, ?)',
+                (story_info[0], 'comment', 'Nuevo comentario', f'Alguien comentó en tu historia', story_id, user_id)
             )
-            story_info = cursor.fetchone()
-
-            if story_info and story_info[0] != user_id:  # No notificar al propio autor
-                # Crear notificación de comentario
-                cursor.execute(
-                    'INSERT INTO notificaciones (user_id, tipo, titulo, mensaje, story_id, actor_id) VALUES (?, ?, ?, ?, ?, ?)',
-                    (story_info[0], 'comment', 'Nuevo comentario', f'Alguien comentó en tu historia', story_id, user_id)
-                )
 
-            conn.commit()
-            conn.close()
-            return True
-        except Exception as e:
-            print(f"Error al agregar comentario: {e}")
-            return False
+        return {'id': comment_id, 'created_at': created_at}
 
     def get_comments(self, story_id):
         conn = self.get_connection()
@@ -420,13 +832,49 @@ class Database:
         ''', (story_id,))
 
         comments = [dict(row) for row in cursor.fetchall()]
-        conn.close()
 
         for comment in comments:
             comment['created_at'] = self.format_date(comment['created_at'])
 
         return comments
 
+    def get_comments_page(self, story_id, cursor=None, limit=20):
+        """Comentarios de una historia, del más nuevo al más antiguo.
+
+        Devuelve (comentarios, next_cursor), igual que get_stories_page.
+        """
+        where = ''
+        params = [story_id]
+        if cursor:
+            created_at, comment_id = decode_cursor(cursor)
+            where = 'AND (c.created_at, c.id) < (?, ?)'
+            params += [created_at, comment_id]
+
+        conn = self.get_connection()
+        db_cursor = conn.cursor()
+
+        db_cursor.execute(f'''
+            SELECT c.id, c.story_id, c.user_id, c.content, c.created_at, u.username
+            FROM comentarios c
+            LEFT JOIN usuarios u ON c.user_id = u.id
+            WHERE c.story_id = ? {where}
+            ORDER BY c.created_at DESC, c.id DESC
+            LIMIT ?
+        ''', params + [limit + 1])
+
+        comments = [dict(row) for row in db_cursor.fetchall()]
+
+        next_cursor = None
+        if len(comments) > limit:
+            comments = comments[:limit]
+            last = comments[-1]
+            next_cursor = encode_cursor(last['created_at'], last['id'])
+
+        for comment in comments:
+            comment['created_at'] = self.format_date(comment['created_at'])
+
+        return comments, next_cursor
+
     def format_date(self, date_string):
         try:
             date_obj = datetime.strptime(date_string, '%Y-%m-%d %H:%M:%S')
@@ -437,68 +885,65 @@ class Database:
     def add_reaction(self, story_id, user_id, tipo):
         try:
             conn = self.get_connection()
-            cursor = conn.cursor()
+            with conn:
+                return self._add_reaction(conn.cursor(), story_id, user_id, tipo)
+        except sqlite3.IntegrityError:
+            return False
 
-            # Verificar si ya existe la reacción
-            cursor.execute(
-                'SELECT id FROM reacciones WHERE story_id = ? AND user_id = ?',
-                (story_id, user_id)
-            )
+    def _add_reaction(self, cursor, story_id, user_id, tipo):
+        # Verificar si ya existe la reacción
+        cursor.execute(
+            'SELECT id FROM reacciones WHERE story_id = ? AND user_id = ?',
+            (story_id, user_id)
+        )
 
-            if cursor.fetchone():
-                conn.close()
-                return False  # Ya existe la reacción
+        if cursor.fetchone():
+            return False  # Ya existe la reacción
 
-            cursor.execute(
-                'INSERT INTO reacciones (story_id, user_id, tipo) VALUES (?, ?, ?)',
-                (story_id, user_id, tipo)
-            )
+        cursor.execute(
+            'INSERT INTO reacciones (story_id, user_id, tipo) VALUES (?, ?, ?)',
+            (story_id, user_id, tipo)
+        )
 
-            # Obtener información de la historia para la notificación
+        # Obtener información de la historia para la notificación
+        cursor.execute(
+            'SELECT user_id, content FROM historias WHERE id = ?',
+            (story_id,)
+        )
+        story_info = cursor.fetchone()
+
+        if story_info and story_info[0] != user_id:  # No notificar al propio autor
+            # Crear notificación de reacción
+            emoji_map = {'miedo': '😱', 'sorpresa': '😮', 'incredulidad': '🙄'}
+            emoji = emoji_map.get(tipo, '😮')
             cursor.execute(
-                'SELECT user_id, content FROM historias WHERE id = ?',
-                (story_id,)
+                'INSERT INTO notificaciones (user_id, tipo, titulo, mensaje, story_id, actor_id) VALUES (?, ?, ?, ?, ?, ?)',
+                (story_info[0], 'reaction', 'Nueva reacción', f'Alguien reaccionó {emoji} a tu historia', story_id, user_id)
             )
-            story_info = cursor.fetchone()
 
-            if story_info and story_info[0] != user_id:  # No notificar al propio autor
-                # Crear notificación de reacción
-                emoji_map = {'miedo': '😱', 'sorpresa': '😮', 'incredulidad': '🙄'}
-                emoji = emoji_map.get(tipo, '😮')
-                cursor.execute(
-                    'INSERT INTO notificaciones (user_id, tipo, titulo, mensaje, story_id, actor_id) VALUES (?, ?, ?, ?, ?, ?)',
-                    (story_info[0], 'reaction', 'Nueva reacción', f'Alguien reaccionó {emoji} a tu historia', story_id, user_id)
-                )
-
-            conn.commit()
-            conn.close()
-            return True
-        except sqlite3.IntegrityError:
-            return False
+        return True
 
     def update_story(self, story_id, user_id, content, location=None, category='Aparición', is_anonymous=False):
         """Actualiza una historia existente. Solo el autor puede editarla."""
         try:
             conn = self.get_connection()
-            cursor = conn.cursor()
+            with conn:
+                cursor = conn.cursor()
 
-            # Verificar que el usuario es el autor de la historia
-            cursor.execute('SELECT user_id FROM historias WHERE id = ?', (story_id,))
-            result = cursor.fetchone()
+                # Verificar que el usuario es el autor de la historia
+                cursor.execute('SELECT user_id FROM historias WHERE id = ?', (story_id,))
+                result = cursor.fetchone()
             
-            if not result or result['user_id'] != user_id:
-                conn.close()
-                return False  # No es el autor
+                if not result or result['user_id'] != user_id:
+                    return False  # No es el autor
 
-            cursor.execute(
-                '''UPDATE historias 
-                   SET content = ?, location = ?, category = ?, is_anonymous = ?
-                   WHERE id = ? AND user_id = ?''',
-                (content, location, category, 1 if is_anonymous else 0, story_id, user_id)
-            )
+                cursor.execute(
+                    '''UPDATE historias 
+                       SET content = ?, location = ?, category = ?, is_anonymous = ?
+                       WHERE id = ? AND user_id = ?''',
+                    (content, location, category, 1 if is_anonymous else 0, story_id, user_id)
+                )
 
-            conn.commit()
-            conn.close()
             return True
         except Exception as e:
             print(f"Error al actualizar historia: {e}")
@@ -508,28 +953,26 @@ class Database:
         """Elimina una historia. Solo el autor puede eliminarla."""
         try:
             conn = self.get_connection()
-            cursor = conn.cursor()
+            with conn:
+                cursor = conn.cursor()
 
-            # Verificar que el usuario es el autor de la historia
-            cursor.execute('SELECT user_id FROM historias WHERE id = ?', (story_id,))
-            result = cursor.fetchone()
+                # Verificar que el usuario es el autor de la historia
+                cursor.execute('SELECT user_id FROM historias WHERE id = ?', (story_id,))
+                result = cursor.fetchone()
             
-            if not result or result['user_id'] != user_id:
-                conn.close()
-                return False  # No es el autor
-
-            # Eliminar en cascada: primero likes, reacciones, comentarios, imágenes y reportes
-            cursor.execute('DELETE FROM likes WHERE story_id = ?', (story_id,))
-            cursor.execute('DELETE FROM reacciones WHERE story_id = ?', (story_id,))
-            cursor.execute('DELETE FROM comentarios WHERE story_id = ?', (story_id,))
-            cursor.execute('DELETE FROM story_images WHERE story_id = ?', (story_id,))
-            cursor.execute('DELETE FROM reportes WHERE story_id = ?', (story_id,))
+                if not result or result['user_id'] != user_id:
+                    return False  # No es el autor
+
+                # Eliminar en cascada: primero likes, reacciones, comentarios, imágenes y reportes
+                cursor.execute('DELETE FROM likes WHERE story_id = ?', (story_id,))
+                cursor.execute('DELETE FROM reacciones WHERE story_id = ?', (story_id,))
+                cursor.execute('DELETE FROM comentarios WHERE story_id = ?', (story_id,))
+                cursor.execute('DELETE FROM story_images WHERE story_id = ?', (story_id,))
+                cursor.execute('DELETE FROM reportes WHERE story_id = ?', (story_id,))
             
-            # Finalmente eliminar la historia
-            cursor.execute('DELETE FROM historias WHERE id = ? AND user_id = ?', (story_id, user_id))
+                # Finalmente eliminar la historia
+                cursor.execute('DELETE FROM historias WHERE id = ? AND user_id = ?', (story_id, user_id))
 
-            conn.commit()
-            conn.close()
             return True
         except Exception as e:
             print(f"Error al eliminar historia: {e}")
@@ -539,24 +982,22 @@ class Database:
         """Crea un reporte para una historia."""
         try:
             conn = self.get_connection()
-            cursor = conn.cursor()
+            with conn:
+                cursor = conn.cursor()
 
-            # Verificar que no haya un reporte duplicado del mismo usuario para la misma historia
-            cursor.execute(
-                'SELECT id FROM reportes WHERE story_id = ? AND reporter_id = ?',
-                (story_id, reporter_id)
-            )
-            if cursor.fetchone():
-                conn.close()
-                return False  # Ya existe un reporte de este usuario para esta historia
+                # Verificar que no haya un reporte duplicado del mismo usuario para la misma historia
+                cursor.execute(
+                    'SELECT id FROM reportes WHERE story_id = ? AND reporter_id = ?',
+                    (story_id, reporter_id)
+                )
+                if cursor.fetchone():
+                    return False  # Ya existe un reporte de este usuario para esta historia
 
-            cursor.execute(
-                'INSERT INTO reportes (story_id, reporter_id, motivo, descripcion) VALUES (?, ?, ?, ?)',
-                (story_id, reporter_id, motivo, descripcion)
-            )
+                cursor.execute(
+                    'INSERT INTO reportes (story_id, reporter_id, motivo, descripcion) VALUES (?, ?, ?, ?)',
+                    (story_id, reporter_id, motivo, descripcion)
+                )
 
-            conn.commit()
-            conn.close()
             return True
         except Exception as e:
             print(f"Error al crear reporte: {e}")
@@ -580,7 +1021,6 @@ class Database:
         ''', (estado,))
 
         reports = [dict(row) for row in cursor.fetchall()]
-        conn.close()
 
         for report in reports:
             report['created_at'] = self.format_date(report['created_at'])
@@ -591,15 +1031,14 @@ class Database:
         """Actualiza el estado de un reporte."""
         try:
             conn = self.get_connection()
-            cursor = conn.cursor()
+            with conn:
+                cursor = conn.cursor()
 
-            cursor.execute(
-                'UPDATE reportes SET estado = ? WHERE id = ?',
-                (new_status, report_id)
-            )
+                cursor.execute(
+                    'UPDATE reportes SET estado = ? WHERE id = ?',
+                    (new_status, report_id)
+                )
 
-            conn.commit()
-            conn.close()
             return True
         except Exception as e:
             print(f"Error al actualizar estado del reporte: {e}")
@@ -609,15 +1048,14 @@ class Database:
         """Crea una nueva notificación para un usuario."""
         try:
             conn = self.get_connection()
-            cursor = conn.cursor()
+            with conn:
+                cursor = conn.cursor()
 
-            cursor.execute(
-                'INSERT INTO notificaciones (user_id, tipo, titulo, mensaje, story_id, actor_id) VALUES (?, ?, ?, ?, ?, ?)',
-                (user_id, tipo, titulo, mensaje, story_id, actor_id)
-            )
+                cursor.execute(
+                    'INSERT INTO notificaciones (user_id, tipo, titulo, mensaje, story_id, actor_id) VALUES (?, ?, ?, ?, ?, ?)',
+                    (user_id, tipo, titulo, mensaje, story_id, actor_id)
+                )
 
-            conn.commit()
-            conn.close()
             return True
         except Exception as e:
             print(f"Error al crear notificación: {e}")
@@ -639,83 +1077,124 @@ class Database:
         ''', (user_id, limit, offset))
 
         notifications = [dict(row) for row in cursor.fetchall()]
-        conn.close()
 
         for notification in notifications:
             notification['created_at'] = self.format_date(notification['created_at'])
 
         return notifications
 
-    def get_unread_notifications_count(self, user_id):
-        """Obtiene el número de notificaciones no leídas de un usuario."""
+    def get_notifications_since(self, user_id, since_id=0, limit=50):
+        """Notificaciones con id mayor que since_id, de la más nueva a la más antigua.
+
+        Sirve para agregar solo lo nuevo a una lista ya mostrada. Si vuelven
+        limit filas puede haber más entre since_id y ellas.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            SELECT n.*, u.username as actor_username
+            FROM notificaciones n
+            LEFT JOIN usuarios u ON n.actor_id = u.id
+            WHERE n.user_id = ? AND n.id > ?
+            ORDER BY n.id DESC
+            LIMIT ?
+        ''', (user_id, since_id, limit))
+
+        notifications = [dict(row) for row in cursor.fetchall()]
+
+        for notification in notifications:
+            notification['created_at'] = self.format_date(notification['created_at'])
+
+        return notifications
+
+    def get_notification_status(self, user_id):
+        """No leídas y id de la última notificación, leídos de una sola fila."""
         conn = self.get_connection()
         cursor = conn.cursor()
 
         cursor.execute(
-            'SELECT COUNT(*) FROM notificaciones WHERE user_id = ? AND leida = 0',
+            'SELECT unread, last_id FROM notification_stats WHERE user_id = ?',
             (user_id,)
         )
 
-        count = cursor.fetchone()[0]
-        conn.close()
-        return count
+        row = cursor.fetchone()
+        if row is None:
+            return {'unread': 0, 'last_id': 0}
+        return {'unread': row['unread'], 'last_id': row['last_id']}
+
+    def get_unread_notifications_count(self, user_id):
+        """Obtiene el número de notificaciones no leídas de un usuario."""
+        return self.get_notification_status(user_id)['unread']
 
     def mark_notification_as_read(self, notification_id, user_id):
         """Marca una notificación como leída."""
         try:
             conn = self.get_connection()
-            cursor = conn.cursor()
+            with conn:
+                cursor = conn.cursor()
 
-            cursor.execute(
-                'UPDATE notificaciones SET leida = 1 WHERE id = ? AND user_id = ?',
-                (notification_id, user_id)
-            )
+                cursor.execute(
+                    'UPDATE notificaciones SET leida = 1 WHERE id = ? AND user_id = ?',
+                    (notification_id, user_id)
+                )
 
-            conn.commit()
-            conn.close()
             return True
         except Exception as e:
             print(f"Error al marcar notificación como leída: {e}")
             return False
 
-    def get_story_by_id(self, story_id):
-        """Obtiene una historia por su ID."""
+    def get_story_by_id(self, story_id, viewer_id=None):
+        """Obtiene una historia por su ID (con viewer_id, también su like y reacción)."""
         conn = self.get_connection()
         cursor = conn.cursor()
 
-        cursor.execute('''
+        cursor.execute(f'''
             SELECT h.*, u.username,
-                   (SELECT COUNT(*) FROM likes WHERE story_id = h.id) as likes,
-                   (SELECT COUNT(*) FROM reacciones WHERE story_id = h.id AND tipo = 'miedo') as miedo,
-                   (SELECT COUNT(*) FROM reacciones WHERE story_id = h.id AND tipo = 'sorpresa') as sorpresa,
-                   (SELECT COUNT(*) FROM reacciones WHERE story_id = h.id AND tipo = 'incredulidad') as incredulidad
+                   COALESCE(s.likes, 0) as likes,
+                   COALESCE(s.miedo, 0) as miedo,
+                   COALESCE(s.sorpresa, 0) as sorpresa,
+                   COALESCE(s.incredulidad, 0) as incredulidad,
+                   COALESCE(s.comentarios, 0) as comentarios,
+                   {VIEWER_COLUMNS}
             FROM historias h
             JOIN usuarios u ON h.user_id = u.id
+            LEFT JOIN story_stats s ON s.story_id = h.id
             WHERE h.id = ?
-        ''', (story_id,))
+        ''', (viewer_id, viewer_id, story_id))
 
         story = cursor.fetchone()
-        conn.close()
 
         if story:
             story_dict = dict(story)
             story_dict['created_at'] = self.format_date(story_dict['created_at'])
+            story_dict['liked'] = bool(story_dict['liked'])
             return story_dict
         return None
 
+    def rebuild_story_stats(self):
+        """Recalcula la tabla story_stats a partir de likes, reacciones y comentarios."""
+        try:
+            conn = self.get_connection()
+            with conn:
+                migrations.rebuild_story_stats(conn.cursor())
+            return True
+        except Exception as e:
+            print(f"Error al recalcular contadores: {e}")
+            return False
+
     def mark_all_notifications_as_read(self, user_id):
         """Marca todas las notificaciones de un usuario como leídas."""
         try:
             conn = self.get_connection()
-            cursor = conn.cursor()
+            with conn:
+                cursor = conn.cursor()
 
-            cursor.execute(
-                'UPDATE notificaciones SET leida = 1 WHERE user_id = ?',
-                (user_id,)
-            )
+                cursor.execute(
+                    'UPDATE notificaciones SET leida = 1 WHERE user_id = ?',
+                    (user_id,)
+                )
 
-            conn.commit()
-            conn.close()
             return True
         except Exception as e:
             print(f"Error al marcar todas las notificaciones como leídas: {e}")
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Ventana de páginas del feed para scroll infinito.
+
+Guarda a lo sumo max_pages páginas en memoria. Al cargar una página por el
+final se descarta la primera y viceversa; el cursor de cada página queda
+anotado, así que una página descartada se vuelve a pedir con el mismo
+cursor si el usuario regresa a ella.
+
+La consulta la hace fetch(cursor, limit, callback, on_error), que debe
+llamar a callback((historias, next_cursor)) u on_error(excepción) cuando
+termine (en la app, vía AsyncDatabase). Los cambios se informan a la vista con:
+
+    on_append(historias), on_prepend(historias),
+    on_drop_front(cantidad), on_drop_back(cantidad)
+"""
+
+
+class FeedPager:
+    def __init__(self, fetch, page_size=20, max_pages=5):
+        self.fetch = fetch
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.on_append = None
+        self.on_prepend = None
+        self.on_drop_front = None
+        self.on_drop_back = None
+        self.reset()
+
+    def reset(self):
+        # cursors[i] es el cursor con que se pide la página i (la 0 usa None)
+        self.cursors = [None]
+        self.sizes = {}  # página cargada -> cantidad de historias
+        self.first = 0
+        self.last = -1
+        self.exhausted = False
+        self.loading = None  # página que se está pidiendo
+        self.generation = getattr(self, 'generation', 0) + 1
+
+    @property
+    def has_previous(self):
+        return self.first > 0
+
+    @property
+    def has_next(self):
+        return not self.exhausted
+
+    def load_next(self):
+        """Pide la página siguiente. Devuelve False si no hay o ya hay una en curso."""
+        if self.loading is not None or self.exhausted:
+            return False
+        return self._load(self.last + 1)
+
+    def load_previous(self):
+        """Pide la página anterior a la ventana, si se había descartado."""
+        if self.loading is not None or self.first == 0:
+            return False
+        return self._load(self.first - 1)
+
+    def _load(self, page):
+        self.loading = page
+        generation = self.generation
+        self.fetch(self.cursors[page], self.page_size,
+                   lambda result: self._loaded(generation, page, result),
+                   lambda error: self._failed(generation, error))
+        return True
+
+    def _failed(self, generation, error):
+        if generation == self.generation:
+            # Se puede reintentar en el próximo scroll
+            self.loading = None
+        print(f"Error cargando página del feed: {error}")
+
+    def _loaded(self, generation, page, result):
+        if generation != self.generation:
+            # Respuesta de antes de un reset
+            return
+        self.loading = None
+        stories, next_cursor = result
+        self.sizes[page] = len(stories)
+
+        if page > self.last:
+            if page + 1 == len(self.cursors):
+                self.cursors.append(next_cursor)
+            self.last = page
+            self.exhausted = next_cursor is None
+            if self.last == 0:
+                self.first = 0
+            self._emit(self.on_append, stories)
+            while self.last - self.first + 1 > self.max_pages:
+                self._emit(self.on_drop_front, self.sizes.pop(self.first))
+                self.first += 1
+        else:
+            self.first = page
+            self._emit(self.on_prepend, stories)
+            while self.last - self.first + 1 > self.max_pages:
+                self._emit(self.on_drop_back, self.sizes.pop(self.last))
+                self.last -= 1
+                self.exhausted = False
+
+    def _emit(self, callback, value):
+        if callback:
+            callback(value)
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Estado optimista de likes y reacciones por historia.
+
+Al tocar "like" el contador y el estado del botón cambian en el mismo frame;
+la escritura va a la WriteQueue y, cuando se confirma, el estado se concilia
+con los contadores reales de la base. Si la escritura se rechaza (like
+duplicado, error de integridad) se deshace el cambio local.
+
+Las pantallas se suscriben al estado de una historia (o de todas):
+
+    unsubscribe = app.interactions.subscribe(self.on_story_state, story_id)
+    app.interactions.like(story_id, user_id)
+"""
+from write_queue import WriteResult
+
+COUNTER_KEYS = ('likes', 'miedo', 'sorpresa', 'incredulidad', 'comentarios')
+
+
+class StoryState:
+    """Lo que la interfaz muestra de una historia."""
+
+    def __init__(self, counters=None):
+        self.counters = {key: 0 for key in COUNTER_KEYS}
+        if counters:
+            self.counters.update({key: counters[key] for key in COUNTER_KEYS if key in counters})
+        self.liked = False
+        self.reaction = None
+        # Cambios optimistas aún sin confirmar: lista de (clave, delta)
+        self.pending = []
+        if counters:
+            self.load_viewer(counters)
+
+    def load_viewer(self, story):
+        """Like y reacción del usuario actual, si la consulta los trajo."""
+        if 'liked' in story:
+            self.liked = bool(story['liked'])
+        if 'reaction' in story:
+            self.reaction = story['reaction']
+
+    def as_dict(self):
+        values = dict(self.counters)
+        values['liked'] = self.liked
+        values['reaction'] = self.reaction
+        values['pending'] = bool(self.pending)
+        return values
+
+
+class InteractionStore:
+    """dispatch ejecuta una función en el hilo de la interfaz (ver async_db)."""
+
+    def __init__(self, write_queue, dispatch):
+        self.write_queue = write_queue
+        self.dispatch = dispatch
+        self._states = {}
+        self._subscribers = {}  # story_id (o None = todas) -> [callback]
+
+    def state(self, story_id):
+        state = self._states.get(story_id)
+        if state is None:
+            state = self._states[story_id] = StoryState()
+        return state
+
+    def seed(self, story):
+        """Registra los contadores, el like y la reacción que trajo una consulta.
+
+        Si la historia tiene cambios sin confirmar se conserva el estado
+        local, que es más reciente que la consulta.
+        """
+        state = self._states.get(story['id'])
+        if state is None:
+            self._states[story['id']] = StoryState(story)
+        elif not state.pending:
+            state.counters.update({key: story[key] for key in COUNTER_KEYS if key in story})
+            state.load_viewer(story)
+        return self._states[story['id']]
+
+    def subscribe(self, callback, story_id=None):
+        """callback(story_id, valores) ante cada cambio. Devuelve la función para desuscribirse."""
+        self._subscribers.setdefault(story_id, []).append(callback)
+
+        def unsubscribe():
+            callbacks = self._subscribers.get(story_id, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+        return unsubscribe
+
+    def _notify(self, story_id):
+        values = self.state(story_id).as_dict()
+        for callback in list(self._subscribers.get(story_id, [])) + list(self._subscribers.get(None, [])):
+            callback(story_id, values)
+
+    def like(self, story_id, user_id):
+        """Marca el like al instante. Devuelve False si ya estaba marcado."""
+        state = self.state(story_id)
+        if state.liked:
+            return False
+        previous = state.liked
+        state.liked = True
+        self._apply(story_id, 'likes', self.write_queue.add_like(story_id, user_id),
+                    lambda: setattr(state, 'liked', previous))
+        return True
+
+    def react(self, story_id, user_id, tipo):
+        """Marca la reacción al instante. Solo se permite una por historia."""
+        state = self.state(story_id)
+        if state.reaction is not None:
+            return False
+        previous = state.reaction
+        state.reaction = tipo
+        self._apply(story_id, tipo, self.write_queue.add_reaction(story_id, user_id, tipo),
+                    lambda: setattr(state, 'reaction', previous))
+        return True
+
+    def _apply(self, story_id, key, future, undo_flag):
+        state = self.state(story_id)
+        change = (key, 1)
+        state.pending.append(change)
+        state.counters[key] += 1
+        self._notify(story_id)
+
+        def done(f):
+            error = f.exception()
+            result = f.result() if error is None else WriteResult(False, None)
+            self.dispatch(lambda: self._settle(story_id, change, result, undo_flag))
+        future.add_done_callback(done)
+
+    def _settle(self, story_id, change, result, undo_flag):
+        state = self.state(story_id)
+        state.pending.remove(change)
+        if not result.ok:
+            undo_flag()
+        if result.counters is not None:
+            self.confirm(story_id, result.counters)
+            return
+        if not result.ok:
+            key, delta = change
+            state.counters[key] -= delta
+        self._notify(story_id)
+
+    def confirm(self, story_id, counters):
+        """Aplica contadores confirmados por la base (p. ej. tras un comentario)."""
+        state = self.state(story_id)
+        # Contadores reales más los cambios que aún esperan confirmación
+        state.counters.update({key: counters[key] for key in COUNTER_KEYS if key in counters})
+        for key, delta in state.pending:
+            state.counters[key] += delta
+        self._notify(story_id)
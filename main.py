@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 from kivy.app import App
-from kivy.uix.screenmanager import ScreenManager, Screen, NoTransition
+from kivy.uix.screenmanager import Screen, NoTransition
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.floatlayout import FloatLayout
 from kivy.uix.scrollview import ScrollView
@@ -8,19 +8,43 @@ from kivy.uix.gridlayout import GridLayout
 from kivy.uix.button import Button
 from kivy.uix.label import Label
 from kivy.uix.textinput import TextInput
-from kivy.uix.image import Image
 from kivy.uix.togglebutton import ToggleButton
 from kivy.uix.spinner import Spinner
 from kivy.uix.popup import Popup
+from kivy.uix.progressbar import ProgressBar
 from kivy.uix.widget import Widget
 from kivy.uix.filechooser import FileChooserIconView
 from kivy.core.window import Window
+from kivy.clock import Clock
 from kivy.graphics import Color, RoundedRectangle, Line, Rectangle
 from kivy.metrics import dp, sp
 from database import Database
+from async_db import AsyncDatabase, clock_dispatch
+from write_queue import WriteQueue, WriteResult
+from interactions import InteractionStore
+from feed_pager import FeedPager
+from media_store import MediaStore, ImportJob
+from thumbnails import ThumbnailWorker, image_variants, pick_source
 from widgets.navbar import NavBar
+from widgets.lazy_screen_manager import LazyScreenManager
 from widgets.story_card import StoryCard
+from widgets.story_feed import StoryFeed, CARD_HEIGHT
+from widgets.incremental_builder import IncrementalBuilder
+from widgets.comment_list import CommentList
+from widgets.cached_image import CachedImage
+from widgets.lazy_carousel import LazyCarousel
+from texture_cache import shared_cache
 import os
+from collections import deque
+from datetime import datetime
+
+# Cada cuánto se consulta el contador de notificaciones no leídas
+NOTIFICATION_CHECK_SECONDS = 15
+
+
+def record_build(report):
+    """Guarda cuántos frames tomó poblar una lista (ver IncrementalBuilder)"""
+    App.get_running_app().build_reports.append(report)
 
 Window.clearcolor = (0.08, 0.08, 0.12, 1)
 Window.size = (400, 700)
@@ -30,7 +54,6 @@ from kivy.core.text import Label as CoreLabel
 from kivy.core.text.markup import MarkupLabel
 from kivy.core.text import DEFAULT_FONT
 from kivy.core.text import LabelBase
-from kivy.uix.carousel import Carousel
 
 # Configurar fuente para mejor soporte de emojis
 def configure_font():
@@ -301,10 +324,17 @@ class LoginScreen(Screen):
             self.show_popup('Error', 'Por favor completa todos los campos')
             return
 
-        user = self.db.login_user(username, password)
+        # La verificación del hash es lenta: se hace fuera del hilo de la UI
+        App.get_running_app().async_db.submit(
+            'login_user', username, password,
+            callback=self.on_login_result, tag=self.name
+        )
+
+    def on_login_result(self, user):
         if user:
             app = App.get_running_app()
             app.current_user = user
+            app.check_notifications()
             self.manager.get_screen('feed').is_guest = False
             self.manager.current = 'feed'
             self.username_input.text = ''
@@ -312,6 +342,9 @@ class LoginScreen(Screen):
         else:
             self.show_popup('Error', 'Usuario o contraseña incorrectos')
 
+    def on_leave(self):
+        App.get_running_app().async_db.cancel_tag(self.name)
+
     def go_to_register(self, instance):
         self.manager.current = 'register'
 
@@ -478,7 +511,16 @@ class RegisterScreen(Screen):
             self.show_popup('Error', 'La contraseña debe tener al menos 6 caracteres')
             return
 
-        if self.db.create_user(username, email, password):
+        # El hash de la contraseña es lento: se crea fuera del hilo de la UI
+        App.get_running_app().async_db.submit(
+            'create_user', username, email, password,
+            callback=self.on_user_created,
+            on_error=lambda e: self.on_user_created(False),
+            tag=self.name
+        )
+
+    def on_user_created(self, ok):
+        if ok:
             self.show_popup('Éxito', 'Cuenta creada exitosamente')
             self.username_input.text = ''
             self.email_input.text = ''
@@ -488,6 +530,9 @@ class RegisterScreen(Screen):
         else:
             self.show_popup('Error', 'El usuario o correo ya existe')
 
+    def on_leave(self):
+        App.get_running_app().async_db.cancel_tag(self.name)
+
     def go_back(self, instance):
         self.manager.current = 'login'
 
@@ -513,8 +558,12 @@ class FeedScreen(Screen):
         super().__init__(**kwargs)
         self.db = Database()
         self.is_guest = False
-        self.page_size = 10
-        self.offset = 0
+        # Scroll infinito: a lo sumo 5 páginas de 20 historias en memoria
+        self.pager = FeedPager(self.fetch_page, page_size=20, max_pages=5)
+        self.pager.on_append = self.append_stories
+        self.pager.on_prepend = self.prepend_stories
+        self.pager.on_drop_front = lambda count: self.feed.drop_front(count)
+        self.pager.on_drop_back = lambda count: self.feed.drop_back(count)
 
         layout = BoxLayout(orientation='vertical')
 
@@ -544,21 +593,29 @@ class FeedScreen(Screen):
         title.bind(size=title.setter('text_size'))
         header.add_widget(title)
 
-        scroll = ScrollView()
-        self.stories_layout = BoxLayout(
-            orientation='vertical',
-            size_hint_y=None,
-            spacing=dp(12),
-            padding=[dp(12), dp(12)]
+        # Lista virtualizada: solo las tarjetas visibles son widgets
+        self.feed = StoryFeed()
+        self.feed.on_like = self.like_story
+        self.feed.on_reaction = self.add_reaction
+        self.feed.on_comment = self.open_story_detail
+        self.feed.on_open = self.open_story_detail
+        self.feed.on_near_end = self.pager.load_next
+        self.feed.on_near_start = self.pager.load_previous
+
+        self.empty_label = Label(
+            text='No hay historias aún.\n¡Sé el primero en compartir!',
+            font_size=sp(16),
+            color=(0.6, 0.6, 0.6, 1),
+            halign='center'
         )
-        self.stories_layout.bind(minimum_height=self.stories_layout.setter('height'))
 
-        scroll.add_widget(self.stories_layout)
+        self.body = BoxLayout(orientation='vertical')
+        self.body.add_widget(self.feed)
 
         navbar = NavBar()
 
         layout.add_widget(header)
-        layout.add_widget(scroll)
+        layout.add_widget(self.body)
         layout.add_widget(navbar)
 
         self.add_widget(layout)
@@ -568,71 +625,64 @@ class FeedScreen(Screen):
         self.header_bg.size = instance.size
 
     def on_enter(self):
+        self.unsubscribe = App.get_running_app().interactions.subscribe(self.on_story_state)
         self.reset_and_load()
 
+    def on_leave(self):
+        # Descartar páginas que lleguen cuando ya no se ve el feed
+        App.get_running_app().async_db.cancel_tag(self.name)
+        self.unsubscribe()
+
     def reset_and_load(self):
-        self.offset = 0
-        self.stories_layout.clear_widgets()
-        self.load_stories()
+        App.get_running_app().async_db.cancel_tag(self.name)
+        self.pager.reset()
+        self.feed.set_show_actions(not self.is_guest)
+        self.feed.set_stories([])
+        self.feed.scroll_y = 1
+        self.pager.load_next()
+
+    def fetch_page(self, cursor, limit, callback, on_error):
+        app = App.get_running_app()
+        # Con el like y la reacción de quien mira, para marcar los botones
+        user = getattr(app, 'current_user', None)
+        app.async_db.submit(
+            'get_stories_page', cursor=cursor, limit=limit,
+            viewer_id=user['id'] if user else None,
+            callback=callback, on_error=on_error, tag=self.name
+        )
 
-    def load_stories(self):
-        stories = self.db.get_all_stories(limit=self.page_size, offset=self.offset)
+    def seed_stories(self, stories):
+        interactions = App.get_running_app().interactions
+        for story in stories:
+            story.update(interactions.seed(story).as_dict())
 
-        if not stories:
-            no_stories = Label(
-                text='No hay historias aún.\n¡Sé el primero en compartir!',
-                font_size=sp(16),
-                color=(0.6, 0.6, 0.6, 1),
-                halign='center'
-            )
-            self.stories_layout.add_widget(no_stories)
-        else:
-            for story in stories:
-                card = StoryCard(
-                    story,
-                    on_like=self.like_story if not self.is_guest else None,
-                    on_reaction=self.add_reaction if not self.is_guest else None,
-                    on_comment=self.open_story_detail if not self.is_guest else None,
-                    show_actions=not self.is_guest
-                )
-                # Al tocar header, location o content de la tarjeta, abrir detalle
-                card.header.bind(on_touch_down=lambda w, t, s=story: self.open_story_detail(s) if w.collide_point(*t.pos) else None)
-                card.location.bind(on_touch_down=lambda w, t, s=story: self.open_story_detail(s) if w.collide_point(*t.pos) else None)
-                card.content.bind(on_touch_down=lambda w, t, s=story: self.open_story_detail(s) if w.collide_point(*t.pos) else None)
-                self.stories_layout.add_widget(card)
-
-            # Mostrar botón "Cargar más" si podría haber más resultados
-            if len(stories) == self.page_size:
-                load_more_btn = Button(
-                    text='Cargar más',
-                    size_hint_y=None,
-                    height=dp(50),
-                    background_normal='',
-                    background_color=(0.2, 0.2, 0.25, 1),
-                    color=(1, 1, 1, 1),
-                    font_size=sp(16)
-                )
-                load_more_btn.bind(on_press=self.load_more)
-                self.stories_layout.add_widget(load_more_btn)
+    def append_stories(self, stories):
+        self.seed_stories(stories)
+        self.feed.append_stories(stories)
+
+        # Mensaje si no hay historias; el feed no se re-agrega en cada página
+        shown = self.feed if self.feed.data else self.empty_label
+        if shown.parent is not self.body:
+            self.body.clear_widgets()
+            self.body.add_widget(shown)
+
+    def prepend_stories(self, stories):
+        self.seed_stories(stories)
+        self.feed.prepend_stories(stories)
 
     def like_story(self, story):
         app = App.get_running_app()
         if hasattr(app, 'current_user'):
-            self.db.add_like(story['id'], app.current_user['id'])
-            self.reset_and_load()
+            app.interactions.like(story['id'], app.current_user['id'])
 
     def add_reaction(self, story, tipo):
         app = App.get_running_app()
         if hasattr(app, 'current_user'):
-            self.db.add_reaction(story['id'], app.current_user['id'], tipo)
-            self.reset_and_load()
+            app.interactions.react(story['id'], app.current_user['id'], tipo)
 
-    def load_more(self, instance):
-        # Remover el botón "Cargar más" actual antes de añadir nuevos elementos
-        if instance in self.stories_layout.children:
-            self.stories_layout.remove_widget(instance)
-        self.offset += self.page_size
-        self.load_stories()
+    def on_story_state(self, story_id, values):
+        # Cambios optimistas y conciliados de cualquier pantalla
+        self.feed.update_story(story_id, values)
 
     def open_story_detail(self, story):
         # Navegar a la pantalla de detalle de historia
@@ -644,6 +694,9 @@ class SearchScreen(Screen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.db = Database()
+        self.page_size = 20
+        self.query = ''
+        self.offset = 0
 
         layout = BoxLayout(orientation='vertical')
 
@@ -720,6 +773,8 @@ class SearchScreen(Screen):
             padding=[dp(12), dp(12)]
         )
         self.results_layout.bind(minimum_height=self.results_layout.setter('height'))
+        # Las tarjetas se construyen en varios frames (8 ms por frame)
+        self.builder = IncrementalBuilder(self.results_layout, name='search', on_done=record_build)
 
         scroll.add_widget(self.results_layout)
 
@@ -737,6 +792,7 @@ class SearchScreen(Screen):
 
     def search_stories(self, instance):
         query = self.search_input.text.strip()
+        self.builder.cancel()
         self.results_layout.clear_widgets()
 
         if not query:
@@ -748,20 +804,45 @@ class SearchScreen(Screen):
             self.results_layout.add_widget(info)
             return
 
-        stories = self.db.search_stories(query)
+        self.query = query
+        self.offset = 0
+        self.load_results()
+
+    def load_results(self):
+        # Una búsqueda nueva descarta la que aún no responde
+        app = App.get_running_app()
+        app.async_db.cancel_tag(self.name)
+        query, offset = self.query, self.offset
+        # Se pide un resultado extra para saber si hay otra página
+        app.async_db.submit(
+            'search_stories', query, limit=self.page_size + 1, offset=offset,
+            callback=lambda stories: self.on_results(query, offset, stories),
+            tag=self.name
+        )
+
+    def on_leave(self):
+        App.get_running_app().async_db.cancel_tag(self.name)
+
+    def on_results(self, query, offset, stories):
+        if query != self.query or offset != self.offset:
+            return
+        has_more = len(stories) > self.page_size
+        stories = stories[:self.page_size]
 
-        if not stories:
+        if not stories and self.offset == 0:
             no_results = Label(
-                text=f'No se encontraron historias para "{query}"',
+                text=f'No se encontraron historias para "{self.query}"',
                 font_size=sp(16),
                 color=(0.6, 0.6, 0.6, 1),
                 halign='center'
             )
             no_results.bind(size=no_results.setter('text_size'))
             self.results_layout.add_widget(no_results)
-        else:
+            return
+
+        if self.offset == 0:
             results_count = Label(
-                text=f'Se encontraron {len(stories)} historias',
+                text=f'Resultados para "{self.query}" (más relevantes primero)',
                 font_size=sp(13),
                 color=(0.7, 0.7, 0.7, 1),
                 size_hint_y=None,
@@ -769,15 +850,35 @@ class SearchScreen(Screen):
             )
             self.results_layout.add_widget(results_count)
 
-            for story in stories:
-                card = StoryCard(story, show_actions=False)
-                self.results_layout.add_widget(card)
+        self.builder.add(stories, lambda story: StoryCard(story, show_actions=False), CARD_HEIGHT)
+        self.offset += len(stories)
+
+        if has_more:
+            load_more_btn = Button(
+                text='Cargar más',
+                size_hint_y=None,
+                height=dp(50),
+                background_normal='',
+                background_color=(0.2, 0.2, 0.25, 1),
+                color=(1, 1, 1, 1),
+                font_size=sp(16)
+            )
+            load_more_btn.bind(on_press=self.load_more)
+            self.results_layout.add_widget(load_more_btn)
+
+    def load_more(self, instance):
+        if instance in self.results_layout.children:
+            self.results_layout.remove_widget(instance)
+        self.load_results()
 
 class CreateScreen(Screen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.db = Database()
         self.selected_images = []  # rutas locales guardadas
+        self.import_job = None
+        self.publishing = False
+        self.import_tiles = []
 
         layout = BoxLayout(orientation='vertical')
 
@@ -882,7 +983,7 @@ class CreateScreen(Screen):
             font_name='EmojiFont' if 'EmojiFont' in LabelBase._fonts else 'SegoeUIEmoji' if 'SegoeUIEmoji' in LabelBase._fonts else None
         )
 
-        photo_btn = Button(
+        self.photo_btn = photo_btn = Button(
             text='[color=#FFD700]📷[/color]',
             size_hint_x=0.4,
             background_normal='',
@@ -892,7 +993,7 @@ class CreateScreen(Screen):
             markup=True,
             font_name='EmojiFont' if 'EmojiFont' in LabelBase._fonts else 'SegoeUIEmoji' if 'SegoeUIEmoji' in LabelBase._fonts else None
         )
-        photo_btn.bind(on_press=self.open_file_chooser)
+        photo_btn.bind(on_press=self.on_photo_button)
 
         options_layout.add_widget(self.anonymous_toggle)
         options_layout.add_widget(photo_btn)
@@ -949,18 +1050,31 @@ class CreateScreen(Screen):
             self.show_popup('Error', 'Por favor escribe tu historia')
             return
 
-        if self.db.create_story(
-            user_id=app.current_user['id'],
+        if self.import_job:
+            self.show_popup('Espera', 'Las imágenes aún se están cargando')
+            return
+
+        if self.publishing:
+            return
+        self.publishing = True
+        # Historia e imágenes se guardan en un worker, fuera del hilo de la UI
+        app.async_db.submit(
+            'publish_story', app.current_user['id'],
             content=content,
             location=location if location else 'Chile',
             category=category,
-            is_anonymous=is_anonymous
-        ):
-            # Obtener el último story insertado por el usuario para asociar imágenes
-            stories = self.db.get_user_stories(app.current_user['id'])
-            new_story_id = stories[0]['id'] if stories else None
-            if new_story_id and self.selected_images:
-                self.db.add_story_images(new_story_id, self.selected_images)
+            is_anonymous=is_anonymous,
+            image_paths=list(self.selected_images),
+            callback=self.on_story_published,
+            on_error=lambda e: self.on_story_published(None),
+            tag=self.name
+        )
+
+    def on_story_published(self, new_story_id):
+        self.publishing = False
+        if new_story_id:
+            if self.selected_images:
+                App.get_running_app().thumbnails.submit(new_story_id)
             self.show_popup('Éxito', 'Historia publicada exitosamente')
             self.content_input.text = ''
             self.location_input.text = ''
@@ -992,29 +1106,9 @@ class CreateScreen(Screen):
         chooser.path = os.path.expanduser('~')
 
         def on_select(_instance, selection):
-            # Limitar a 4 y copiar a carpeta media local
-            target_dir = os.path.join(os.getcwd(), 'media')
-            if not os.path.exists(target_dir):
-                os.makedirs(target_dir, exist_ok=True)
-            chosen = selection[:4]
-            saved_paths = []
-            for src in chosen:
-                try:
-                    filename = os.path.basename(src)
-                    # evitar colisiones
-                    base, ext = os.path.splitext(filename)
-                    unique_name = f"{base}_{int(Window._get_window()._counter if hasattr(Window, '_get_window') else 0)}{ext}"
-                    dest = os.path.join(target_dir, unique_name)
-                    with open(src, 'rb') as fsrc, open(dest, 'wb') as fdst:
-                        fdst.write(fsrc.read())
-                    # Usar ruta relativa para Kivy
-                    saved_paths.append(dest)
-                except Exception as e:
-                    print(f"Error copiando imagen: {e}")
-
-            self.selected_images = saved_paths
-            self.refresh_images_preview()
             popup.dismiss()
+            if selection:
+                self.start_import(selection[:4])
 
         popup_content = BoxLayout(orientation='vertical')
         popup_content.add_widget(chooser)
@@ -1029,11 +1123,74 @@ class CreateScreen(Screen):
         btn_ok.bind(on_press=lambda x: on_select(chooser, chooser.selection))
         popup.open()
 
+    def on_photo_button(self, instance):
+        # Mientras se copian imágenes el botón sirve para cancelar
+        if self.import_job:
+            self.cancel_import()
+        else:
+            self.open_file_chooser(instance)
+
+    def start_import(self, sources):
+        """Copia las imágenes al almacén en segundo plano, con progreso."""
+        self.cancel_import()
+        self.selected_images = []
+        self.images_preview.clear_widgets()
+        self.import_tiles = []
+        for src in sources:
+            tile = BoxLayout(orientation='vertical', padding=[dp(4), dp(4)])
+            tile.add_widget(Label(text=os.path.basename(src), font_size=sp(10), color=(0.7, 0.7, 0.7, 1), shorten=True))
+            tile.bar = ProgressBar(max=100, value=0)
+            tile.add_widget(tile.bar)
+            self.images_preview.add_widget(tile)
+            self.import_tiles.append(tile)
+
+        # Una foto repetida reutiliza el archivo existente (MediaStore)
+        self.import_job = ImportJob(
+            App.get_running_app().media_store, self.db, sources,
+            dispatch=clock_dispatch,
+            on_progress=self.on_import_progress,
+            on_file=self.on_import_file,
+            on_done=self.on_import_done
+        ).start()
+        self.photo_btn.text = 'Cancelar'
+
+    def on_import_progress(self, index, fraction):
+        self.import_tiles[index].bar.value = fraction * 100
+
+    def on_import_file(self, index, path):
+        tile = self.import_tiles[index]
+        tile.clear_widgets()
+        if path:
+            self.selected_images.append(path)
+            tile.add_widget(CachedImage(path=path, allow_stretch=True, keep_ratio=True))
+        else:
+            tile.add_widget(Label(text='Error', font_size=sp(11), color=(0.9, 0.4, 0.4, 1)))
+
+    def on_import_done(self, paths):
+        self.finish_import()
+
+    def cancel_import(self):
+        """Detiene la copia; se conservan las imágenes que ya terminaron."""
+        if self.import_job:
+            self.import_job.cancel()
+            self.finish_import()
+            self.refresh_images_preview()
+
+    def finish_import(self):
+        self.import_job = None
+        self.import_tiles = []
+        self.photo_btn.text = '[color=#FFD700]📷[/color]'
+
+    def on_leave(self):
+        self.cancel_import()
+        App.get_running_app().async_db.cancel_tag(self.name)
+        self.publishing = False
+
     def refresh_images_preview(self):
         self.images_preview.clear_widgets()
         for path in self.selected_images[:4]:
             try:
-                img = Image(source=path, allow_stretch=True, keep_ratio=True)
+                img = CachedImage(path=path, allow_stretch=True, keep_ratio=True)
                 self.images_preview.add_widget(img)
             except Exception as e:
                 print(f"Error cargando preview: {e}")
@@ -1043,6 +1200,11 @@ class StoryDetailScreen(Screen):
         super().__init__(**kwargs)
         self.db = Database()
         self.current_story = None
+        self.comments_request = None
+        self.comments_cursor = None
+        self.comments_loading = False
+        self.comments_page_size = 20
+        self.unsubscribe = None
 
         layout = BoxLayout(orientation='vertical')
 
@@ -1087,7 +1249,7 @@ class StoryDetailScreen(Screen):
         header.add_widget(back_btn)
         header.add_widget(title)
 
-        scroll = ScrollView()
+        scroll = ScrollView(size_hint_y=0.55)
         self.content_layout = BoxLayout(
             orientation='vertical',
             size_hint_y=None,
@@ -1098,8 +1260,83 @@ class StoryDetailScreen(Screen):
 
         scroll.add_widget(self.content_layout)
 
+        # Sección de comentarios: se arma una vez y se reutiliza entre historias
+        comments_section = BoxLayout(
+            orientation='vertical',
+            size_hint_y=0.45,
+            spacing=dp(8),
+            padding=[dp(12), 0, dp(12), dp(8)]
+        )
+
+        self.comments_title = comments_title = Label(
+            text='[color=#FFD700]💬[/color] Comentarios',
+            font_size=sp(18),
+            bold=True,
+            color=(0.9, 0.9, 0.9, 1),
+            size_hint_y=None,
+            height=dp(40),
+            halign='left',
+            valign='middle',
+            markup=True,
+            font_name='EmojiFont' if 'EmojiFont' in LabelBase._fonts else 'SegoeUIEmoji' if 'SegoeUIEmoji' in LabelBase._fonts else None
+        )
+        comments_title.bind(size=comments_title.setter('text_size'))
+
+        # Campo para nuevo comentario
+        comment_input_layout = BoxLayout(
+            orientation='horizontal',
+            size_hint_y=None,
+            height=dp(50),
+            spacing=dp(8)
+        )
+
+        self.comment_input = TextInput(
+            hint_text='Escribe tu comentario...',
+            multiline=False,
+            size_hint_x=0.8,
+            background_normal='',
+            background_color=(0.15, 0.15, 0.2, 1),
+            foreground_color=(1, 1, 1, 1),
+            cursor_color=(1, 1, 1, 1),
+            padding=[dp(15), dp(12)],
+            font_size=sp(16)
+        )
+
+        comment_btn = Button(
+            text='[color=#FFD700]📤[/color]',
+            size_hint_x=0.2,
+            background_normal='',
+            background_color=(0.5, 0.2, 0.6, 1),
+            color=(1, 1, 1, 1),
+            font_size=sp(20),
+            markup=True,
+            font_name='EmojiFont' if 'EmojiFont' in LabelBase._fonts else 'SegoeUIEmoji' if 'SegoeUIEmoji' in LabelBase._fonts else None
+        )
+        comment_btn.bind(on_press=self.add_comment)
+
+        comment_input_layout.add_widget(self.comment_input)
+        comment_input_layout.add_widget(comment_btn)
+
+        # Lista virtualizada: solo los comentarios visibles son widgets
+        self.comment_list = CommentList()
+        self.comment_list.on_near_end = self.load_more_comments
+
+        self.no_comments = Label(
+            text='No hay comentarios aún.\n¡Sé el primero en comentar!',
+            font_size=sp(14),
+            color=(0.6, 0.6, 0.6, 1),
+            halign='center'
+        )
+
+        self.comments_body = BoxLayout(orientation='vertical')
+
+        comments_section.add_widget(comments_title)
+        comments_section.add_widget(comment_input_layout)
+        comments_section.add_widget(self.comments_body)
+
         layout.add_widget(header)
         layout.add_widget(scroll)
+        layout.add_widget(comments_section)
 
         self.add_widget(layout)
 
@@ -1110,6 +1347,12 @@ class StoryDetailScreen(Screen):
     def go_back(self, instance):
         self.manager.current = 'feed'
 
+    def on_leave(self):
+        App.get_running_app().async_db.cancel_tag(self.name)
+        if self.unsubscribe:
+            self.unsubscribe()
+            self.unsubscribe = None
+
     def load_story_detail(self, story):
         self.current_story = story
         self.content_layout.clear_widgets()
@@ -1151,9 +1394,9 @@ class StoryDetailScreen(Screen):
         author_info.add_widget(username)
         author_info.add_widget(location)
 
-        # Contenido completo de la historia
+        # Contenido completo de la historia (el preview mientras se carga)
         content = Label(
-            text=story.get('content', ''),
+            text=story.get('content') or story.get('preview') or '',
             font_size=sp(16),
             color=(0.85, 0.85, 0.85, 1),
             size_hint_y=None,
@@ -1163,18 +1406,17 @@ class StoryDetailScreen(Screen):
         )
         content.bind(size=content.setter('text_size'))
         content.bind(text_size=content.setter('size'))
+        self.content_label = content
 
         # Imágenes si existen
-        images = story.get('images') or []
+        images = image_variants(story)
         if images:
-            from kivy.uix.carousel import Carousel
-            carousel = Carousel(direction='right', loop=True, size_hint_y=None, height=dp(260))
-            for path in images:
-                try:
-                    img = Image(source=path, allow_stretch=True, keep_ratio=True)
-                    carousel.add_widget(img)
-                except Exception as e:
-                    print(f"Error cargando imagen: {e}")
+            # Solo la imagen visible y sus vecinas se decodifican
+            slide_px = max(Window.width, dp(260))
+            carousel = LazyCarousel(
+                [pick_source(image, slide_px) for image in images],
+                direction='right', loop=True, size_hint_y=None, height=dp(260)
+            )
 
         # Botones de interacción
         actions = BoxLayout(
@@ -1184,7 +1426,7 @@ class StoryDetailScreen(Screen):
             spacing=dp(8)
         )
 
-        like_btn = Button(
+        self.like_btn = Button(
             text=f"[color=#FFD700]❤️[/color] {story.get('likes', 0)}",
             size_hint_x=0.2,
             background_normal='',
@@ -1194,7 +1436,7 @@ class StoryDetailScreen(Screen):
             markup=True,
             font_name='EmojiFont' if 'EmojiFont' in LabelBase._fonts else 'SegoeUIEmoji' if 'SegoeUIEmoji' in LabelBase._fonts else None
         )
-        like_btn.bind(on_press=lambda x: self.like_story())
+        self.like_btn.bind(on_press=lambda x: self.like_story())
 
         report_btn = Button(
             text=f"[color=#FF6B6B]🚨[/color] Reportar",
@@ -1208,7 +1450,7 @@ class StoryDetailScreen(Screen):
         )
         report_btn.bind(on_press=lambda x: self.report_story())
 
-        miedo_btn = Button(
+        self.miedo_btn = Button(
             text=f"[color=#FF6B6B]😱[/color] {story.get('miedo', 0)}",
             size_hint_x=0.2,
             background_normal='',
@@ -1218,9 +1460,9 @@ class StoryDetailScreen(Screen):
             markup=True,
             font_name='EmojiFont' if 'EmojiFont' in LabelBase._fonts else 'SegoeUIEmoji' if 'SegoeUIEmoji' in LabelBase._fonts else None
         )
-        miedo_btn.bind(on_press=lambda x: self.add_reaction('miedo'))
+        self.miedo_btn.bind(on_press=lambda x: self.add_reaction('miedo'))
 
-        sorpresa_btn = Button(
+        self.sorpresa_btn = Button(
             text=f"[color=#4ECDC4]😮[/color] {story.get('sorpresa', 0)}",
             size_hint_x=0.2,
             background_normal='',
@@ -1230,9 +1472,9 @@ class StoryDetailScreen(Screen):
             markup=True,
             font_name='EmojiFont' if 'EmojiFont' in LabelBase._fonts else 'SegoeUIEmoji' if 'SegoeUIEmoji' in LabelBase._fonts else None
         )
-        sorpresa_btn.bind(on_press=lambda x: self.add_reaction('sorpresa'))
+        self.sorpresa_btn.bind(on_press=lambda x: self.add_reaction('sorpresa'))
 
-        incredulidad_btn = Button(
+        self.incredulidad_btn = Button(
             text=f"[color=#FFE66D]🙄[/color] {story.get('incredulidad', 0)}",
             size_hint_x=0.2,
             background_normal='',
@@ -1242,13 +1484,13 @@ class StoryDetailScreen(Screen):
             markup=True,
             font_name='EmojiFont' if 'EmojiFont' in LabelBase._fonts else 'SegoeUIEmoji' if 'SegoeUIEmoji' in LabelBase._fonts else None
         )
-        incredulidad_btn.bind(on_press=lambda x: self.add_reaction('incredulidad'))
+        self.incredulidad_btn.bind(on_press=lambda x: self.add_reaction('incredulidad'))
 
-        actions.add_widget(like_btn)
+        actions.add_widget(self.like_btn)
         actions.add_widget(report_btn)
-        actions.add_widget(miedo_btn)
-        actions.add_widget(sorpresa_btn)
-        actions.add_widget(incredulidad_btn)
+        actions.add_widget(self.miedo_btn)
+        actions.add_widget(self.sorpresa_btn)
+        actions.add_widget(self.incredulidad_btn)
 
         # Fecha de publicación
         date = Label(
@@ -1264,64 +1506,6 @@ class StoryDetailScreen(Screen):
         )
         date.bind(size=date.setter('text_size'))
 
-        # Sección de comentarios
-        comments_title = Label(
-            text='[color=#FFD700]💬[/color] Comentarios',
-            font_size=sp(18),
-            bold=True,
-            color=(0.9, 0.9, 0.9, 1),
-            size_hint_y=None,
-            height=dp(40),
-            halign='left',
-            valign='middle',
-            markup=True,
-            font_name='EmojiFont' if 'EmojiFont' in LabelBase._fonts else 'SegoeUIEmoji' if 'SegoeUIEmoji' in LabelBase._fonts else None
-        )
-        comments_title.bind(size=comments_title.setter('text_size'))
-
-        # Campo para nuevo comentario
-        comment_input_layout = BoxLayout(
-            orientation='horizontal',
-            size_hint_y=None,
-            height=dp(50),
-            spacing=dp(8)
-        )
-
-        self.comment_input = TextInput(
-            hint_text='Escribe tu comentario...',
-            multiline=False,
-            size_hint_x=0.8,
-            background_normal='',
-            background_color=(0.15, 0.15, 0.2, 1),
-            foreground_color=(1, 1, 1, 1),
-            cursor_color=(1, 1, 1, 1),
-            padding=[dp(15), dp(12)],
-            font_size=sp(16)
-        )
-
-        comment_btn = Button(
-            text='[color=#FFD700]📤[/color]',
-            size_hint_x=0.2,
-            background_normal='',
-            background_color=(0.5, 0.2, 0.6, 1),
-            color=(1, 1, 1, 1),
-            font_size=sp(20),
-            markup=True,
-            font_name='EmojiFont' if 'EmojiFont' in LabelBase._fonts else 'SegoeUIEmoji' if 'SegoeUIEmoji' in LabelBase._fonts else None
-        )
-        comment_btn.bind(on_press=self.add_comment)
-
-        comment_input_layout.add_widget(self.comment_input)
-        comment_input_layout.add_widget(comment_btn)
-
-        # Lista de comentarios
-        self.comments_layout = BoxLayout(
-            orientation='vertical',
-            size_hint_y=None,
-            spacing=dp(8)
-        )
-        self.comments_layout.bind(minimum_height=self.comments_layout.setter('height'))
-
         # Agregar todos los elementos
         self.content_layout.add_widget(author_info)
         self.content_layout.add_widget(content)
@@ -1331,24 +1515,52 @@ class StoryDetailScreen(Screen):
         
         self.content_layout.add_widget(actions)
         self.content_layout.add_widget(date)
-        self.content_layout.add_widget(comments_title)
-        self.content_layout.add_widget(comment_input_layout)
-        self.content_layout.add_widget(self.comments_layout)
 
-        # Cargar comentarios existentes
+        # Cargar la primera página de comentarios
+        self.comment_input.text = ''
         self.load_comments()
 
+        # Contadores optimistas de esta historia
+        interactions = App.get_running_app().interactions
+        if self.unsubscribe:
+            self.unsubscribe()
+        self.unsubscribe = interactions.subscribe(self.update_counters, story['id'])
+        self.update_counters(story['id'], interactions.seed(story).as_dict())
+
+        if 'content' not in story:
+            # Viene de una tarjeta (solo preview): pedir la historia completa
+            App.get_running_app().async_db.submit(
+                'get_story_by_id', story['id'],
+                callback=self.on_full_story, tag=self.name
+            )
+
+    def on_full_story(self, story):
+        if story and self.current_story and story['id'] == self.current_story['id']:
+            story.setdefault('images', self.current_story.get('images'))
+            story.setdefault('image_variants', self.current_story.get('image_variants'))
+            self.current_story = story
+            self.content_label.text = story['content']
+
     def like_story(self):
         app = App.get_running_app()
         if hasattr(app, 'current_user'):
-            self.db.add_like(self.current_story['id'], app.current_user['id'])
-            self.load_story_detail(self.current_story)  # Recargar para actualizar contadores
+            app.interactions.like(self.current_story['id'], app.current_user['id'])
 
     def add_reaction(self, tipo):
         app = App.get_running_app()
         if hasattr(app, 'current_user'):
-            self.db.add_reaction(self.current_story['id'], app.current_user['id'], tipo)
-            self.load_story_detail(self.current_story)  # Recargar para actualizar contadores
+            app.interactions.react(self.current_story['id'], app.current_user['id'], tipo)
+
+    def update_counters(self, story_id, values):
+        """Actualiza los botones de contadores sin reconstruir la pantalla"""
+        if not self.current_story or self.current_story['id'] != story_id:
+            return
+        self.current_story.update(values)
+        self.like_btn.text = f"[color=#FFD700]❤️[/color] {values['likes']}"
+        self.miedo_btn.text = f"[color=#FF6B6B]😱[/color] {values['miedo']}"
+        self.sorpresa_btn.text = f"[color=#4ECDC4]😮[/color] {values['sorpresa']}"
+        self.incredulidad_btn.text = f"[color=#FFE66D]🙄[/color] {values['incredulidad']}"
+        self.comments_title.text = f"[color=#FFD700]💬[/color] Comentarios ({values['comentarios']})"
 
     def report_story(self):
         """Navegar a la pantalla de reporte de historia"""
@@ -1367,93 +1579,76 @@ class StoryDetailScreen(Screen):
             self.show_popup('Error', 'Escribe un comentario')
             return
 
-        if self.db.add_comment(self.current_story['id'], app.current_user['id'], comment_text):
-            self.comment_input.text = ''
-            self.load_comments()  # Recargar solo los comentarios
-        else:
+        story_id = self.current_story['id']
+        future = app.write_queue.add_comment(story_id, app.current_user['id'], comment_text)
+        app.async_db.when_done(
+            future, lambda result: self.on_comment_added(result, story_id, comment_text),
+            on_error=lambda e: self.on_comment_added(WriteResult(False, None), story_id, comment_text)
+        )
+
+    def on_comment_added(self, result, story_id, text):
+        if not result.ok:
             self.show_popup('Error', 'No se pudo agregar el comentario')
+            return
+        app = App.get_running_app()
+        self.comment_input.text = ''
+        # Contador de comentarios en el detalle, el feed y el perfil
+        if result.counters is not None:
+            app.interactions.confirm(story_id, result.counters)
+        if not self.current_story or self.current_story['id'] != story_id:
+            return
+        # Se inserta arriba sin volver a pedir la lista, con el id y la
+        # fecha reales para que la página siguiente no la repita
+        user = app.current_user
+        self.comment_list.add_comment({
+            'id': result.row['id'],
+            'story_id': story_id,
+            'user_id': user['id'],
+            'username': user['username'],
+            'content': text,
+            'created_at': self.db.format_date(result.row['created_at'])
+        })
+        self.show_comment_list()
 
     def load_comments(self):
         if not self.current_story:
             return
 
-        self.comments_layout.clear_widgets()
-        comments = self.db.get_comments(self.current_story['id'])
-
-        if not comments:
-            no_comments = Label(
-                text='No hay comentarios aún.\n¡Sé el primero en comentar!',
-                font_size=sp(14),
-                color=(0.6, 0.6, 0.6, 1),
-                halign='center',
-                size_hint_y=None,
-                height=dp(60)
-            )
-            no_comments.bind(size=no_comments.setter('text_size'))
-            self.comments_layout.add_widget(no_comments)
-        else:
-            for comment in comments:
-                comment_card = BoxLayout(
-                    orientation='vertical',
-                    size_hint_y=None,
-                    height=dp(80),
-                    spacing=dp(5),
-                    padding=[dp(10), dp(8)]
-                )
-
-                with comment_card.canvas.before:
-                    Color(0.15, 0.15, 0.2, 1)
-                    RoundedRectangle(pos=comment_card.pos, size=comment_card.size, radius=[dp(8)])
-
-                comment_header = BoxLayout(
-                    orientation='horizontal',
-                    size_hint_y=None,
-                    height=dp(25),
-                    spacing=dp(8)
-                )
-
-                comment_author = Label(
-                    text=f"[color=#FFD700]👤[/color] {comment.get('username', 'Usuario')}",
-                    font_size=sp(12),
-                    bold=True,
-                    color=(0.8, 0.8, 0.8, 1),
-                    size_hint_x=0.7,
-                    halign='left',
-                    valign='middle',
-                    markup=True,
-                    font_name='EmojiFont' if 'EmojiFont' in LabelBase._fonts else 'SegoeUIEmoji' if 'SegoeUIEmoji' in LabelBase._fonts else None
-                )
-                comment_author.bind(size=comment_author.setter('text_size'))
-
-                comment_date = Label(
-                    text=comment.get('created_at', ''),
-                    font_size=sp(10),
-                    color=(0.5, 0.5, 0.5, 1),
-                    size_hint_x=0.3,
-                    halign='right',
-                    valign='middle'
-                )
-                comment_date.bind(size=comment_date.setter('text_size'))
-
-                comment_header.add_widget(comment_author)
-                comment_header.add_widget(comment_date)
-
-                comment_content = Label(
-                    text=comment.get('content', ''),
-                    font_size=sp(13),
-                    color=(0.9, 0.9, 0.9, 1),
-                    size_hint_y=None,
-                    text_size=(Window.width - dp(80), None),
-                    halign='left',
-                    valign='top'
-                )
-                comment_content.bind(size=comment_content.setter('text_size'))
-                comment_content.bind(text_size=comment_content.setter('size'))
-
-                comment_card.add_widget(comment_header)
-                comment_card.add_widget(comment_content)
-
-                self.comments_layout.add_widget(comment_card)
+        # Solo se descarta la carga de comentarios anterior, no la de la historia
+        if self.comments_request:
+            self.comments_request.cancel()
+        self.comments_cursor = None
+        self.comment_list.set_comments([])
+        self.request_comments()
+
+    def load_more_comments(self):
+        # Una página a la vez; comments_cursor es None al llegar al final
+        if self.comments_cursor and not self.comments_loading:
+            self.request_comments()
+
+    def request_comments(self):
+        self.comments_loading = True
+        self.comments_request = App.get_running_app().async_db.submit(
+            'get_comments_page', self.current_story['id'],
+            cursor=self.comments_cursor, limit=self.comments_page_size,
+            callback=self.show_comments, on_error=self.on_comments_error, tag=self.name
+        )
+
+    def on_comments_error(self, error):
+        self.comments_loading = False
+        print(f"Error cargando comentarios: {error}")
+
+    def show_comments(self, page):
+        self.comments_loading = False
+        comments, self.comments_cursor = page
+        self.comment_list.append_comments(comments)
+        self.show_comment_list()
+
+    def show_comment_list(self):
+        shown = self.comment_list if self.comment_list.data else self.no_comments
+        if shown.parent is not self.comments_body:
+            self.comments_body.clear_widgets()
+            self.comments_body.add_widget(shown)
 
     def show_popup(self, title, message):
         content = BoxLayout(orientation='vertical', padding=dp(10), spacing=dp(10))
@@ -1473,44 +1668,71 @@ class StoryDetailScreen(Screen):
 class NotificationsScreen(Screen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.db = Database()
-        self.notifications = []
-        self.offset = 0
         self.page_size = 20
+        self.user_id = None
+        self.last_id = 0  # id de la notificación más nueva ya mostrada
+        self.loading = False
+        self.cards = {}  # id de notificación -> (notificación, tarjeta)
+
+        self.no_notifications = Label(
+            text='No tienes notificaciones',
+            font_size=sp(16),
+            color=(0.6, 0.6, 0.6, 1),
+            halign='center',
+            size_hint_y=None,
+            height=dp(60)
+        )
+
+        self.add_widget(self.build())
 
     def on_enter(self):
         """Se ejecuta cuando se entra a la pantalla."""
-        self.load_notifications()
+        self.load_new()
+
+    def on_leave(self):
+        App.get_running_app().async_db.cancel_tag(self.name)
+        self.loading = False
 
-    def load_notifications(self):
-        """Carga las notificaciones del usuario actual."""
+    def load_new(self):
+        """Pide solo las notificaciones posteriores a las ya mostradas."""
         app = App.get_running_app()
-        if not hasattr(app, 'current_user'):
+        if not hasattr(app, 'current_user') or self.loading:
             return
 
-        # Limpiar notificaciones existentes
-        self.notifications_layout.clear_widgets()
-
-        # Obtener notificaciones de la base de datos
-        notifications = self.db.get_user_notifications(
-            app.current_user['id'], 
-            limit=self.page_size, 
-            offset=self.offset
-        )
-
-        if not notifications:
-            # Mostrar mensaje si no hay notificaciones
-            no_notifications = Label(
-                text='No tienes notificaciones',
-                font_size=sp(16),
-                color=(0.6, 0.6, 0.6, 1),
-                halign='center'
-            )
-            self.notifications_layout.add_widget(no_notifications)
-        else:
-            for notification in notifications:
-                card = self.create_notification_card(notification)
-                self.notifications_layout.add_widget(card)
+        if app.current_user['id'] != self.user_id:
+            # Otro usuario: se empieza de cero
+            self.user_id = app.current_user['id']
+            self.last_id = 0
+            self.cards = {}
+            self.notifications_layout.clear_widgets()
+
+        self.loading = True
+        app.async_db.submit(
+            'get_notifications_since', self.user_id,
+            since_id=self.last_id, limit=self.page_size,
+            callback=self.prepend_notifications, tag=self.name
+        )
+
+    def prepend_notifications(self, notifications):
+        self.loading = False
+        if len(notifications) == self.page_size and self.last_id:
+            # Hay más nuevas de las que caben: se muestra solo la última página
+            self.cards = {}
+            self.notifications_layout.clear_widgets()
+
+        if notifications:
+            self.last_id = notifications[0]['id']
+            if self.no_notifications.parent:
+                self.notifications_layout.remove_widget(self.no_notifications)
+
+        # Vienen de la más nueva a la más antigua; cada una se agrega arriba
+        for notification in reversed(notifications):
+            card = self.create_notification_card(notification)
+            self.cards[notification['id']] = (notification, card)
+            self.notifications_layout.add_widget(card, index=len(self.notifications_layout.children))
+
+        if not self.cards and not self.no_notifications.parent:
+            self.notifications_layout.add_widget(self.no_notifications)
 
     def create_notification_card(self, notification):
         """Crea una tarjeta de notificación."""
@@ -1577,12 +1799,12 @@ class NotificationsScreen(Screen):
 
         # Indicador de no leída
         if not notification['leida']:
-            indicator = BoxLayout(
+            card.indicator = BoxLayout(
                 size_hint_x=None,
                 width=dp(8),
                 background_color=(0.2, 0.6, 1, 1)
             )
-            card.add_widget(indicator)
+            card.add_widget(card.indicator)
 
         card.add_widget(icon_label)
         card.add_widget(content)
@@ -1590,28 +1812,52 @@ class NotificationsScreen(Screen):
         # Al tocar la notificación, marcarla como leída y navegar a la historia si aplica
         def on_notification_tap(instance, touch):
             if instance.collide_point(*touch.pos):
+                app = App.get_running_app()
                 if not notification['leida']:
-                    self.db.mark_notification_as_read(notification['id'], notification['user_id'])
-                    self.load_notifications()  # Recargar para actualizar UI
+                    self.mark_card_read(notification['id'])
+                    app.async_db.submit(
+                        'mark_notification_as_read', notification['id'], notification['user_id'],
+                        callback=lambda ok: app.check_notifications()
+                    )
                 
                 if notification['story_id']:
                     # Navegar a la historia
-                    detail_screen = self.manager.get_screen('story_detail')
-                    story = self.db.get_story_by_id(notification['story_id'])
-                    if story:
-                        detail_screen.load_story_detail(story)
-                        self.manager.current = 'story_detail'
+                    app.async_db.submit(
+                        'get_story_by_id', notification['story_id'],
+                        viewer_id=notification['user_id'],
+                        callback=self.open_story, tag=self.name
+                    )
 
         card.bind(on_touch_down=on_notification_tap)
 
         return card
 
+    def open_story(self, story):
+        if story:
+            detail_screen = self.manager.get_screen('story_detail')
+            detail_screen.load_story_detail(story)
+            self.manager.current = 'story_detail'
+
+    def mark_card_read(self, notification_id):
+        """Quita el indicador de no leída sin reconstruir la lista."""
+        notification, card = self.cards.get(notification_id, (None, None))
+        if notification is None or notification['leida']:
+            return
+        notification['leida'] = 1
+        indicator = getattr(card, 'indicator', None)
+        if indicator is not None and indicator.parent is card:
+            card.remove_widget(indicator)
+
     def mark_all_as_read(self, instance):
         """Marca todas las notificaciones como leídas."""
         app = App.get_running_app()
         if hasattr(app, 'current_user'):
-            self.db.mark_all_notifications_as_read(app.current_user['id'])
-            self.load_notifications()
+            for notification_id in list(self.cards):
+                self.mark_card_read(notification_id)
+            app.async_db.submit(
+                'mark_all_notifications_as_read', app.current_user['id'],
+                callback=lambda ok: app.check_notifications()
+            )
 
     def build(self):
         """Construye la interfaz de la pantalla de notificaciones."""
@@ -1660,8 +1906,11 @@ class NotificationsScreen(Screen):
         self.notifications_layout.bind(minimum_height=self.notifications_layout.setter('height'))
         scroll.add_widget(self.notifications_layout)
 
+        navbar = NavBar()
+
         layout.add_widget(header)
         layout.add_widget(scroll)
+        layout.add_widget(navbar)
 
         return layout
 
@@ -1842,7 +2091,7 @@ class ReportScreen(Screen):
         preview_text += f"Ubicación: {story.get('location', 'Sin ubicación')}\n"
         preview_text += f"Categoría: {story.get('category', 'Aparición')}\n\n"
         
-        content = story.get('content', '')
+        content = story.get('content') or story.get('preview') or ''
         if len(content) > 150:
             content = content[:150] + '...'
         preview_text += content
@@ -1866,17 +2115,27 @@ class ReportScreen(Screen):
             self.show_popup('Error', 'Por favor selecciona un motivo para el reporte')
             return
 
-        if self.db.create_report(
+        app.async_db.submit(
+            'create_report',
             story_id=self.current_story['id'],
             reporter_id=app.current_user['id'],
             motivo=motivo,
-            descripcion=descripcion if descripcion else None
-        ):
+            descripcion=descripcion if descripcion else None,
+            callback=self.on_report_sent,
+            on_error=lambda e: self.on_report_sent(False),
+            tag=self.name
+        )
+
+    def on_report_sent(self, ok):
+        if ok:
             self.show_popup('Éxito', 'Reporte enviado exitosamente. Gracias por ayudarnos a mantener la comunidad segura.')
             self.manager.current = 'feed'
         else:
             self.show_popup('Error', 'No se pudo enviar el reporte. Es posible que ya hayas reportado esta historia.')
 
+    def on_leave(self):
+        App.get_running_app().async_db.cancel_tag(self.name)
+
     def show_popup(self, title, message):
         content = BoxLayout(orientation='vertical', padding=dp(10), spacing=dp(10))
         content.add_widget(Label(text=message, color=(0.9, 0.9, 0.9, 1)))
@@ -2071,11 +2330,33 @@ class EditStoryScreen(Screen):
         self.current_story = story
         
         # Pre-rellenar los campos con los datos actuales
-        self.content_input.text = story.get('content', '')
         self.location_input.text = story.get('location', '')
         self.category_spinner.text = story.get('category', 'Aparición')
         self.anonymous_toggle.state = 'down' if story.get('is_anonymous') else 'normal'
 
+        if 'content' in story:
+            self.content_input.text = story['content']
+            self.content_input.disabled = False
+        else:
+            # Las tarjetas del perfil solo traen el preview: se pide el texto
+            # completo y, mientras llega, el campo queda bloqueado para no
+            # guardar la versión recortada
+            self.content_input.text = ''
+            self.content_input.disabled = True
+            App.get_running_app().async_db.submit(
+                'get_story_by_id', story['id'],
+                callback=self.on_full_story, tag=self.name
+            )
+
+    def on_full_story(self, story):
+        if story and self.current_story and story['id'] == self.current_story['id']:
+            self.current_story = story
+            self.content_input.text = story['content']
+            self.content_input.disabled = False
+
+    def on_leave(self):
+        App.get_running_app().async_db.cancel_tag(self.name)
+
     def save_changes(self, instance):
         app = App.get_running_app()
         if not hasattr(app, 'current_user'):
@@ -2095,14 +2376,21 @@ class EditStoryScreen(Screen):
             self.show_popup('Error', 'Por favor escribe el contenido de la historia')
             return
 
-        if self.db.update_story(
+        app.async_db.submit(
+            'update_story',
             story_id=self.current_story['id'],
             user_id=app.current_user['id'],
             content=content,
             location=location if location else 'Chile',
             category=category,
-            is_anonymous=is_anonymous
-        ):
+            is_anonymous=is_anonymous,
+            callback=self.on_story_saved,
+            on_error=lambda e: self.on_story_saved(False),
+            tag=self.name
+        )
+
+    def on_story_saved(self, ok):
+        if ok:
             self.show_popup('Éxito', 'Historia actualizada exitosamente')
             self.manager.current = 'profile'
         else:
@@ -2150,7 +2438,16 @@ class EditStoryScreen(Screen):
     def confirm_delete(self, popup):
         popup.dismiss()
         
-        if self.db.delete_story(self.current_story['id'], App.get_running_app().current_user['id']):
+        app = App.get_running_app()
+        app.async_db.submit(
+            'delete_story', self.current_story['id'], app.current_user['id'],
+            callback=self.on_story_deleted,
+            on_error=lambda e: self.on_story_deleted(False),
+            tag=self.name
+        )
+
+    def on_story_deleted(self, ok):
+        if ok:
             self.show_popup('Éxito', 'Historia eliminada exitosamente')
             self.manager.current = 'profile'
         else:
@@ -2175,6 +2472,10 @@ class ProfileScreen(Screen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.db = Database()
+        self.page_size = 10
+        self.stories_cursor = None
+        self.stories_loading = False
+        self.stories_shown = 0
 
         layout = BoxLayout(orientation='vertical')
 
@@ -2205,6 +2506,9 @@ class ProfileScreen(Screen):
         header.add_widget(title)
 
         scroll = ScrollView()
+        # Las historias llegan por páginas a medida que se baja
+        scroll.bind(scroll_y=self.check_near_end)
+        self.scroll = scroll
         self.content_layout = BoxLayout(
             orientation='vertical',
             size_hint_y=None,
@@ -2212,6 +2516,7 @@ class ProfileScreen(Screen):
             padding=[dp(12), dp(12)]
         )
         self.content_layout.bind(minimum_height=self.content_layout.setter('height'))
+        self.builder = IncrementalBuilder(self.content_layout, name='profile', on_done=record_build)
 
         scroll.add_widget(self.content_layout)
 
@@ -2230,8 +2535,16 @@ class ProfileScreen(Screen):
     def on_enter(self):
         self.load_profile()
 
+    def on_leave(self):
+        App.get_running_app().async_db.cancel_tag(self.name)
+        self.stories_loading = False
+
     def load_profile(self):
+        App.get_running_app().async_db.cancel_tag(self.name)
+        self.builder.cancel()
         self.content_layout.clear_widgets()
+        self.stories_cursor = None
+        self.stories_shown = 0
         app = App.get_running_app()
 
         if not hasattr(app, 'current_user'):
@@ -2260,13 +2573,14 @@ class ProfileScreen(Screen):
             self.content_layout.add_widget(login_btn)
             return
 
+        # El encabezado sale de current_user y se dibuja de inmediato; los
+        # totales y las historias llegan después
         user = app.current_user
-        stories = self.db.get_user_stories(user['id'])
 
         profile_info = BoxLayout(
             orientation='vertical',
             size_hint_y=None,
-            height=dp(180),
+            height=dp(215),
             spacing=dp(10),
             padding=[dp(20), dp(20)]
         )
@@ -2302,8 +2616,8 @@ class ProfileScreen(Screen):
             font_name='EmojiFont' if 'EmojiFont' in LabelBase._fonts else 'SegoeUIEmoji' if 'SegoeUIEmoji' in LabelBase._fonts else None
         )
 
-        stats_label = Label(
-            text=f"[color=#FFD700]📖[/color] {len(stories)} historias publicadas",
+        self.stats_label = Label(
+            text="[color=#FFD700]📖[/color] ... historias publicadas",
             font_size=sp(16),
             color=(0.8, 0.8, 0.8, 1),
             size_hint_y=None,
@@ -2312,9 +2626,20 @@ class ProfileScreen(Screen):
             font_name='EmojiFont' if 'EmojiFont' in LabelBase._fonts else 'SegoeUIEmoji' if 'SegoeUIEmoji' in LabelBase._fonts else None
         )
 
+        self.received_label = Label(
+            text='',
+            font_size=sp(14),
+            color=(0.7, 0.7, 0.7, 1),
+            size_hint_y=None,
+            height=dp(30),
+            markup=True,
+            font_name='EmojiFont' if 'EmojiFont' in LabelBase._fonts else 'SegoeUIEmoji' if 'SegoeUIEmoji' in LabelBase._fonts else None
+        )
+
         profile_info.add_widget(username_label)
         profile_info.add_widget(email_label)
-        profile_info.add_widget(stats_label)
+        profile_info.add_widget(self.stats_label)
+        profile_info.add_widget(self.received_label)
 
         logout_btn = Button(
             text='Cerrar Sesión',
@@ -2345,36 +2670,45 @@ class ProfileScreen(Screen):
         self.content_layout.add_widget(logout_btn)
         self.content_layout.add_widget(stories_title)
 
-        if stories:
-            for story in stories:
-                # Crear un layout especial para historias propias con botón de editar
-                story_container = BoxLayout(
-                    orientation='vertical',
-                    size_hint_y=None,
-                    spacing=dp(5)
-                )
-                
-                # Agregar la tarjeta de historia
-                card = StoryCard(story, show_actions=False)
-                story_container.add_widget(card)
-                
-                # Agregar botón de editar para historias propias
-                edit_btn = Button(
-                    text='[color=#FFD700]✏️[/color] Editar Historia',
-                    size_hint_y=None,
-                    height=dp(40),
-                    background_normal='',
-                    background_color=(0.3, 0.3, 0.4, 1),
-                    color=(1, 1, 1, 1),
-                    font_size=sp(14),
-                    markup=True,
-                    font_name='EmojiFont' if 'EmojiFont' in LabelBase._fonts else 'SegoeUIEmoji' if 'SegoeUIEmoji' in LabelBase._fonts else None
-                )
-                edit_btn.bind(on_press=lambda x, s=story: self.edit_story(s))
-                story_container.add_widget(edit_btn)
-                
-                self.content_layout.add_widget(story_container)
-        else:
+        app.async_db.submit(
+            'get_profile_stats', user['id'],
+            callback=self.show_stats, tag=self.name
+        )
+        self.request_stories()
+
+    def show_stats(self, stats):
+        self.stats_label.text = f"[color=#FFD700]📖[/color] {stats['historias']} historias publicadas"
+        self.received_label.text = (
+            f"[color=#FFD700]❤️[/color] {stats['likes']}   "
+            f"[color=#FF6B6B]😱[/color] {stats['reacciones']}   "
+            f"[color=#4ECDC4]💬[/color] {stats['comentarios']}"
+        )
+
+    def request_stories(self):
+        app = App.get_running_app()
+        self.stories_loading = True
+        app.async_db.submit(
+            'get_user_stories_page', app.current_user['id'],
+            cursor=self.stories_cursor, limit=self.page_size,
+            callback=self.show_stories, tag=self.name
+        )
+
+    def check_near_end(self, scroll, scroll_y):
+        # Pedir la página siguiente cuando falta poco para el final
+        if not self.stories_cursor or self.stories_loading:
+            return
+        remaining = scroll_y * max(self.content_layout.height - scroll.height, 0)
+        if remaining < dp(600):
+            self.request_stories()
+
+    def show_stories(self, page):
+        self.stories_loading = False
+        stories, self.stories_cursor = page
+
+        self.builder.add(stories, self.build_story_container, CARD_HEIGHT + dp(45))
+        self.stories_shown += len(stories)
+
+        if not self.stories_shown:
             no_stories = Label(
                 text='Aún no has publicado historias\n\n¡Comparte tu experiencia paranormal!',
                 font_size=sp(16),
@@ -2385,6 +2719,39 @@ class ProfileScreen(Screen):
             )
             no_stories.bind(size=no_stories.setter('text_size'))
             self.content_layout.add_widget(no_stories)
+        elif self.stories_cursor:
+            # Si la página no llena la pantalla no habrá scroll: seguir pidiendo
+            Clock.schedule_once(lambda dt: self.check_near_end(self.scroll, self.scroll.scroll_y))
+
+    def build_story_container(self, story):
+        # Crear un layout especial para historias propias con botón de editar
+        story_container = BoxLayout(
+            orientation='vertical',
+            size_hint_y=None,
+            spacing=dp(5)
+        )
+        
+        # Agregar la tarjeta de historia
+        card = StoryCard(story, show_actions=False)
+        story_container.add_widget(card)
+        story_container.height = card.height + dp(45)
+        
+        # Agregar botón de editar para historias propias
+        edit_btn = Button(
+            text='[color=#FFD700]✏️[/color] Editar Historia',
+            size_hint_y=None,
+            height=dp(40),
+            background_normal='',
+            background_color=(0.3, 0.3, 0.4, 1),
+            color=(1, 1, 1, 1),
+            font_size=sp(14),
+            markup=True,
+            font_name='EmojiFont' if 'EmojiFont' in LabelBase._fonts else 'SegoeUIEmoji' if 'SegoeUIEmoji' in LabelBase._fonts else None
+        )
+        edit_btn.bind(on_press=lambda x, s=story: self.edit_story(s))
+        story_container.add_widget(edit_btn)
+        
+        return story_container
 
     def update_profile_bg(self, instance, value):
         self.profile_bg.pos = instance.pos
@@ -2400,44 +2767,138 @@ class ProfileScreen(Screen):
         app = App.get_running_app()
         if hasattr(app, 'current_user'):
             delattr(app, 'current_user')
+        app.check_notifications()
         self.manager.current = 'welcome'
 
 class ParanormalApp(App):
     def build(self):
         self.title = 'Historias Paranormales de Chile'
 
-        db = Database()
-        all_stories = db.get_all_stories(limit=1, offset=0)
-        if len(all_stories) == 0:
-            db.create_sample_data()
-
-        sm = ScreenManager(transition=NoTransition())
-        sm.add_widget(WelcomeScreen(name='welcome'))
-        sm.add_widget(LoginScreen(name='login'))
-        sm.add_widget(RegisterScreen(name='register'))
-        sm.add_widget(FeedScreen(name='feed'))
-        sm.add_widget(SearchScreen(name='search'))
-        sm.add_widget(CreateScreen(name='create'))
-        sm.add_widget(ProfileScreen(name='profile'))
-        sm.add_widget(StoryDetailScreen(name='story_detail'))
-        sm.add_widget(EditStoryScreen(name='edit_story'))
-        sm.add_widget(ReportScreen(name='report'))
-        sm.add_widget(NotificationsScreen(name='notifications'))
-
-        # Configurar el screen manager en todas las barras de navegación
-        self.setup_navbars(sm)
+        with Database() as db:
+            all_stories = db.get_all_stories(limit=1, offset=0)
+            if len(all_stories) == 0:
+                db.create_sample_data()
+            # Imágenes que ya no usa ninguna historia
+            self.media_store = MediaStore()
+            self.media_store.collect(db)
+
+        # Consultas de las pantallas fuera del hilo principal; likes,
+        # reacciones y comentarios se confirman en lotes
+        self.async_db = AsyncDatabase(Database(profile=os.environ.get('SOMBRAS_STORAGE_PROFILE')))
+        self.write_queue = WriteQueue(self.async_db.db)
+        # Likes y reacciones se ven al instante y se concilian al confirmarse
+        self.interactions = InteractionStore(self.write_queue, dispatch=clock_dispatch)
+        # Miniaturas en segundo plano; al arrancar, las que quedaron pendientes
+        self.thumbnails = ThumbnailWorker(self.async_db.db)
+        self.thumbnails.submit()
+
+        # SOMBRAS_SLOW_MS=50 activa la medición de consultas y el registro
+        # de consultas lentas (slow_queries.log)
+        slow_ms = os.environ.get('SOMBRAS_SLOW_MS')
+        if slow_ms:
+            self.async_db.db.enable_instrumentation(slow_ms=float(slow_ms), slow_log='slow_queries.log')
+
+        self.unread_notifications = 0
+        self.build_reports = deque(maxlen=200)
+
+        # Las pantallas se construyen al navegar a ellas por primera vez;
+        # al arrancar solo se paga WelcomeScreen. 'create' queda fija: guarda
+        # el borrador y puede tener una importación o publicación en curso
+        sm = LazyScreenManager(transition=NoTransition(), pinned=('welcome', 'feed', 'create'))
+        sm.register('welcome', WelcomeScreen)
+        sm.register('login', LoginScreen)
+        sm.register('register', RegisterScreen)
+        sm.register('feed', FeedScreen)
+        sm.register('search', SearchScreen)
+        sm.register('create', CreateScreen)
+        sm.register('profile', ProfileScreen)
+        sm.register('story_detail', StoryDetailScreen)
+        sm.register('edit_story', EditStoryScreen)
+        sm.register('report', ReportScreen)
+        sm.register('notifications', NotificationsScreen)
+
+        # Configurar el screen manager en las barras de navegación de cada
+        # pantalla nueva y liberar lo que tenga la que se descarta
+        sm.bind(on_screen_built=lambda manager, screen: self.setup_navbars(manager, [screen]))
+        sm.bind(on_screen_evicted=self.release_screen)
+        sm.current = 'welcome'
+
+        # Ante aviso de memoria baja (Android/iOS) se descartan las
+        # pantallas no usadas y la mitad del caché de texturas
+        Window.bind(on_memorywarning=self.on_memory_warning)
+
+        # Campana de notificaciones: consulta de una fila cada pocos segundos
+        Clock.schedule_interval(self.check_notifications, NOTIFICATION_CHECK_SECONDS)
 
         return sm
 
-    def setup_navbars(self, screen_manager):
-        """Configura el screen manager en todas las barras de navegación"""
-        for screen in screen_manager.screens:
-            if hasattr(screen, 'children'):
-                for child in screen.children:
-                    if isinstance(child, BoxLayout):
-                        for grandchild in child.children:
-                            if isinstance(grandchild, NavBar):
-                                grandchild.set_screen_manager(screen_manager)
+    def on_memory_warning(self, *args):
+        self.root.trim()
+        shared_cache.trim(shared_cache.budget // 2)
+
+    def build_report(self):
+        """Resumen por lista de los frames que tomó construir sus tarjetas"""
+        lists = {}
+        for report in self.build_reports:
+            lists.setdefault(report['name'], []).append(report)
+        lines = ['Construcción de listas (elementos / frames / ms):']
+        for name, reports in lists.items():
+            frames = [r['frames'] for r in reports]
+            lines.append(
+                f"  {name}: {len(reports)} cargas, {sum(r['items'] for r in reports)} elementos, "
+                f"{sum(frames) / len(frames):.1f} frames promedio, {max(frames)} máx, "
+                f"{sum(r['ms'] for r in reports):.1f} ms"
+            )
+        return '\n'.join(lines)
+
+    def check_notifications(self, *args):
+        if not hasattr(self, 'current_user'):
+            self.on_notification_status({'unread': 0, 'last_id': 0})
+            return
+        self.async_db.submit(
+            'get_notification_status', self.current_user['id'],
+            callback=self.on_notification_status, tag='notification_badge'
+        )
+
+    def on_notification_status(self, status):
+        if status['unread'] != self.unread_notifications:
+            self.unread_notifications = status['unread']
+            self.setup_navbars(self.root)
+
+        # Con la lista abierta, agregar lo que haya llegado
+        if self.root.current == 'notifications':
+            screen = self.root.get_screen('notifications')
+            if status['last_id'] > screen.last_id:
+                screen.load_new()
+
+    def on_stop(self):
+        self.write_queue.close()
+        self.thumbnails.close()
+        report = self.async_db.db.query_report()
+        if report:
+            # Solo con SOMBRAS_SLOW_MS: ambos resúmenes van juntos
+            print(report)
+            print(self.build_report())
+            print(shared_cache.report())
+        self.async_db.shutdown()
+
+    def setup_navbars(self, screen_manager, screens=None):
+        """Configura el screen manager en las barras de navegación.
+
+        Sin screens se recorren todas las pantallas ya construidas.
+        """
+        for screen in screens if screens is not None else screen_manager.screens:
+            for widget in screen.walk(restrict=True):
+                if isinstance(widget, NavBar):
+                    widget.set_screen_manager(screen_manager)
+                    widget.set_unread(self.unread_notifications)
+
+    def release_screen(self, screen_manager, screen):
+        """Cierra la conexión propia de una pantalla descartada"""
+        self.async_db.cancel_tag(screen.name)
+        db = getattr(screen, 'db', None)
+        if db is not None:
+            db.close()
 
 if __name__ == '__main__':
     ParanormalApp().run()
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Almacén de imágenes direccionado por contenido.
+
+Cada archivo se guarda una sola vez bajo el SHA-256 de sus bytes, en
+subcarpetas de dos niveles (``media/ab/cd/abcd....jpg``) para que ningún
+directorio acumule miles de entradas. La ruta se deriva del hash, así que
+buscar una imagen no requiere recorrer nada; dos fotos idénticas ocupan un
+solo archivo.
+
+La tabla ``media`` registra cada archivo y cuántas filas de
+``story_images`` lo usan (los triggers de la migración 9 mantienen
+``refcount``). ``collect`` borra los archivos que nadie referencia.
+
+``ImportJob`` hace la copia en un hilo aparte, con progreso y cancelación,
+para que elegir fotos grandes no congele la interfaz.
+"""
+import glob
+import hashlib
+import os
+import tempfile
+import threading
+
+CHUNK_SIZE = 1024 * 1024
+DEFAULT_ROOT = os.path.join(os.getcwd(), 'media')
+
+
+class ImportCancelled(Exception):
+    """La copia se canceló; el temporal ya se borró."""
+
+
+class MediaStore:
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+
+    def path_for(self, digest, ext=''):
+        return os.path.join(self.root, digest[:2], digest[2:4], digest + ext.lower())
+
+    def put(self, src, progress=None, cancel_event=None, known_path=None):
+        """Copia src al almacén y devuelve {'hash', 'path', 'size'}.
+
+        El hash se calcula mientras se copia a un temporal, en bloques de
+        tamaño fijo (la memoria usada no depende del tamaño del archivo);
+        si el contenido ya existía se descarta la copia. progress(copiados,
+        total) se llama tras cada bloque; si cancel_event se activa se
+        borra el temporal y se lanza ImportCancelled.
+
+        known_path(hash) devuelve la ruta ya registrada para ese contenido,
+        o None; así los mismos bytes con otra extensión (.JPG, .jpeg)
+        reutilizan el archivo existente.
+        """
+        ext = os.path.splitext(src)[1]
+        os.makedirs(self.root, exist_ok=True)
+        sha = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(prefix='.import-', dir=self.root)
+        try:
+            with open(src, 'rb') as fsrc, os.fdopen(fd, 'wb') as fdst:
+                total = os.fstat(fsrc.fileno()).st_size
+                while True:
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise ImportCancelled(src)
+                    chunk = fsrc.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    sha.update(chunk)
+                    fdst.write(chunk)
+                    size += len(chunk)
+                    if progress:
+                        progress(size, max(total, size))
+
+            digest = sha.hexdigest()
+            dest = (known_path(digest) if known_path else None) or self.path_for(digest, ext)
+            if os.path.exists(dest):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                os.replace(tmp_path, dest)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        return {'hash': digest, 'path': dest, 'size': size}
+
+    def import_file(self, db, src, progress=None, cancel_event=None):
+        """Guarda src y lo registra en la tabla media. Devuelve la ruta o None."""
+        try:
+            media = self.put(src, progress, cancel_event, known_path=lambda digest: (db.get_media(digest) or {}).get('path'))
+        except OSError as e:
+            print(f"Error copiando imagen: {e}")
+            return None
+        if not db.register_media(media['hash'], media['path'], media['size']):
+            return None
+        return media['path']
+
+    def collect(self, db, older_than_hours=24):
+        """Borra los archivos sin referencias; devuelve cuántos se borraron.
+
+        Solo se consideran los registrados hace más de older_than_hours, para
+        no tocar imágenes recién elegidas de una historia aún sin publicar.
+        """
+        removed = 0
+        for path in db.collect_orphan_media(older_than_hours):
+            # El original y sus derivados (<hash>.grid.jpg, ...) comparten prefijo
+            for file_path in glob.glob(glob.escape(os.path.splitext(path)[0]) + '.*'):
+                try:
+                    os.remove(file_path)
+                except OSError as e:
+                    print(f"Error borrando imagen {file_path}: {e}")
+            removed += 1
+        return removed
+
+
+class ImportJob:
+    """Importa varios archivos al almacén, de a uno, en un hilo aparte.
+
+    Los avisos llegan al hilo de la interfaz mediante dispatch:
+    on_progress(índice, fracción) a lo más una vez por punto porcentual,
+    on_file(índice, ruta o None) al terminar cada archivo y on_done(rutas)
+    al terminar todos. Tras cancel() no llega ningún aviso más.
+
+        job = ImportJob(store, db, fuentes, dispatch=clock_dispatch, on_file=...)
+        job.start()
+        ...
+        job.cancel()
+    """
+
+    def __init__(self, store, db, sources, dispatch, on_progress=None, on_file=None, on_done=None):
+        self.store = store
+        self.db = db
+        self.sources = list(sources)
+        self.dispatch = dispatch
+        self.on_progress = on_progress
+        self.on_file = on_file
+        self.on_done = on_done
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='media-import', daemon=True)
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+    def _run(self):
+        try:
+            self._import_all()
+        finally:
+            # El hilo termina aquí: su conexión no debe quedar abierta
+            self.db.release_connection()
+
+    def _import_all(self):
+        paths = []
+        for index, src in enumerate(self.sources):
+            last = [-1]
+
+            def progress(done, total, index=index, last=last):
+                percent = done * 100 // total if total else 100
+                if percent != last[0]:
+                    last[0] = percent
+                    self._emit(self.on_progress, index, percent / 100.0)
+
+            try:
+                path = self.store.import_file(self.db, src, progress, self._cancel)
+            except ImportCancelled:
+                return
+            paths.append(path)
+            self._emit(self.on_file, index, path)
+        self._emit(self.on_done, paths)
+
+    def _emit(self, callback, *args):
+        if callback is None:
+            return
+
+        def deliver():
+            # Un aviso ya encolado no se entrega si se canceló mientras tanto
+            if not self._cancel.is_set():
+                callback(*args)
+        self.dispatch(deliver)
@@ -0,0 +1,581 @@
+# -*- coding: utf-8 -*-
+"""
+Migraciones versionadas del esquema de Sombras de Chile.
+
+La versión del esquema se guarda en ``PRAGMA user_version``. Cada migración
+tiene un número correlativo y se aplica una sola vez, dentro de su propia
+transacción, junto con la actualización de ``user_version``. Cuando el
+esquema ya está al día, ``migrate`` solo lee ese PRAGMA.
+
+Para evolucionar una tabla se agrega una nueva función decorada con
+``@migration(N, 'descripción')`` al final de este archivo, usando los
+helpers ``add_column`` y ``rebuild_table`` en lugar de DDL ad-hoc.
+"""
+import sqlite3
+
+
+class Migration:
+    def __init__(self, version, description, apply):
+        self.version = version
+        self.description = description
+        self.apply = apply
+
+    def __repr__(self):
+        return f'Migration({self.version}, {self.description!r})'
+
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Registra una función como la migración número ``version``."""
+    def decorator(fn):
+        if any(m.version == version for m in MIGRATIONS):
+            raise ValueError(f'Migración duplicada: {version}')
+        MIGRATIONS.append(Migration(version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return fn
+    return decorator
+
+
+def latest_version():
+    return MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+def get_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn, target=None):
+    """Lleva el esquema hasta ``target`` (por defecto, la última versión).
+
+    Devuelve la versión final. Si ya está al día no ejecuta ningún DDL.
+    """
+    target = latest_version() if target is None else target
+    current = get_version(conn)
+    if current >= target:
+        return current
+
+    # Las claves foráneas solo se pueden desactivar fuera de una transacción;
+    # rebuild_table las necesita apagadas mientras reemplaza tablas.
+    foreign_keys = conn.execute('PRAGMA foreign_keys').fetchone()[0]
+    conn.execute('PRAGMA foreign_keys = OFF')
+    try:
+        for step in MIGRATIONS:
+            if step.version > target:
+                break
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                # Otro proceso pudo migrar mientras esperábamos el bloqueo
+                if get_version(conn) >= step.version:
+                    conn.rollback()
+                    continue
+                cursor = conn.cursor()
+                # Bases antiguas pueden traer filas huérfanas; solo se exige
+                # que la migración no agregue violaciones nuevas.
+                before = len(cursor.execute('PRAGMA foreign_key_check').fetchall())
+                step.apply(cursor)
+                after = len(cursor.execute('PRAGMA foreign_key_check').fetchall())
+                if after > before:
+                    raise sqlite3.IntegrityError(
+                        f'La migración {step.version} rompe claves foráneas: {after - before} filas'
+                    )
+                cursor.execute(f'PRAGMA user_version = {int(step.version)}')
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+    finally:
+        conn.execute(f'PRAGMA foreign_keys = {"ON" if foreign_keys else "OFF"}')
+    return get_version(conn)
+
+
+# ---------------------------------------------------------------------------
+# Helpers para escribir migraciones
+# ---------------------------------------------------------------------------
+
+def table_columns(cursor, table):
+    return [row[1] for row in cursor.execute(f'PRAGMA table_info({table})').fetchall()]
+
+
+def add_column(cursor, table, column, definition):
+    """Agrega una columna si aún no existe (ALTER TABLE ... ADD COLUMN)."""
+    if column in table_columns(cursor, table):
+        return False
+    cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+    return True
+
+
+def rebuild_table(cursor, table, create_sql, column_map=None):
+    """Reemplaza ``table`` por una nueva definición conservando sus datos.
+
+    Sigue el procedimiento recomendado por SQLite para cambios que ALTER TABLE
+    no soporta (cambiar restricciones, tipos o quitar columnas):
+    crea ``<table>__new`` con ``create_sql``, copia los datos, elimina la
+    tabla antigua y renombra la nueva. Los índices y triggers de la tabla
+    original se recrean si sus columnas siguen existiendo.
+
+    ``create_sql`` debe usar ``{table}`` como nombre de la tabla.
+    ``column_map`` permite indicar {columna_nueva: expresión_sobre_la_antigua};
+    por defecto se copian las columnas con el mismo nombre.
+    """
+    new_table = f'{table}__new'
+    cursor.execute(create_sql.format(table=new_table))
+
+    old_columns = table_columns(cursor, table)
+    new_columns = table_columns(cursor, new_table)
+    column_map = dict(column_map or {})
+    for column in new_columns:
+        if column not in column_map and column in old_columns:
+            column_map[column] = column
+
+    dependents = cursor.execute(
+        "SELECT type, name, sql FROM sqlite_master "
+        "WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL",
+        (table,)
+    ).fetchall()
+
+    if column_map:
+        targets = ', '.join(column_map.keys())
+        sources = ', '.join(column_map.values())
+        cursor.execute(f'INSERT INTO {new_table} ({targets}) SELECT {sources} FROM {table}')
+    cursor.execute(f'DROP TABLE {table}')
+    cursor.execute(f'ALTER TABLE {new_table} RENAME TO {table}')
+
+    for kind, name, sql in dependents:
+        try:
+            cursor.execute(sql)
+        except sqlite3.OperationalError as e:
+            print(f"No se pudo recrear {kind} {name} tras reconstruir {table}: {e}")
+
+
+def create_index(cursor, name, table, columns):
+    cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table}({columns})')
+
+
+# ---------------------------------------------------------------------------
+# Migraciones
+# ---------------------------------------------------------------------------
+
+@migration(1, 'Esquema inicial')
+def initial_schema(cursor):
+    # IF NOT EXISTS permite adoptar bases creadas antes de las migraciones
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS historias (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            content TEXT NOT NULL,
+            location TEXT,
+            category TEXT DEFAULT 'Aparición',
+            is_anonymous INTEGER DEFAULT 0,
+            photo_path TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES usuarios(id)
+        )
+    ''')
+    # Bases antiguas (ver shema.sql) no tenían categoría
+    add_column(cursor, 'historias', 'category', "TEXT DEFAULT 'Aparición'")
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS reacciones (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            story_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            tipo TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(story_id, user_id, tipo),
+            FOREIGN KEY (story_id) REFERENCES historias(id),
+            FOREIGN KEY (user_id) REFERENCES usuarios(id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS likes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            story_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(story_id, user_id),
+            FOREIGN KEY (story_id) REFERENCES historias(id),
+            FOREIGN KEY (user_id) REFERENCES usuarios(id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS comentarios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            story_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            content TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (story_id) REFERENCES historias(id),
+            FOREIGN KEY (user_id) REFERENCES usuarios(id)
+        )
+    ''')
+
+    # Tabla para múltiples imágenes por historia
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS story_images (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            story_id INTEGER NOT NULL,
+            path TEXT NOT NULL,
+            sort_order INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (story_id) REFERENCES historias(id)
+        )
+    ''')
+
+    # Tabla para reportes de contenido
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS reportes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            story_id INTEGER NOT NULL,
+            reporter_id INTEGER NOT NULL,
+            motivo TEXT NOT NULL,
+            descripcion TEXT,
+            estado TEXT DEFAULT 'pendiente',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (story_id) REFERENCES historias(id),
+            FOREIGN KEY (reporter_id) REFERENCES usuarios(id)
+        )
+    ''')
+
+    # Tabla para notificaciones
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS notificaciones (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            tipo TEXT NOT NULL,
+            titulo TEXT NOT NULL,
+            mensaje TEXT NOT NULL,
+            story_id INTEGER,
+            actor_id INTEGER,
+            leida INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES usuarios(id),
+            FOREIGN KEY (story_id) REFERENCES historias(id),
+            FOREIGN KEY (actor_id) REFERENCES usuarios(id)
+        )
+    ''')
+
+    # Índices útiles para rendimiento
+    create_index(cursor, 'idx_historias_created_at', 'historias', 'created_at')
+    create_index(cursor, 'idx_historias_category', 'historias', 'category')
+    create_index(cursor, 'idx_historias_location', 'historias', 'location')
+    create_index(cursor, 'idx_historias_user_id', 'historias', 'user_id')
+    create_index(cursor, 'idx_likes_story_id', 'likes', 'story_id')
+    create_index(cursor, 'idx_reacciones_story_id', 'reacciones', 'story_id')
+    create_index(cursor, 'idx_story_images_story_id', 'story_images', 'story_id')
+    create_index(cursor, 'idx_reportes_story_id', 'reportes', 'story_id')
+    create_index(cursor, 'idx_reportes_estado', 'reportes', 'estado')
+    create_index(cursor, 'idx_notificaciones_user_id', 'notificaciones', 'user_id')
+    create_index(cursor, 'idx_notificaciones_leida', 'notificaciones', 'leida')
+
+
+# Contadores desnormalizados por historia. Los triggers los mantienen
+# exactos ante cada INSERT/DELETE de likes, reacciones y comentarios.
+def rebuild_story_stats(cursor):
+    """Recalcula story_stats desde cero a partir de las tablas de interacción."""
+    cursor.execute('DELETE FROM story_stats')
+    cursor.execute('''
+        INSERT INTO story_stats (story_id, likes, miedo, sorpresa, incredulidad, comentarios)
+        SELECT h.id,
+               (SELECT COUNT(*) FROM likes WHERE story_id = h.id),
+               (SELECT COUNT(*) FROM reacciones WHERE story_id = h.id AND tipo = 'miedo'),
+               (SELECT COUNT(*) FROM reacciones WHERE story_id = h.id AND tipo = 'sorpresa'),
+               (SELECT COUNT(*) FROM reacciones WHERE story_id = h.id AND tipo = 'incredulidad'),
+               (SELECT COUNT(*) FROM comentarios WHERE story_id = h.id)
+        FROM historias h
+    ''')
+
+
+@migration(2, 'Contadores story_stats mantenidos por triggers')
+def story_stats(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS story_stats (
+            story_id INTEGER PRIMARY KEY,
+            likes INTEGER NOT NULL DEFAULT 0,
+            miedo INTEGER NOT NULL DEFAULT 0,
+            sorpresa INTEGER NOT NULL DEFAULT 0,
+            incredulidad INTEGER NOT NULL DEFAULT 0,
+            comentarios INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+
+    triggers = [
+        # Cada historia nueva nace con su fila de contadores
+        '''CREATE TRIGGER IF NOT EXISTS trg_story_stats_historia_insert
+           AFTER INSERT ON historias BEGIN
+               INSERT OR IGNORE INTO story_stats (story_id) VALUES (NEW.id);
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_story_stats_historia_delete
+           AFTER DELETE ON historias BEGIN
+               DELETE FROM story_stats WHERE story_id = OLD.id;
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_story_stats_like_insert
+           AFTER INSERT ON likes BEGIN
+               UPDATE story_stats SET likes = likes + 1 WHERE story_id = NEW.story_id;
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_story_stats_like_delete
+           AFTER DELETE ON likes BEGIN
+               UPDATE story_stats SET likes = likes - 1 WHERE story_id = OLD.story_id;
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_story_stats_reaccion_insert
+           AFTER INSERT ON reacciones BEGIN
+               UPDATE story_stats
+               SET miedo = miedo + (NEW.tipo = 'miedo'),
+                   sorpresa = sorpresa + (NEW.tipo = 'sorpresa'),
+                   incredulidad = incredulidad + (NEW.tipo = 'incredulidad')
+               WHERE story_id = NEW.story_id;
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_story_stats_reaccion_delete
+           AFTER DELETE ON reacciones BEGIN
+               UPDATE story_stats
+               SET miedo = miedo - (OLD.tipo = 'miedo'),
+                   sorpresa = sorpresa - (OLD.tipo = 'sorpresa'),
+                   incredulidad = incredulidad - (OLD.tipo = 'incredulidad')
+               WHERE story_id = OLD.story_id;
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_story_stats_reaccion_update
+           AFTER UPDATE OF tipo, story_id ON reacciones BEGIN
+               UPDATE story_stats
+               SET miedo = miedo - (OLD.tipo = 'miedo'),
+                   sorpresa = sorpresa - (OLD.tipo = 'sorpresa'),
+                   incredulidad = incredulidad - (OLD.tipo = 'incredulidad')
+               WHERE story_id = OLD.story_id;
+               UPDATE story_stats
+               SET miedo = miedo + (NEW.tipo = 'miedo'),
+                   sorpresa = sorpresa + (NEW.tipo = 'sorpresa'),
+                   incredulidad = incredulidad + (NEW.tipo = 'incredulidad')
+               WHERE story_id = NEW.story_id;
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_story_stats_comentario_insert
+           AFTER INSERT ON comentarios BEGIN
+               UPDATE story_stats SET comentarios = comentarios + 1 WHERE story_id = NEW.story_id;
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_story_stats_comentario_delete
+           AFTER DELETE ON comentarios BEGIN
+               UPDATE story_stats SET comentarios = comentarios - 1 WHERE story_id = OLD.story_id;
+           END''',
+    ]
+    for sql in triggers:
+        cursor.execute(sql)
+
+    rebuild_story_stats(cursor)
+
+
+@migration(3, 'Índice compuesto para paginación por cursor del feed')
+def feed_keyset_index(cursor):
+    # (created_at, id) desempata historias publicadas en el mismo segundo;
+    # el índice simple sobre created_at queda cubierto por este.
+    create_index(cursor, 'idx_historias_created_at_id', 'historias', 'created_at DESC, id DESC')
+    cursor.execute('DROP INDEX IF EXISTS idx_historias_created_at')
+
+
+def has_fts5(cursor):
+    """Indica si el SQLite enlazado incluye el módulo FTS5."""
+    try:
+        cursor.execute('CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)')
+        cursor.execute('DROP TABLE temp.fts5_probe')
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+@migration(4, 'Índice de texto completo FTS5 sobre historias')
+def historias_fts(cursor):
+    if not has_fts5(cursor):
+        # search_stories detecta la ausencia de la tabla y usa LIKE
+        print('SQLite sin FTS5: la búsqueda usará LIKE')
+        return
+
+    # remove_diacritics 2 hace que "Chiloe" encuentre "Chiloé"; los índices
+    # de prefijo evitan recorrer todo el vocabulario en búsquedas "fan"*
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS historias_fts USING fts5(
+            content, location, category,
+            content='historias', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    ''')
+
+    triggers = [
+        '''CREATE TRIGGER IF NOT EXISTS trg_historias_fts_insert
+           AFTER INSERT ON historias BEGIN
+               INSERT INTO historias_fts (rowid, content, location, category)
+               VALUES (NEW.id, NEW.content, NEW.location, NEW.category);
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_historias_fts_delete
+           AFTER DELETE ON historias BEGIN
+               INSERT INTO historias_fts (historias_fts, rowid, content, location, category)
+               VALUES ('delete', OLD.id, OLD.content, OLD.location, OLD.category);
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_historias_fts_update
+           AFTER UPDATE OF content, location, category ON historias BEGIN
+               INSERT INTO historias_fts (historias_fts, rowid, content, location, category)
+               VALUES ('delete', OLD.id, OLD.content, OLD.location, OLD.category);
+               INSERT INTO historias_fts (rowid, content, location, category)
+               VALUES (NEW.id, NEW.content, NEW.location, NEW.category);
+           END''',
+    ]
+    for sql in triggers:
+        cursor.execute(sql)
+
+    cursor.execute("INSERT INTO historias_fts (historias_fts) VALUES ('rebuild')")
+
+
+# Caracteres de la historia que muestran las tarjetas del feed
+PREVIEW_LENGTH = 180
+
+PREVIEW_SQL = (
+    f"CASE WHEN length(NEW.content) > {PREVIEW_LENGTH} "
+    f"THEN substr(NEW.content, 1, {PREVIEW_LENGTH}) || '...' ELSE NEW.content END"
+)
+
+
+@migration(5, 'Columna preview para las tarjetas del feed')
+def historias_preview(cursor):
+    add_column(cursor, 'historias', 'preview', 'TEXT')
+    cursor.execute(f"UPDATE historias SET preview = {PREVIEW_SQL.replace('NEW.', '')}")
+
+    triggers = [
+        f'''CREATE TRIGGER IF NOT EXISTS trg_historias_preview_insert
+            AFTER INSERT ON historias BEGIN
+                UPDATE historias SET preview = {PREVIEW_SQL} WHERE id = NEW.id;
+            END''',
+        f'''CREATE TRIGGER IF NOT EXISTS trg_historias_preview_update
+            AFTER UPDATE OF content ON historias BEGIN
+                UPDATE historias SET preview = {PREVIEW_SQL} WHERE id = NEW.id;
+            END''',
+    ]
+    for sql in triggers:
+        cursor.execute(sql)
+
+    # Índice que cubre todas las columnas de la tarjeta: el feed se lee sin
+    # tocar la tabla, así que el contenido completo (y sus páginas de
+    # desbordamiento) nunca se carga. Reemplaza al índice del cursor.
+    create_index(
+        cursor, 'idx_historias_feed_card', 'historias',
+        'created_at DESC, id DESC, user_id, is_anonymous, category, location, preview'
+    )
+    cursor.execute('DROP INDEX IF EXISTS idx_historias_created_at_id')
+
+
+@migration(6, 'Índice para paginar comentarios por historia')
+def comentarios_keyset_index(cursor):
+    # Cada página de comentarios es un rango del índice, sin ordenar en memoria
+    create_index(cursor, 'idx_comentarios_story_created_id', 'comentarios', 'story_id, created_at DESC, id DESC')
+
+
+# Contador de notificaciones no leídas por usuario y la última recibida:
+# la campana de la barra los consulta periódicamente leyendo una sola fila.
+def rebuild_notification_stats(cursor):
+    """Recalcula notification_stats a partir de notificaciones."""
+    cursor.execute('DELETE FROM notification_stats')
+    cursor.execute('''
+        INSERT INTO notification_stats (user_id, unread, last_id)
+        SELECT user_id, SUM(leida IS 0), MAX(id)
+        FROM notificaciones
+        GROUP BY user_id
+    ''')
+
+
+@migration(7, 'Contador de notificaciones no leídas por usuario')
+def notification_stats(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS notification_stats (
+            user_id INTEGER PRIMARY KEY,
+            unread INTEGER NOT NULL DEFAULT 0,
+            last_id INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+
+    triggers = [
+        # IS en lugar de = para que un leida NULL cuente como leída, igual
+        # que el COUNT(*) ... WHERE leida = 0 anterior, sin dejar NULL
+        '''CREATE TRIGGER IF NOT EXISTS trg_notification_stats_insert
+           AFTER INSERT ON notificaciones BEGIN
+               INSERT OR IGNORE INTO notification_stats (user_id) VALUES (NEW.user_id);
+               UPDATE notification_stats
+               SET unread = unread + (NEW.leida IS 0),
+                   last_id = MAX(last_id, NEW.id)
+               WHERE user_id = NEW.user_id;
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_notification_stats_delete
+           AFTER DELETE ON notificaciones BEGIN
+               UPDATE notification_stats SET unread = unread - (OLD.leida IS 0)
+               WHERE user_id = OLD.user_id;
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_notification_stats_update
+           AFTER UPDATE OF leida, user_id ON notificaciones BEGIN
+               UPDATE notification_stats SET unread = unread - (OLD.leida IS 0)
+               WHERE user_id = OLD.user_id;
+               INSERT OR IGNORE INTO notification_stats (user_id) VALUES (NEW.user_id);
+               UPDATE notification_stats SET unread = unread + (NEW.leida IS 0)
+               WHERE user_id = NEW.user_id;
+           END''',
+    ]
+    for sql in triggers:
+        cursor.execute(sql)
+
+    rebuild_notification_stats(cursor)
+
+
+@migration(8, 'Índice para paginar las historias de un autor')
+def user_stories_keyset_index(cursor):
+    # Reemplaza al índice simple sobre user_id, que queda cubierto por este
+    create_index(cursor, 'idx_historias_user_created_id', 'historias', 'user_id, created_at DESC, id DESC')
+    cursor.execute('DROP INDEX IF EXISTS idx_historias_user_id')
+
+
+@migration(9, 'Tabla media con conteo de referencias desde story_images')
+def media_store(cursor):
+    # Un archivo por contenido (ver media_store.py); refcount cuenta las
+    # filas de story_images que lo usan y lo mantienen los triggers
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS media (
+            hash TEXT PRIMARY KEY,
+            path TEXT NOT NULL UNIQUE,
+            size INTEGER NOT NULL DEFAULT 0,
+            refcount INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    add_column(cursor, 'story_images', 'media_hash', 'TEXT')
+    create_index(cursor, 'idx_story_images_media_hash', 'story_images', 'media_hash')
+    create_index(cursor, 'idx_media_refcount', 'media', 'refcount, created_at')
+
+    triggers = [
+        '''CREATE TRIGGER IF NOT EXISTS trg_media_ref_insert
+           AFTER INSERT ON story_images WHEN NEW.media_hash IS NOT NULL BEGIN
+               UPDATE media SET refcount = refcount + 1 WHERE hash = NEW.media_hash;
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_media_ref_delete
+           AFTER DELETE ON story_images WHEN OLD.media_hash IS NOT NULL BEGIN
+               UPDATE media SET refcount = refcount - 1 WHERE hash = OLD.media_hash;
+           END''',
+    ]
+    for sql in triggers:
+        cursor.execute(sql)
+
+
+@migration(10, 'Tamaño y miniaturas de cada imagen en story_images')
+def story_image_variants(cursor):
+    # width queda NULL hasta que ThumbnailWorker procesa la imagen (0 si no
+    # se pudo leer); las rutas NULL indican que se usa el original
+    add_column(cursor, 'story_images', 'width', 'INTEGER')
+    add_column(cursor, 'story_images', 'height', 'INTEGER')
+    add_column(cursor, 'story_images', 'grid_path', 'TEXT')
+    add_column(cursor, 'story_images', 'carousel_path', 'TEXT')
+    add_column(cursor, 'story_images', 'full_path', 'TEXT')
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+Instrumentación de consultas SQL.
+
+Cuando está activa (Database.enable_instrumentation), cada sentencia
+ejecutada por las conexiones de la base registra: número de llamadas,
+latencia total/media/p95/p99, filas devueltas y el método público de
+Database que la originó. Las sentencias que superan ``slow_ms`` se guardan
+en un registro de consultas lentas junto con su EXPLAIN QUERY PLAN.
+
+Desactivada no tiene costo: las conexiones crean cursores normales.
+
+    stats = db.enable_instrumentation(slow_ms=50, slow_log='slow_queries.log')
+    ...
+    print(stats.format_report())
+"""
+import math
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+# Muestras de latencia que se conservan por sentencia para los percentiles
+MAX_SAMPLES = 1000
+
+_EXPLAINABLE = re.compile(r'^\s*(SELECT|INSERT|UPDATE|DELETE|WITH|REPLACE)\b', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """Colapsa espacios para agrupar la misma sentencia escrita en varias líneas."""
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    # Método del rango más cercano
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class Execution:
+    """Una ejecución de una sentencia; el tiempo de fetch se suma después."""
+    __slots__ = ('seconds', 'rows', 'logged')
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.rows = 0
+        self.logged = False
+
+
+class StatementStats:
+    def __init__(self, sql):
+        self.sql = sql
+        self.calls = 0
+        self.total = 0.0
+        self.rows = 0
+        self.methods = {}
+        self.samples = deque(maxlen=MAX_SAMPLES)
+
+
+class QueryStats:
+    """Acumula estadísticas por sentencia. Es seguro usarlo desde varios hilos."""
+
+    def __init__(self, slow_ms=100, slow_log=None, source_file=None, owner='Database'):
+        self.slow_ms = slow_ms
+        self.slow_log = slow_log
+        # Archivo y clase cuyos métodos públicos se reportan como origen
+        self.source_file = source_file
+        self.owner = owner + '.'
+        self.slow_queries = deque(maxlen=200)
+        self._lock = threading.Lock()
+        self._statements = {}
+
+    def caller(self):
+        """Primer método público de Database en la pila (o '?')."""
+        frame = sys._getframe(2)
+        while frame is not None:
+            code = frame.f_code
+            if code.co_filename == self.source_file and not code.co_name.startswith('_'):
+                qualname = getattr(code, 'co_qualname', self.owner + code.co_name)
+                if qualname.startswith(self.owner):
+                    return code.co_name
+            frame = frame.f_back
+        return '?'
+
+    def record(self, sql, seconds, method):
+        key = normalize_sql(sql)
+        execution = Execution(seconds)
+        with self._lock:
+            stats = self._statements.get(key)
+            if stats is None:
+                stats = self._statements[key] = StatementStats(key)
+            stats.calls += 1
+            stats.total += seconds
+            stats.methods[method] = stats.methods.get(method, 0) + 1
+            stats.samples.append(execution)
+        return key, execution
+
+    def add_fetch(self, key, execution, seconds, rows):
+        with self._lock:
+            stats = self._statements.get(key)
+            if stats is None:
+                return
+            stats.total += seconds
+            stats.rows += rows
+        execution.seconds += seconds
+        execution.rows += rows
+
+    def is_slow(self, execution):
+        return not execution.logged and execution.seconds * 1000 >= self.slow_ms
+
+    def log_slow(self, conn, sql, params, execution, method):
+        """Guarda la sentencia lenta con su plan de ejecución."""
+        execution.logged = True
+        plan = []
+        if _EXPLAINABLE.match(sql):
+            try:
+                # Cursor sin instrumentar: el plan no cuenta como consulta
+                cursor = sqlite3.Connection.cursor(conn)
+                plan = [row[-1] for row in cursor.execute('EXPLAIN QUERY PLAN ' + sql, params).fetchall()]
+            except Exception as e:
+                plan = [f'(sin plan: {e})']
+
+        entry = {
+            'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'ms': round(execution.seconds * 1000, 2),
+            'method': method,
+            'sql': normalize_sql(sql),
+            'plan': plan,
+        }
+        with self._lock:
+            self.slow_queries.append(entry)
+
+        if self.slow_log:
+            try:
+                with open(self.slow_log, 'a', encoding='utf-8') as f:
+                    f.write(f"{entry['time']} {entry['ms']}ms {entry['method']}: {entry['sql']}\n")
+                    for line in plan:
+                        f.write(f"    {line}\n")
+            except OSError as e:
+                print(f"Error al escribir el registro de consultas lentas: {e}")
+
+    def report(self):
+        """Lista de estadísticas por sentencia, de mayor a menor tiempo total."""
+        with self._lock:
+            statements = list(self._statements.values())
+            rows = []
+            for stats in statements:
+                latencies = [e.seconds * 1000 for e in stats.samples]
+                rows.append({
+                    'sql': stats.sql,
+                    'calls': stats.calls,
+                    'total_ms': round(stats.total * 1000, 3),
+                    'mean_ms': round(stats.total * 1000 / stats.calls, 3) if stats.calls else 0.0,
+                    'p95_ms': round(percentile(latencies, 95), 3),
+                    'p99_ms': round(percentile(latencies, 99), 3),
+                    'rows': stats.rows,
+                    'methods': dict(stats.methods),
+                })
+        rows.sort(key=lambda r: r['total_ms'], reverse=True)
+        return rows
+
+    def format_report(self, limit=20):
+        """Resumen legible de las sentencias más costosas."""
+        lines = [f"{'total ms':>10} {'llamadas':>8} {'media':>8} {'p95':>8} {'p99':>8} {'filas':>8}  método / sentencia"]
+        for row in self.report()[:limit]:
+            methods = ', '.join(f'{name}×{count}' for name, count in sorted(row['methods'].items()))
+            lines.append(
+                f"{row['total_ms']:>10.2f} {row['calls']:>8} {row['mean_ms']:>8.3f} "
+                f"{row['p95_ms']:>8.3f} {row['p99_ms']:>8.3f} {row['rows']:>8}  {methods}"
+            )
+            lines.append(f"{'':>56}{row['sql'][:120]}")
+        return '\n'.join(lines)
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+            self.slow_queries.clear()
+
+
+class InstrumentedCursor:
+    """Envoltorio de sqlite3.Cursor que mide execute y fetch*."""
+
+    def __init__(self, cursor, stats):
+        self._cursor = cursor
+        self._stats = stats
+        self._key = None
+        self._execution = None
+        self._sql = None
+        self._params = ()
+        self._method = '?'
+
+    def execute(self, sql, parameters=()):
+        method = self._stats.caller()
+        start = time.perf_counter()
+        self._cursor.execute(sql, parameters)
+        elapsed = time.perf_counter() - start
+        self._sql, self._params, self._method = sql, parameters, method
+        self._key, self._execution = self._stats.record(sql, elapsed, method)
+        self._check_slow()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        method = self._stats.caller()
+        start = time.perf_counter()
+        self._cursor.executemany(sql, seq_of_parameters)
+        elapsed = time.perf_counter() - start
+        self._sql, self._params, self._method = sql, None, method
+        self._key, self._execution = self._stats.record(sql, elapsed, method)
+        self._check_slow()
+        return self
+
+    def executescript(self, script):
+        method = self._stats.caller()
+        start = time.perf_counter()
+        self._cursor.executescript(script)
+        self._key, self._execution = self._stats.record(script, time.perf_counter() - start, method)
+        self._sql = None
+        return self
+
+    def _fetch(self, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+        if self._execution is not None:
+            if isinstance(result, list):
+                rows = len(result)
+            else:
+                rows = 0 if result is None else 1
+            self._stats.add_fetch(self._key, self._execution, elapsed, rows)
+            self._check_slow()
+        return result
+
+    def fetchone(self):
+        return self._fetch(self._cursor.fetchone)
+
+    def fetchmany(self, size=None):
+        if size is None:
+            return self._fetch(self._cursor.fetchmany)
+        return self._fetch(self._cursor.fetchmany, size)
+
+    def fetchall(self):
+        return self._fetch(self._cursor.fetchall)
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def _check_slow(self):
+        if self._sql is not None and self._stats.is_slow(self._execution):
+            params = self._params if self._params is not None else ()
+            self._stats.log_slow(self._cursor.connection, self._sql, params, self._execution, self._method)
+
+    def __getattr__(self, name):
+        # lastrowid, rowcount, description, close, connection...
+        return getattr(self._cursor, name)
@@ -22,6 +22,7 @@ def temp_db():
     yield db
     
     # Limpiar después de las pruebas
+    db.close()
     try:
         shutil.rmtree(temp_dir)
     except Exception:
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas para la fachada asíncrona de la base de datos
+"""
+import asyncio
+import threading
+import pytest
+from async_db import AsyncDatabase
+
+
+class TestAsyncDatabase:
+    """Clase de pruebas para AsyncDatabase"""
+
+    def make_async(self, db):
+        # Simula el Clock de Kivy: los callbacks se encolan y se ejecutan con frame()
+        self.queue = []
+        return AsyncDatabase(db, dispatch=self.queue.append)
+
+    def frame(self):
+        queue, self.queue[:] = list(self.queue), []
+        for fn in queue:
+            fn()
+
+    def test_callback_runs_on_dispatch(self, temp_db, sample_user_data):
+        """Prueba que la consulta corre en un worker y el resultado llega por dispatch"""
+        temp_db.create_user(
+            sample_user_data['username'],
+            sample_user_data['email'],
+            sample_user_data['password']
+        )
+        async_db = self.make_async(temp_db)
+        results = []
+
+        request = async_db.submit(
+            'login_user', sample_user_data['username'], sample_user_data['password'],
+            callback=results.append
+        )
+        request.result(timeout=5)
+
+        assert results == []  # nada se entrega fuera del "frame"
+        self.frame()
+        assert results[0]['username'] == sample_user_data['username']
+        assert async_db.pending() == 0
+        async_db.shutdown()
+
+    def test_query_runs_off_calling_thread(self, temp_db):
+        """Prueba que la consulta no se ejecuta en el hilo que la pide"""
+        async_db = self.make_async(temp_db)
+        request = async_db.run(threading.get_ident)
+        assert request.result(timeout=5) != threading.get_ident()
+        async_db.shutdown()
+
+    def test_cancel_tag_discards_result(self, temp_db):
+        """Prueba que cancelar por etiqueta descarta resultados aún no entregados"""
+        async_db = self.make_async(temp_db)
+        results = []
+
+        request = async_db.submit('get_all_stories', callback=results.append, tag='feed')
+        request.result(timeout=5)
+
+        assert async_db.cancel_tag('feed') == 1
+        self.frame()
+        assert results == []
+        assert request.cancelled
+        async_db.shutdown()
+
+    def test_error_goes_to_on_error(self, temp_db):
+        """Prueba que una excepción en el worker llega a on_error"""
+        async_db = self.make_async(temp_db)
+        errors = []
+
+        def fail():
+            raise ValueError('falla')
+
+        request = async_db.run(fail, callback=lambda r: None, on_error=errors.append)
+        with pytest.raises(ValueError):
+            request.result(timeout=5)
+        self.frame()
+        assert isinstance(errors[0], ValueError)
+        async_db.shutdown()
+
+    def test_request_is_awaitable(self, temp_db):
+        """Prueba que una petición se puede esperar con await"""
+        async_db = self.make_async(temp_db)
+
+        async def load():
+            return await async_db.submit('get_all_stories')
+
+        assert asyncio.run(load()) == []
+        async_db.shutdown()
@@ -98,7 +98,7 @@ class TestDatabase:
         # Verificar que la historia se guardó
         stories = temp_db.get_all_stories(limit=10, offset=0)
         assert len(stories) == 1
-        assert stories[0]['content'] == sample_story_data['content']
+        assert temp_db.get_story_by_id(stories[0]['id'])['content'] == sample_story_data['content']
         assert stories[0]['location'] == sample_story_data['location']
         assert stories[0]['category'] == sample_story_data['category']
     
@@ -130,7 +130,7 @@ class TestDatabase:
         # Buscar por contenido
         results = temp_db.search_stories('fantasmas')
         assert len(results) == 1
-        assert 'fantasmas' in results[0]['content'].lower()
+        assert 'fantasmas' in results[0]['preview'].lower()
         
         # Buscar por ubicación
         results = temp_db.search_stories('Santiago')
@@ -274,7 +274,7 @@ class TestDatabase:
         
         # Verificar actualización
         stories = temp_db.get_all_stories(limit=1, offset=0)
-        assert stories[0]['content'] == new_content
+        assert temp_db.get_story_by_id(stories[0]['id'])['content'] == new_content
         assert stories[0]['location'] == new_location
         assert stories[0]['category'] == new_category
         assert stories[0]['is_anonymous'] == 1
@@ -365,3 +365,86 @@ class TestDatabase:
         # Marcar todas como leídas
         result = temp_db.mark_all_notifications_as_read(user['id'])
         assert result is True
+    
+    def test_notification_counter_and_delta(self, temp_db, sample_user_data):
+        """Prueba el contador de no leídas y la consulta de notificaciones nuevas"""
+        temp_db.create_user(
+            sample_user_data['username'],
+            sample_user_data['email'],
+            sample_user_data['password']
+        )
+        user = temp_db.login_user(sample_user_data['username'], sample_user_data['password'])
+        assert temp_db.get_notification_status(user['id']) == {'unread': 0, 'last_id': 0}
+        
+        for i in range(3):
+            temp_db.create_notification(user['id'], 'like', f'Aviso {i}', 'Mensaje')
+        status = temp_db.get_notification_status(user['id'])
+        assert status['unread'] == 3
+        assert temp_db.get_unread_notifications_count(user['id']) == 3
+        
+        # Solo las posteriores a la última que ya se mostró
+        first = temp_db.get_notifications_since(user['id'])
+        assert [n['titulo'] for n in first] == ['Aviso 2', 'Aviso 1', 'Aviso 0']
+        assert first[0]['id'] == status['last_id']
+        temp_db.create_notification(user['id'], 'comment', 'Aviso 3', 'Mensaje')
+        new = temp_db.get_notifications_since(user['id'], since_id=status['last_id'])
+        assert [n['titulo'] for n in new] == ['Aviso 3']
+        
+        # Marcar como leída (dos veces) descuenta una sola vez
+        temp_db.mark_notification_as_read(first[0]['id'], user['id'])
+        temp_db.mark_notification_as_read(first[0]['id'], user['id'])
+        assert temp_db.get_unread_notifications_count(user['id']) == 3
+        temp_db.mark_all_notifications_as_read(user['id'])
+        assert temp_db.get_notification_status(user['id']) == {'unread': 0, 'last_id': new[0]['id']}
+    
+    def test_connection_reuse(self, temp_db):
+        """Prueba que cada hilo reutiliza su propia conexión persistente"""
+        import threading
+        
+        conn = temp_db.get_connection()
+        assert temp_db.get_connection() is conn
+        
+        # Otro hilo obtiene una conexión distinta
+        other = []
+        thread = threading.Thread(target=lambda: other.append(temp_db.get_connection()))
+        thread.start()
+        thread.join()
+        assert other[0] is not conn
+        
+        # Si alguien cierra la conexión, el gestor abre una nueva
+        conn.close()
+        new_conn = temp_db.get_connection()
+        assert new_conn is not conn
+        assert new_conn.execute('PRAGMA foreign_keys').fetchone()[0] == 1
+        
+        # close() cierra todas las conexiones de la instancia
+        temp_db.close()
+        assert new_conn.closed
+        assert other[0].closed
+
+    def test_storage_profiles(self, temp_db, sample_user_data):
+        """Prueba que los perfiles de almacenamiento aplican sus PRAGMAs"""
+        import sqlite3
+
+        conn = temp_db.get_connection()
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1  # NORMAL
+
+        with Database(db_name=temp_db.db_name, profile='throughput') as db:
+            conn = db.get_connection()
+            assert conn.execute('PRAGMA temp_store').fetchone()[0] == 2  # MEMORY
+            assert conn.execute('PRAGMA cache_size').fetchone()[0] == -65536
+
+        # El perfil de invitado lee pero no escribe
+        temp_db.create_user(
+            sample_user_data['username'],
+            sample_user_data['email'],
+            sample_user_data['password']
+        )
+        with Database(db_name=temp_db.db_name, profile='read-only-guest') as guest:
+            assert guest.login_user(sample_user_data['username'], sample_user_data['password'])
+            with pytest.raises(sqlite3.OperationalError):
+                guest.create_user('otro', 'otro@example.com', 'password123')
+
+        with pytest.raises(ValueError):
+            Database(db_name=temp_db.db_name, profile='inexistente')
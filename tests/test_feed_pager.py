@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas para la ventana de páginas del scroll infinito
+"""
+import pytest
+from feed_pager import FeedPager
+
+
+@pytest.fixture
+def feed_setup(temp_db):
+    """Veinticinco historias y una vista simulada con la lista visible"""
+    temp_db.create_user('autor', 'autor@example.com', 'password123')
+    author = temp_db.login_user('autor', 'password123')
+    for i in range(25):
+        temp_db.create_story(author['id'], f'Historia {i}', 'Chiloé', 'Leyenda')
+
+    visible = []
+
+    def fetch(cursor, limit, callback, on_error):
+        callback(temp_db.get_stories_page(cursor=cursor, limit=limit))
+
+    pager = FeedPager(fetch, page_size=5, max_pages=3)
+    pager.on_append = lambda stories: visible.extend(s['id'] for s in stories)
+    pager.on_prepend = lambda stories: visible.__setitem__(slice(0, 0), [s['id'] for s in stories])
+    pager.on_drop_front = lambda count: visible.__delitem__(slice(0, count))
+    pager.on_drop_back = lambda count: visible.__delitem__(slice(len(visible) - count, None))
+    return pager, visible
+
+
+class TestFeedPager:
+    """Clase de pruebas para FeedPager"""
+
+    def test_window_is_bounded(self, temp_db, feed_setup):
+        """Prueba que nunca se guardan más de max_pages páginas"""
+        pager, visible = feed_setup
+        while pager.load_next():
+            assert len(visible) <= 15
+
+        assert not pager.has_next
+        assert pager.has_previous
+        assert len(visible) == 15
+        # Quedan las últimas tres páginas, sin huecos ni repetidos
+        all_ids = [s['id'] for s in temp_db.get_stories_page(limit=25)[0]]
+        assert visible == all_ids[10:]
+
+    def test_previous_page_reloads(self, temp_db, feed_setup):
+        """Prueba que al volver hacia arriba se recupera la página descartada"""
+        pager, visible = feed_setup
+        for _ in range(4):
+            pager.load_next()
+        assert pager.first == 1
+
+        assert pager.load_previous()
+        all_ids = [s['id'] for s in temp_db.get_stories_page(limit=25)[0]]
+        assert visible == all_ids[:15]
+        assert pager.has_next
+        assert not pager.has_previous
+
+    def test_reset_ignores_stale_results(self, temp_db, feed_setup):
+        """Prueba que una página que llega después de reset se descarta"""
+        pager, visible = feed_setup
+        callbacks = []
+        pager.fetch = lambda cursor, limit, callback, on_error: callbacks.append(callback)
+
+        pager.load_next()
+        assert not pager.load_next()  # ya hay una página en curso
+        pager.reset()
+        callbacks[0](temp_db.get_stories_page(limit=5))
+
+        assert visible == []
+        assert pager.loading is None
@@ -40,7 +40,7 @@ class TestIntegration:
         # 4. Verificar que la historia se creó
         stories = temp_db.get_all_stories(limit=10, offset=0)
         assert len(stories) == 1
-        assert stories[0]['content'] == story_content
+        assert temp_db.get_story_by_id(stories[0]['id'])['content'] == story_content
         
         # 5. Agregar interacciones
         story_id = stories[0]['id']
@@ -174,7 +174,7 @@ class TestIntegration:
         
         # Verificar actualización
         stories = temp_db.get_all_stories(limit=1, offset=0)
-        assert stories[0]['content'] == new_content
+        assert temp_db.get_story_by_id(stories[0]['id'])['content'] == new_content
         assert stories[0]['location'] == new_location
         assert stories[0]['category'] == new_category
         assert stories[0]['is_anonymous'] == 1
@@ -257,7 +257,7 @@ class TestIntegration:
         # Búsqueda por contenido
         results = temp_db.search_stories('fantasmas')
         assert len(results) == 1
-        assert 'fantasmas' in results[0]['content'].lower()
+        assert 'fantasmas' in results[0]['preview'].lower()
         
         # Búsqueda por ubicación
         results = temp_db.search_stories('Santiago')
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas para el estado optimista de likes y reacciones
+"""
+import pytest
+from interactions import InteractionStore
+from write_queue import WriteQueue
+
+
+@pytest.fixture
+def store_setup(temp_db):
+    """Lector, una historia y una cola que solo confirma al cerrarse"""
+    temp_db.create_user('autor', 'autor@example.com', 'password123')
+    temp_db.create_user('lector', 'lector@example.com', 'password123')
+    author = temp_db.login_user('autor', 'password123')
+    reader = temp_db.login_user('lector', 'password123')
+    temp_db.create_story(author['id'], 'Historia optimista', 'Iquique', 'Leyenda')
+    story = temp_db.get_all_stories()[0]
+    queue = WriteQueue(temp_db, flush_interval=10)
+    # Despacho síncrono: la conciliación corre apenas termina el lote
+    store = InteractionStore(queue, dispatch=lambda fn: fn())
+    store.seed(story)
+    return store, queue, reader, story
+
+
+class TestInteractionStore:
+    """Clase de pruebas para InteractionStore"""
+
+    def test_optimistic_like_then_reconcile(self, temp_db, store_setup):
+        """Prueba que el like se ve antes de confirmarse y luego se concilia"""
+        store, queue, reader, story = store_setup
+        seen = []
+        store.subscribe(lambda story_id, values: seen.append(values), story['id'])
+
+        assert store.like(story['id'], reader['id']) is True
+        values = seen[-1]
+        assert values['likes'] == 1
+        assert values['liked'] is True
+        assert values['pending'] is True
+
+        # Un segundo toque no genera otra escritura
+        assert store.like(story['id'], reader['id']) is False
+
+        queue.close()
+        values = seen[-1]
+        assert values['likes'] == 1
+        assert values['liked'] is True
+        assert values['pending'] is False
+        assert temp_db.get_story_by_id(story['id'])['likes'] == 1
+
+    def test_rejected_write_rolls_back(self, temp_db, store_setup):
+        """Prueba que una escritura rechazada deshace el cambio local"""
+        store, queue, reader, story = store_setup
+        # El like ya existe en la base pero el estado local no lo sabe
+        temp_db.add_like(story['id'], reader['id'])
+
+        store.like(story['id'], reader['id'])
+        assert store.state(story['id']).counters['likes'] == 1
+
+        queue.close()
+        state = store.state(story['id'])
+        assert state.liked is False
+        assert state.pending == []
+        # Se concilia con el contador real, no con el optimista
+        assert state.counters['likes'] == 1
+
+    def test_reaction_and_unsubscribe(self, temp_db, store_setup):
+        """Prueba una reacción y que la desuscripción corta las notificaciones"""
+        store, queue, reader, story = store_setup
+        seen = []
+        unsubscribe = store.subscribe(lambda story_id, values: seen.append(story_id))
+
+        assert store.react(story['id'], reader['id'], 'miedo') is True
+        assert store.react(story['id'], reader['id'], 'sorpresa') is False
+        assert seen == [story['id']]
+
+        unsubscribe()
+        queue.close()
+        assert seen == [story['id']]
+
+        state = store.state(story['id'])
+        assert state.reaction == 'miedo'
+        assert state.counters['miedo'] == 1
+
+    def test_seeded_like_is_not_written_again(self, temp_db, store_setup):
+        """Prueba que un like ya guardado se carga con la página y no se reenvía"""
+        store, queue, reader, story = store_setup
+        temp_db.add_like(story['id'], reader['id'])
+        temp_db.add_reaction(story['id'], reader['id'], 'miedo')
+        page, _ = temp_db.get_stories_page(viewer_id=reader['id'])
+        assert page[0]['liked'] is True
+        assert page[0]['reaction'] == 'miedo'
+
+        state = store.seed(page[0])
+        assert state.liked is True
+        assert state.counters['likes'] == 1
+
+        calls = []
+        queue.add_like = lambda *args: calls.append(args)
+        assert store.like(story['id'], reader['id']) is False
+        assert store.react(story['id'], reader['id'], 'sorpresa') is False
+        assert calls == []
+        assert state.counters['likes'] == 1
+
+    def test_confirmed_comment_counters(self, temp_db, store_setup):
+        """Prueba que los contadores de un comentario llegan a los suscriptores"""
+        store, queue, reader, story = store_setup
+        seen = []
+        store.subscribe(lambda story_id, values: seen.append(values), story['id'])
+
+        assert store.like(story['id'], reader['id']) is True
+        comment = queue.add_comment(story['id'], reader['id'], 'Yo también lo vi')
+        # Confirmado el comentario, el like sigue pendiente y se conserva
+        store.confirm(story['id'], {'likes': 0, 'comentarios': 1})
+        assert seen[-1]['comentarios'] == 1
+        assert seen[-1]['likes'] == 1
+
+        queue.close()
+        assert comment.result(timeout=5).counters['comentarios'] == 1
+        assert seen[-1]['likes'] == 1
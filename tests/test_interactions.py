@@ -408,3 +408,97 @@ class TestInteractions:
         result = temp_db.add_comment(story_id, user['id'], long_comment)
         # Debería manejar correctamente comentarios largos
         assert result is not None
+    
+    def test_story_stats_counters(self, temp_db, sample_user_data, sample_story_data):
+        """Prueba que story_stats se mantiene exacto con los triggers"""
+        # Crear autor, historia y varios usuarios que interactúan
+        temp_db.create_user(
+            sample_user_data['username'],
+            sample_user_data['email'],
+            sample_user_data['password']
+        )
+        author = temp_db.login_user(sample_user_data['username'], sample_user_data['password'])
+        
+        temp_db.create_story(
+            user_id=author['id'],
+            content=sample_story_data['content'],
+            location=sample_story_data['location'],
+            category=sample_story_data['category']
+        )
+        story_id = temp_db.get_all_stories(limit=1, offset=0)[0]['id']
+        
+        tipos = ['miedo', 'miedo', 'sorpresa']
+        for i, tipo in enumerate(tipos):
+            temp_db.create_user(f'lector_{i}', f'lector_{i}@example.com', 'password123')
+            reader = temp_db.login_user(f'lector_{i}', 'password123')
+            temp_db.add_like(story_id, reader['id'])
+            temp_db.add_reaction(story_id, reader['id'], tipo)
+            temp_db.add_comment(story_id, reader['id'], f'Comentario {i}')
+        
+        story = temp_db.get_story_by_id(story_id)
+        assert story['likes'] == 3
+        assert story['miedo'] == 2
+        assert story['sorpresa'] == 1
+        assert story['incredulidad'] == 0
+        assert story['comentarios'] == 3
+        
+        # Al borrar un like el contador baja
+        conn = temp_db.get_connection()
+        with conn:
+            conn.execute('DELETE FROM likes WHERE story_id = ? AND user_id = ?', (story_id, reader['id']))
+        assert temp_db.get_story_by_id(story_id)['likes'] == 2
+        
+        # Un contador corrupto se corrige con rebuild_story_stats
+        with conn:
+            conn.execute('UPDATE story_stats SET likes = 99, miedo = 0 WHERE story_id = ?', (story_id,))
+        assert temp_db.rebuild_story_stats() is True
+        story = temp_db.get_story_by_id(story_id)
+        assert story['likes'] == 2
+        assert story['miedo'] == 2
+        
+        # get_story_counters lee los mismos valores sin cargar la historia
+        counters = temp_db.get_story_counters(story_id)
+        assert counters['likes'] == 2
+        assert counters['miedo'] == 2
+        assert temp_db.get_story_counters(9999)['likes'] == 0
+        
+        # Al eliminar una historia se elimina su fila de contadores
+        temp_db.create_story(user_id=author['id'], content='Historia para borrar')
+        other_id = max(s['id'] for s in temp_db.get_all_stories(limit=10, offset=0))
+        assert temp_db.delete_story(other_id, author['id']) is True
+        row = conn.execute('SELECT COUNT(*) FROM story_stats WHERE story_id = ?', (other_id,)).fetchone()
+        assert row[0] == 0
+    
+    def test_comments_page(self, temp_db, sample_user_data, sample_story_data):
+        """Prueba la paginación de comentarios por cursor"""
+        temp_db.create_user(
+            sample_user_data['username'],
+            sample_user_data['email'],
+            sample_user_data['password']
+        )
+        user = temp_db.login_user(sample_user_data['username'], sample_user_data['password'])
+        
+        temp_db.create_story(
+            user_id=user['id'],
+            content=sample_story_data['content'],
+            location=sample_story_data['location'],
+            category=sample_story_data['category']
+        )
+        story_id = temp_db.get_all_stories(limit=1, offset=0)[0]['id']
+        
+        # Todos en el mismo segundo: el id desempata
+        for i in range(7):
+            temp_db.add_comment(story_id, user['id'], f'Comentario {i}')
+        
+        seen = []
+        cursor = None
+        while True:
+            comments, cursor = temp_db.get_comments_page(story_id, cursor=cursor, limit=3)
+            assert len(comments) <= 3
+            seen.extend(comment['content'] for comment in comments)
+            if cursor is None:
+                break
+        
+        # Del más nuevo al más antiguo, sin repetidos ni saltos
+        assert seen == [f'Comentario {i}' for i in reversed(range(7))]
+        assert comments[0]['username'] == sample_user_data['username']
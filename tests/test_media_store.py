@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas para el almacén de imágenes direccionado por contenido
+"""
+import hashlib
+import os
+import pytest
+from media_store import MediaStore, ImportJob, CHUNK_SIZE
+
+
+@pytest.fixture
+def media_setup(temp_db, tmp_path):
+    """Almacén en una carpeta temporal, dos fotos iguales y una distinta"""
+    store = MediaStore(root=str(tmp_path / 'media'))
+    photos = tmp_path / 'fotos'
+    photos.mkdir()
+    (photos / 'a.jpg').write_bytes(b'foto repetida' * 1000)
+    (photos / 'copia.JPG').write_bytes(b'foto repetida' * 1000)
+    (photos / 'b.png').write_bytes(b'otra foto')
+
+    temp_db.create_user('autor', 'autor@example.com', 'password123')
+    author = temp_db.login_user('autor', 'password123')
+    return store, photos, author
+
+
+class TestMediaStore:
+    """Clase de pruebas para MediaStore"""
+
+    def test_identical_files_are_stored_once(self, temp_db, media_setup):
+        """Prueba que dos archivos con el mismo contenido comparten ruta"""
+        store, photos, author = media_setup
+        first = store.import_file(temp_db, str(photos / 'a.jpg'))
+        second = store.import_file(temp_db, str(photos / 'copia.JPG'))
+        other = store.import_file(temp_db, str(photos / 'b.png'))
+
+        digest = hashlib.sha256(b'foto repetida' * 1000).hexdigest()
+        assert first == second == store.path_for(digest, '.jpg')
+        assert os.path.relpath(first, store.root).split(os.sep)[:2] == [digest[:2], digest[2:4]]
+        assert other != first
+        assert temp_db.get_media(digest)['size'] == len(b'foto repetida') * 1000
+        # Sin temporales sueltos: solo las dos carpetas de primer nivel
+        assert len(os.listdir(store.root)) == 2
+
+    def test_same_bytes_with_other_extension_reuse_file(self, temp_db, media_setup):
+        """Prueba que los mismos bytes como .JPG y .jpeg se guardan una sola vez"""
+        store, photos, author = media_setup
+        (photos / 'igual.jpeg').write_bytes(b'foto repetida' * 1000)
+        first = store.import_file(temp_db, str(photos / 'copia.JPG'))
+        second = store.import_file(temp_db, str(photos / 'igual.jpeg'))
+
+        digest = hashlib.sha256(b'foto repetida' * 1000).hexdigest()
+        assert first == second == temp_db.get_media(digest)['path']
+        assert os.listdir(os.path.dirname(first)) == [os.path.basename(first)]
+
+        # Ambas rutas cuentan como referencias del mismo archivo
+        temp_db.create_story(author['id'], 'Con foto', 'Chiloé', 'Leyenda')
+        story_id = temp_db.get_user_stories(author['id'])[0]['id']
+        temp_db.add_story_images(story_id, [second])
+        assert temp_db.get_media(digest)['refcount'] == 1
+
+    def test_references_follow_story_images(self, temp_db, media_setup):
+        """Prueba que refcount sigue a story_images y collect borra huérfanos"""
+        store, photos, author = media_setup
+        path = store.import_file(temp_db, str(photos / 'a.jpg'))
+        digest = hashlib.sha256(b'foto repetida' * 1000).hexdigest()
+
+        for content in ('Primera', 'Segunda'):
+            temp_db.create_story(author['id'], content, 'Chiloé', 'Leyenda')
+        first, second = [s['id'] for s in temp_db.get_user_stories(author['id'])]
+        temp_db.add_story_images(first, [path])
+        temp_db.add_story_images(second, [path])
+        assert temp_db.get_media(digest)['refcount'] == 2
+
+        temp_db.delete_story(first, author['id'])
+        assert store.collect(temp_db, older_than_hours=0) == 0
+        assert os.path.exists(path)
+
+        temp_db.delete_story(second, author['id'])
+        assert temp_db.get_media(digest)['refcount'] == 0
+        assert store.collect(temp_db, older_than_hours=0) == 1
+        assert not os.path.exists(path)
+        assert temp_db.get_media(digest) is None
+
+    def test_import_job_reports_progress(self, temp_db, media_setup):
+        """Prueba que la importación en segundo plano avisa progreso y resultado"""
+        store, photos, author = media_setup
+        (photos / 'grande.jpg').write_bytes(b'x' * (CHUNK_SIZE * 3 + 10))
+        events = []
+
+        job = ImportJob(
+            store, temp_db, [str(photos / 'grande.jpg'), str(photos / 'b.png')],
+            dispatch=lambda fn: fn(),
+            on_progress=lambda index, fraction: events.append(('progress', index, fraction)),
+            on_file=lambda index, path: events.append(('file', index, path)),
+            on_done=lambda paths: events.append(('done', paths))
+        ).start()
+        job.join()
+
+        big_progress = [e[2] for e in events if e[:2] == ('progress', 0)]
+        assert big_progress == sorted(big_progress) and len(big_progress) == 4
+        assert big_progress[-1] == 1.0
+        assert events[-1][0] == 'done'
+        assert all(os.path.exists(path) for path in events[-1][1])
+        # La conexión del hilo de importación se cerró al terminar
+        assert temp_db.connections._connections == [temp_db.get_connection()]
+
+    def test_import_job_cancel_leaves_no_files(self, temp_db, media_setup):
+        """Prueba que cancelar borra el temporal y no entrega más avisos"""
+        store, photos, author = media_setup
+        (photos / 'grande.jpg').write_bytes(b'x' * (CHUNK_SIZE * 3))
+        events = []
+
+        def on_progress(index, fraction):
+            events.append(fraction)
+            job.cancel()
+
+        job = ImportJob(store, temp_db, [str(photos / 'grande.jpg')], dispatch=lambda fn: fn(),
+                        on_progress=on_progress, on_done=lambda paths: events.append(paths))
+        job.start()
+        job.join()
+
+        assert job.cancelled
+        assert len(events) == 1
+        assert os.listdir(store.root) == []
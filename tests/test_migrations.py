@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas para las migraciones versionadas del esquema
+"""
+import sqlite3
+import pytest
+import migrations
+from database import Database
+
+
+class TestMigrations:
+    """Clase de pruebas para el motor de migraciones"""
+
+    def test_new_database_is_at_latest_version(self, temp_db):
+        """Prueba que una base nueva queda en la última versión"""
+        conn = temp_db.get_connection()
+        assert migrations.get_version(conn) == migrations.latest_version()
+
+    def test_current_schema_skips_ddl(self, temp_db, monkeypatch):
+        """Prueba que reabrir una base al día no vuelve a ejecutar migraciones"""
+        def fail(cursor):
+            raise AssertionError('No debería ejecutarse ninguna migración')
+
+        for step in migrations.MIGRATIONS:
+            monkeypatch.setattr(step, 'apply', fail)
+
+        db = Database(db_name=temp_db.db_name)
+        db.close()
+
+    def test_legacy_database_is_adopted(self, tmp_path):
+        """Prueba que una base creada sin migraciones se adopta conservando datos"""
+        db_path = str(tmp_path / 'legacy.db')
+        conn = sqlite3.connect(db_path)
+        # Esquema antiguo de shema.sql: historias sin categoría
+        conn.executescript('''
+            CREATE TABLE usuarios (
+              id INTEGER PRIMARY KEY AUTOINCREMENT,
+              username TEXT UNIQUE NOT NULL,
+              email TEXT UNIQUE NOT NULL,
+              password_hash TEXT NOT NULL,
+              created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+            CREATE TABLE historias (
+              id INTEGER PRIMARY KEY AUTOINCREMENT,
+              user_id INTEGER NOT NULL,
+              content TEXT NOT NULL,
+              location TEXT,
+              is_anonymous INTEGER DEFAULT 0,
+              photo_path TEXT,
+              created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+            INSERT INTO usuarios (username, email, password_hash) VALUES ('antiguo', 'a@example.com', 'x');
+            INSERT INTO historias (user_id, content, location) VALUES (1, 'Historia antigua', 'Arica');
+        ''')
+        conn.commit()
+        conn.close()
+
+        with Database(db_name=db_path) as db:
+            assert migrations.get_version(db.get_connection()) == migrations.latest_version()
+            stories = db.get_all_stories()
+            assert len(stories) == 1
+            assert stories[0]['category'] == 'Aparición'
+
+    def test_failed_migration_rolls_back(self, temp_db, monkeypatch):
+        """Prueba que una migración fallida no deja cambios a medias"""
+        version = migrations.latest_version() + 1
+
+        def broken(cursor):
+            migrations.add_column(cursor, 'historias', 'extra', 'TEXT')
+            raise sqlite3.OperationalError('falla simulada')
+
+        monkeypatch.setattr(migrations, 'MIGRATIONS', migrations.MIGRATIONS + [
+            migrations.Migration(version, 'rota', broken)
+        ])
+
+        conn = temp_db.get_connection()
+        with pytest.raises(sqlite3.OperationalError):
+            migrations.migrate(conn)
+
+        assert migrations.get_version(conn) == version - 1
+        assert 'extra' not in migrations.table_columns(conn.cursor(), 'historias')
+
+    def test_rebuild_table_keeps_data(self, temp_db, sample_user_data):
+        """Prueba que rebuild_table conserva filas e índices"""
+        temp_db.create_user(
+            sample_user_data['username'],
+            sample_user_data['email'],
+            sample_user_data['password']
+        )
+
+        conn = temp_db.get_connection()
+        with conn:
+            migrations.rebuild_table(conn.cursor(), 'usuarios', '''
+                CREATE TABLE {table} (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT UNIQUE NOT NULL,
+                    email TEXT UNIQUE NOT NULL,
+                    password_hash TEXT NOT NULL,
+                    bio TEXT DEFAULT '',
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+
+        row = conn.execute('SELECT username, bio FROM usuarios').fetchone()
+        assert row['username'] == sample_user_data['username']
+        assert row['bio'] == ''
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas para la instrumentación de consultas
+"""
+import sqlite3
+from query_stats import percentile
+
+
+class TestQueryStats:
+    """Clase de pruebas para QueryStats"""
+
+    def test_disabled_by_default(self, temp_db):
+        """Prueba que sin activar la instrumentación los cursores son normales"""
+        cursor = temp_db.get_connection().cursor()
+        assert type(cursor) is sqlite3.Cursor
+        assert temp_db.query_report() == ''
+
+    def test_records_calls_rows_and_method(self, temp_db, sample_user_data):
+        """Prueba que se registran llamadas, filas y el método que originó la consulta"""
+        temp_db.create_user(
+            sample_user_data['username'],
+            sample_user_data['email'],
+            sample_user_data['password']
+        )
+        user = temp_db.login_user(sample_user_data['username'], sample_user_data['password'])
+        for i in range(3):
+            temp_db.create_story(user['id'], f'Historia {i}', 'Arica', 'Leyenda')
+
+        stats = temp_db.enable_instrumentation(slow_ms=10000)
+        temp_db.get_all_stories()
+        temp_db.get_all_stories()
+
+        report = stats.report()
+        feed = [row for row in report if 'get_all_stories' in row['methods']]
+        assert len(feed) == 1
+        assert feed[0]['calls'] == 2
+        assert feed[0]['rows'] == 6
+        assert feed[0]['p99_ms'] >= feed[0]['p95_ms'] > 0
+        assert 'get_all_stories' in temp_db.query_report()
+
+        temp_db.disable_instrumentation()
+        temp_db.get_all_stories()
+        assert stats.report()[0]['calls'] == 2
+
+    def test_slow_query_log_has_plan(self, temp_db, tmp_path):
+        """Prueba que las consultas lentas se registran con su EXPLAIN QUERY PLAN"""
+        log_path = tmp_path / 'slow.log'
+        stats = temp_db.enable_instrumentation(slow_ms=0, slow_log=str(log_path))
+
+        temp_db.get_stories_page(limit=5)
+
+        slow = [q for q in stats.slow_queries if q['method'] == 'get_stories_page']
+        assert slow
+        assert any('historias' in line for line in slow[0]['plan'])
+        assert 'get_stories_page' in log_path.read_text(encoding='utf-8')
+
+    def test_percentile(self):
+        """Prueba el cálculo de percentiles por rango más cercano"""
+        values = list(range(1, 101))
+        assert percentile(values, 95) == 95
+        assert percentile(values, 99) == 99
+        assert percentile([], 95) == 0.0
@@ -32,7 +32,8 @@ class TestStoryManagement:
         # Verificar que la historia se creó
         stories = temp_db.get_all_stories(limit=10, offset=0)
         assert len(stories) == 1
-        assert stories[0]['content'] == sample_story_data['content']
+        assert temp_db.get_story_by_id(stories[0]['id'])['content'] == sample_story_data['content']
+        assert 'content' not in stories[0]  # la lista solo trae el preview
         assert stories[0]['location'] == sample_story_data['location']
         assert stories[0]['category'] == sample_story_data['category']
         assert stories[0]['username'] == sample_user_data['username']
@@ -62,6 +63,27 @@ class TestStoryManagement:
         assert len(stories) == 1
         assert stories[0]['is_anonymous'] == 1
     
+    def test_publish_story_with_images(self, temp_db, sample_user_data):
+        """Prueba que publicar guarda historia e imágenes y devuelve el id nuevo"""
+        temp_db.create_user(
+            sample_user_data['username'],
+            sample_user_data['email'],
+            sample_user_data['password']
+        )
+        user = temp_db.login_user(sample_user_data['username'], sample_user_data['password'])
+        
+        story_id = temp_db.publish_story(
+            user['id'], 'Historia con fotos', location='Valdivia', category='Aparición',
+            image_paths=['a.jpg', 'b.jpg']
+        )
+        story = temp_db.get_story_by_id(story_id)
+        assert story['content'] == 'Historia con fotos'
+        assert [img['path'] for img in temp_db.get_pending_images(story_id)] == ['a.jpg', 'b.jpg']
+        
+        # Si falla no queda una historia a medias
+        assert temp_db.publish_story(9999, 'Autor inexistente', image_paths=['c.jpg']) is None
+        assert len(temp_db.get_all_stories()) == 1
+    
     def test_get_user_stories(self, temp_db, sample_user_data):
         """Prueba obtención de historias de usuario"""
         # Crear usuario
@@ -95,6 +117,42 @@ class TestStoryManagement:
         for story in user_stories:
             assert story['user_id'] == user['id']
     
+    def test_user_stories_page_and_profile_stats(self, temp_db, sample_user_data):
+        """Prueba las historias de un autor por páginas y los totales del perfil"""
+        temp_db.create_user(
+            sample_user_data['username'],
+            sample_user_data['email'],
+            sample_user_data['password']
+        )
+        author = temp_db.login_user(sample_user_data['username'], sample_user_data['password'])
+        temp_db.create_user('lector', 'lector@example.com', 'password123')
+        reader = temp_db.login_user('lector', 'password123')
+        
+        for i in range(5):
+            temp_db.create_story(user_id=author['id'], content=f'Historia {i}', location='Lugar', category='Leyenda')
+        temp_db.create_story(user_id=reader['id'], content='De otro autor', location='Lugar', category='Leyenda')
+        
+        ids = []
+        cursor = None
+        while True:
+            stories, cursor = temp_db.get_user_stories_page(author['id'], cursor=cursor, limit=2)
+            assert all(story['user_id'] == author['id'] for story in stories)
+            ids.extend(story['id'] for story in stories)
+            if cursor is None:
+                break
+        assert ids == [story['id'] for story in temp_db.get_user_stories(author['id'])]
+        
+        temp_db.add_like(ids[0], reader['id'])
+        temp_db.add_reaction(ids[0], reader['id'], 'miedo')
+        temp_db.add_comment(ids[1], reader['id'], 'Buena historia')
+        stats = temp_db.get_profile_stats(author['id'])
+        assert stats == {'historias': 5, 'likes': 1, 'reacciones': 1, 'comentarios': 1}
+        
+        # Un autor sin historias tiene todo en cero
+        temp_db.create_user('nuevo', 'nuevo@example.com', 'password123')
+        nuevo = temp_db.login_user('nuevo', 'password123')
+        assert temp_db.get_profile_stats(nuevo['id']) == {'historias': 0, 'likes': 0, 'reacciones': 0, 'comentarios': 0}
+    
     def test_story_pagination(self, temp_db, sample_user_data):
         """Prueba paginación de historias"""
         # Crear usuario
@@ -133,6 +191,70 @@ class TestStoryManagement:
         assert not set(page2_ids).intersection(set(page3_ids))
         assert not set(page1_ids).intersection(set(page3_ids))
     
+    def test_story_cursor_pagination(self, temp_db, sample_user_data):
+        """Prueba paginación por cursor sin duplicados ni saltos"""
+        # Crear usuario
+        temp_db.create_user(
+            sample_user_data['username'],
+            sample_user_data['email'],
+            sample_user_data['password']
+        )
+        user = temp_db.login_user(sample_user_data['username'], sample_user_data['password'])
+        
+        # Crear 5 historias con la misma fecha para forzar empates en created_at
+        for i in range(5):
+            temp_db.create_story(user_id=user['id'], content=f"Historia {i+1}")
+        conn = temp_db.get_connection()
+        with conn:
+            conn.execute("UPDATE historias SET created_at = '2024-01-01 12:00:00'")
+        
+        page1, cursor = temp_db.get_stories_page(limit=2)
+        assert len(page1) == 2
+        assert cursor is not None
+        
+        # Una historia publicada a mitad de la paginación no desplaza las páginas
+        temp_db.create_story(user_id=user['id'], content="Historia nueva")
+        
+        page2, cursor = temp_db.get_stories_page(cursor=cursor, limit=2)
+        page3, cursor = temp_db.get_stories_page(cursor=cursor, limit=2)
+        assert len(page2) == 2
+        assert len(page3) == 1
+        assert cursor is None
+        
+        ids = [story['id'] for story in page1 + page2 + page3]
+        assert len(ids) == len(set(ids)) == 5
+        assert ids == sorted(ids, reverse=True)
+        
+        # Un cursor inválido se rechaza
+        with pytest.raises(ValueError):
+            temp_db.get_stories_page(cursor='no-es-un-cursor')
+    
+    def test_story_card_preview(self, temp_db, sample_user_data):
+        """Prueba que las listas traen solo el preview y el detalle el texto completo"""
+        temp_db.create_user(
+            sample_user_data['username'],
+            sample_user_data['email'],
+            sample_user_data['password']
+        )
+        user = temp_db.login_user(sample_user_data['username'], sample_user_data['password'])
+
+        long_content = 'Testimonio muy largo sobre la Llorona. ' * 20
+        temp_db.create_story(user_id=user['id'], content=long_content, location='Temuco')
+
+        stories, _ = temp_db.get_stories_page(limit=5)
+        card = stories[0]
+        assert 'content' not in card
+        assert card['preview'] == long_content[:180] + '...'
+        assert temp_db.get_user_stories(user['id'])[0]['preview'] == card['preview']
+
+        full = temp_db.get_story_by_id(card['id'])
+        assert full['content'] == long_content
+
+        # Al editar, el preview se recalcula
+        temp_db.update_story(card['id'], user['id'], 'Versión corta', 'Temuco')
+        stories, _ = temp_db.get_stories_page(limit=5)
+        assert stories[0]['preview'] == 'Versión corta'
+
     def test_story_search_by_content(self, temp_db, sample_user_data):
         """Prueba búsqueda de historias por contenido"""
         # Crear usuario
@@ -161,11 +283,11 @@ class TestStoryManagement:
         # Buscar por contenido
         results = temp_db.search_stories('fantasmas')
         assert len(results) == 1
-        assert 'fantasmas' in results[0]['content'].lower()
+        assert 'fantasmas' in results[0]['preview'].lower()
         
         results = temp_db.search_stories('aparición')
         assert len(results) == 1
-        assert 'aparición' in results[0]['content'].lower()
+        assert 'aparición' in results[0]['preview'].lower()
     
     def test_story_search_by_location(self, temp_db, sample_user_data):
         """Prueba búsqueda de historias por ubicación"""
@@ -235,7 +357,46 @@ class TestStoryManagement:
         results = temp_db.search_stories('Fantasma')
         assert len(results) == 1
         assert results[0]['category'] == 'Fantasma'
-    
+
+    def test_story_full_text_search(self, temp_db, sample_user_data):
+        """Prueba búsqueda de texto completo: acentos, prefijos, relevancia y fragmento"""
+        temp_db.create_user(
+            sample_user_data['username'],
+            sample_user_data['email'],
+            sample_user_data['password']
+        )
+        user = temp_db.login_user(sample_user_data['username'], sample_user_data['password'])
+
+        temp_db.create_story(user['id'], 'Vi al Caleuche navegando de noche', 'Chiloé', 'Leyenda')
+        temp_db.create_story(user['id'], 'Un fantasma en la casa de mi abuela', 'Ancud', 'Fantasma')
+        temp_db.create_story(user['id'], 'Otra historia de la isla', 'Castro', 'Leyenda')
+
+        # Sin acento y con mayúsculas distintas
+        results = temp_db.search_stories('chiloe')
+        assert len(results) == 1
+        assert results[0]['location'] == 'Chiloé'
+
+        # Prefijo
+        results = temp_db.search_stories('fantas')
+        assert len(results) == 1
+        assert 'fantasma' in results[0]['preview']
+
+        # Fragmento con la coincidencia marcada
+        from database import SNIPPET_START, SNIPPET_END
+        results = temp_db.search_stories('caleuche')
+        assert SNIPPET_START + 'Caleuche' + SNIPPET_END in results[0]['snippet']
+
+        # Límite y desplazamiento
+        assert len(temp_db.search_stories('leyenda', limit=1)) == 1
+        assert len(temp_db.search_stories('leyenda', limit=1, offset=1)) == 1
+        assert temp_db.search_stories('leyenda', limit=1, offset=2) == []
+
+        # Una historia editada se reindexa
+        story_id = results[0]['id']
+        temp_db.update_story(story_id, user['id'], 'Ahora habla de un trauco', 'Chiloé', 'Leyenda')
+        assert temp_db.search_stories('caleuche') == []
+        assert len(temp_db.search_stories('trauco')) == 1
+
     def test_story_update(self, temp_db, sample_user_data, sample_story_data):
         """Prueba actualización de historia"""
         # Crear usuario y historia
@@ -273,7 +434,7 @@ class TestStoryManagement:
         
         # Verificar actualización
         stories = temp_db.get_all_stories(limit=1, offset=0)
-        assert stories[0]['content'] == new_content
+        assert temp_db.get_story_by_id(stories[0]['id'])['content'] == new_content
         assert stories[0]['location'] == new_location
         assert stories[0]['category'] == new_category
         assert stories[0]['is_anonymous'] == 1
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas para el caché compartido de texturas
+"""
+import pytest
+from texture_cache import TextureCache
+
+
+class FakeTexture:
+    def __init__(self, width, height):
+        self.size = (width, height)
+
+
+@pytest.fixture
+def cache_setup():
+    """Caché de 3 texturas de 10x10 y un loader que se resuelve a mano"""
+    loads = []
+    pending = {}
+
+    def loader(source, on_done):
+        loads.append(source)
+        pending[source] = on_done
+
+    cache = TextureCache(budget_bytes=3 * 400, loader=loader)
+    return cache, loads, pending
+
+
+class TestTextureCache:
+    """Clase de pruebas para TextureCache"""
+
+    def test_revisit_is_a_hit_without_loading(self, cache_setup):
+        """Prueba que una imagen ya cargada se entrega sin volver a leerla"""
+        cache, loads, pending = cache_setup
+        shown = []
+        texture = FakeTexture(10, 10)
+
+        assert not cache.request('a.jpg', shown.append)
+        assert not cache.request('a.jpg', shown.append)  # misma carga en curso
+        pending.pop('a.jpg')(texture)
+        assert shown == [texture, texture]
+
+        assert cache.request('a.jpg', shown.append)
+        assert shown[-1] is texture
+        assert loads == ['a.jpg']
+        stats = cache.stats()
+        assert (stats['hits'], stats['misses'], stats['bytes']) == (1, 2, 400)
+
+    def test_lru_eviction_by_bytes(self, cache_setup):
+        """Prueba que al superar el presupuesto se descarta la menos usada"""
+        cache, loads, pending = cache_setup
+        for name in ('a', 'b', 'c'):
+            cache.put(name, FakeTexture(10, 10))
+        cache.get('a')  # 'b' pasa a ser la menos usada
+        cache.put('d', FakeTexture(10, 10))
+
+        assert 'b' not in cache
+        assert all(name in cache for name in ('a', 'c', 'd'))
+        assert cache.bytes == 1200
+        assert cache.evictions == 1
+
+        cache.put('grande', FakeTexture(40, 40))  # sola supera el presupuesto
+        assert len(cache) == 1 and 'grande' in cache
+        cache.trim(0)
+        assert len(cache) == 0 and cache.bytes == 0
+
+    def test_failed_load_is_not_cached(self, cache_setup):
+        """Prueba que una imagen ilegible avisa None y no queda en caché"""
+        cache, loads, pending = cache_setup
+        shown = []
+        cache.request('rota.jpg', shown.append)
+        pending.pop('rota.jpg')(None)
+
+        assert shown == [None]
+        assert 'rota.jpg' not in cache
+        cache.request('rota.jpg', shown.append)
+        assert loads == ['rota.jpg', 'rota.jpg']
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas para las miniaturas de las imágenes de historias
+"""
+import os
+import pytest
+from thumbnails import ThumbnailWorker, pick_source, image_variants
+
+Image = pytest.importorskip('PIL.Image')
+
+
+@pytest.fixture
+def story_with_photo(temp_db, tmp_path):
+    """Historia con una foto grande y una chica"""
+    big = tmp_path / 'grande.jpg'
+    small = tmp_path / 'chica.png'
+    Image.new('RGB', (3000, 2000), (120, 40, 40)).save(big)
+    Image.new('RGBA', (300, 200), (0, 0, 0, 0)).save(small)
+
+    temp_db.create_user('autor', 'autor@example.com', 'password123')
+    author = temp_db.login_user('autor', 'password123')
+    temp_db.create_story(author['id'], 'Con fotos', 'Chiloé', 'Leyenda')
+    story_id = temp_db.get_user_stories(author['id'])[0]['id']
+    temp_db.add_story_images(story_id, [str(big), str(small)])
+    return story_id, str(big), str(small)
+
+
+class TestThumbnails:
+    """Clase de pruebas para ThumbnailWorker y pick_source"""
+
+    def test_worker_records_variants(self, temp_db, story_with_photo):
+        """Prueba que se generan los derivados y quedan en story_images"""
+        story_id, big, small = story_with_photo
+        worker = ThumbnailWorker(temp_db)
+        worker.submit(story_id)
+        worker.join()
+        worker.close()
+
+        assert temp_db.get_pending_images(story_id) == []
+        story = temp_db.get_all_stories(limit=1)[0]
+        assert story['images'] == [big, small]
+        large, tiny = story['image_variants']
+        for name, side in (('grid', 640), ('carousel', 1440), ('full', 2560)):
+            with Image.open(large[name]) as thumb:
+                assert max(thumb.size) == side
+        # Más chica que todos los tamaños: se usa el original
+        assert tiny['grid'] is None and tiny['carousel'] is None
+
+    def test_pick_source_smallest_that_fits(self, temp_db, story_with_photo):
+        """Prueba que cada vista recibe el derivado más chico que la cubre"""
+        story_id, big, small = story_with_photo
+        story = temp_db.get_all_stories(limit=1)[0]
+        # Aún sin miniaturas: el original
+        assert pick_source(story['image_variants'][0], 200) == big
+
+        worker = ThumbnailWorker(temp_db)
+        worker.process(story_id)
+        worker.close()
+        large = temp_db.get_all_stories(limit=1)[0]['image_variants'][0]
+        assert pick_source(large, 200) == large['grid']
+        assert pick_source(large, 1000) == large['carousel']
+        assert pick_source(large, 5000) == large['full']
+        assert os.path.exists(large['grid'])
+        assert image_variants({'images': ['a.jpg']}) == [{'path': 'a.jpg'}]
@@ -4,9 +4,17 @@ Pruebas para componentes de interfaz de usuario
 """
 import pytest
 from kivy.app import App
-from kivy.uix.screenmanager import ScreenManager
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.label import Label
+from kivy.uix.screenmanager import ScreenManager, Screen
 from widgets.navbar import NavBar
+from widgets.lazy_screen_manager import LazyScreenManager
+from widgets.incremental_builder import IncrementalBuilder, Placeholder
 from widgets.story_card import StoryCard
+from widgets.story_feed import StoryFeed, FeedCard, card_height, CARD_HEIGHT
+from widgets.comment_list import CommentList, CommentCard, comment_height
+from widgets.icons import IconButton, icon_source
+from widgets.lazy_carousel import LazyCarousel
 
 
 class TestUIComponents:
@@ -29,16 +37,14 @@ class TestUIComponents:
         
         # Verificar textos de los botones
         button_texts = [child.text for child in navbar.children]
-        expected_texts = [
-            '[color=#FFD700]👤[/color]\nPerfil',
-            '[color=#FFD700]+[/color]\nCrear',
-            '[color=#FFD700]🔔[/color]\nNotificaciones',
-            '[color=#FFD700]🔍[/color]\nBuscar',
-            '[color=#FFD700]🏠[/color]\nInicio'
-        ]
+        expected_texts = ['Perfil', 'Crear', 'Notificaciones', 'Buscar', 'Inicio']
         
         for expected_text in expected_texts:
             assert any(expected_text in text for text in button_texts)
+
+        # Los íconos salen del atlas, no de una fuente emoji
+        for child in navbar.children:
+            assert child.icon.source.startswith('atlas://')
     
     def test_navbar_screen_manager_setting(self):
         """Prueba configuración del screen manager en navbar"""
@@ -154,7 +160,7 @@ class TestUIComponents:
         for child in card.children:
             if hasattr(child, 'children'):
                 for grandchild in child.children:
-                    if hasattr(grandchild, 'text') and ('❤️' in grandchild.text or '💬' in grandchild.text):
+                    if isinstance(grandchild, IconButton):
                         has_action_buttons = True
                         break
         
@@ -328,3 +334,208 @@ class TestUIComponents:
         
         # Debe manejar datos vacíos sin crashear
         # Los valores por defecto se aplican en el widget
+
+    def test_story_feed_keeps_plain_data(self):
+        """Prueba que el feed virtualizado guarda dicts y no crea una tarjeta por historia"""
+        feed = StoryFeed()
+        stories = [
+            {'id': i, 'preview': f'Historia {i}', 'username': 'test_user', 'likes': i}
+            for i in range(5000)
+        ]
+        feed.set_stories(stories)
+
+        assert len(feed.data) == 5000
+        assert feed.data[0]['height'] == CARD_HEIGHT
+        # Los widgets los crea el RecycleView solo para las filas visibles
+        assert len(feed.layout_manager.children) < 50
+
+    def test_feed_card_recycles_widgets(self):
+        """Prueba que una tarjeta reciclada muestra la nueva historia con los mismos widgets"""
+        feed = StoryFeed()
+        card = FeedCard()
+        like_btn = card.like_btn
+
+        card.refresh_view_attrs(feed, 0, {'id': 1, 'preview': 'Primera', 'likes': 3, 'username': 'ana'})
+        assert card.content.text == 'Primera'
+        assert '3' in card.like_btn.text
+
+        card.refresh_view_attrs(feed, 1, {'id': 2, 'preview': 'Segunda', 'likes': 7, 'is_anonymous': True})
+        assert card.like_btn is like_btn
+        assert card.content.text == 'Segunda'
+        assert 'Anónimo' in card.username.text
+        assert '7' in card.like_btn.text
+
+    def test_card_height_with_images(self):
+        """Prueba el alto de la tarjeta según la cantidad de imágenes"""
+        assert card_height({}) == CARD_HEIGHT
+        assert card_height({'images': ['a.jpg']}) > CARD_HEIGHT
+        assert card_height({'images': ['a', 'b', 'c']}) == card_height({'images': ['a', 'b', 'c', 'd', 'e']})
+
+    def test_story_feed_update_story_in_place(self):
+        """Prueba que actualizar contadores no reemplaza los datos del feed"""
+        feed = StoryFeed()
+        feed.set_stories([{'id': i, 'preview': f'Historia {i}', 'likes': 0} for i in range(3)])
+        feed.append_stories([{'id': 10, 'preview': 'Otra', 'likes': 1}])
+        data = feed.data
+
+        assert feed.update_story(10, {'likes': 2, 'miedo': 1})
+        assert feed.data is data
+        assert feed.data[3]['likes'] == 2
+        assert not feed.update_story(999, {'likes': 1})
+
+    def test_feed_card_pressed_state(self):
+        """Prueba que la tarjeta marca el like dado y la reacción elegida"""
+        feed = StoryFeed()
+        card = FeedCard()
+        card.refresh_view_attrs(feed, 0, {'id': 1, 'preview': 'Historia', 'likes': 0})
+        normal = tuple(card.like_btn.background_color)
+
+        card.refresh_counters({'likes': 1, 'liked': True, 'reaction': 'miedo'})
+        assert tuple(card.like_btn.background_color) != normal
+        assert tuple(card.miedo_btn.background_color) == tuple(card.like_btn.background_color)
+        assert tuple(card.sorpresa_btn.background_color) != tuple(card.miedo_btn.background_color)
+
+    def test_lazy_screen_manager_builds_on_demand(self):
+        """Prueba que las pantallas se construyen solo al navegar a ellas"""
+        built = []
+        sm = LazyScreenManager(pinned=('welcome',))
+        sm.bind(on_screen_built=lambda manager, screen: built.append(screen.name))
+        for name in ('welcome', 'feed', 'report'):
+            sm.register(name, Screen)
+
+        sm.current = 'welcome'
+        assert built == ['welcome']
+        assert sm.has_screen('report')
+        assert not sm.is_built('report')
+
+        navbar = NavBar()
+        navbar.set_screen_manager(sm)
+        navbar.change_screen('report')
+        assert sm.current == 'report'
+        assert built == ['welcome', 'report']
+
+    def test_lazy_screen_manager_evicts(self):
+        """Prueba que se descartan las pantallas menos usadas, nunca las fijas ni la actual"""
+        evicted = []
+        sm = LazyScreenManager(max_screens=2, pinned=('welcome',))
+        sm.bind(on_screen_evicted=lambda manager, screen: evicted.append(screen.name))
+        for name in ('welcome', 'feed', 'search', 'report'):
+            sm.register(name, Screen)
+
+        for name in ('welcome', 'feed', 'search', 'report'):
+            sm.current = name
+
+        assert sm.is_built('welcome')
+        assert sm.is_built('report')
+        assert 'feed' in evicted
+
+        # Termina la transición en curso (en la app lo hace el Clock)
+        sm.transition.stop()
+        sm.trim()
+        assert [screen.name for screen in sm.screens] == ['welcome', 'report']
+        # Una pantalla descartada se vuelve a construir al pedirla
+        assert sm.get_screen('feed').name == 'feed'
+
+    def test_story_feed_prepend_and_drop(self):
+        """Prueba que agregar arriba y descartar mantiene los índices por id"""
+        feed = StoryFeed()
+        feed.set_stories([{'id': i, 'preview': f'Historia {i}', 'likes': 0} for i in range(10, 20)])
+        feed.prepend_stories([{'id': i, 'preview': f'Historia {i}', 'likes': 0} for i in range(5)])
+        assert [story['id'] for story in feed.data[:6]] == [0, 1, 2, 3, 4, 10]
+
+        feed.drop_front(5)
+        feed.drop_back(2)
+        assert [story['id'] for story in feed.data] == list(range(10, 18))
+        assert feed.update_story(17, {'likes': 3})
+        assert not feed.update_story(0, {'likes': 3})
+
+    def test_comment_list_inserts_new_comment(self):
+        """Prueba que un comentario nuevo se agrega arriba sin recargar la lista"""
+        comments = CommentList()
+        comments.set_comments([{'id': i, 'content': f'Comentario {i}', 'username': 'ana'} for i in range(3)])
+        data = comments.data
+
+        comments.add_comment({'id': None, 'content': 'Nuevo', 'username': 'luis'})
+        comments.append_comments([{'id': 9, 'content': 'Antiguo', 'username': 'ana'}])
+        assert comments.data is data
+        assert [c['content'] for c in comments.data] == ['Nuevo', 'Comentario 0', 'Comentario 1', 'Comentario 2', 'Antiguo']
+        assert comment_height({'content': 'a' * 2000}) > comment_height({'content': 'corto'})
+
+    def test_comment_card_rebinds(self):
+        """Prueba que una fila de comentario se puede reciclar con otros datos"""
+        comments = CommentList()
+        card = CommentCard()
+        label = card.content
+
+        card.refresh_view_attrs(comments, 0, {'id': 1, 'content': 'Primero', 'username': 'ana', 'created_at': 'hoy'})
+        card.refresh_view_attrs(comments, 1, {'id': 2, 'content': 'Segundo', 'username': 'luis', 'created_at': 'ayer'})
+
+        assert card.content is label
+        assert card.content.text == 'Segundo'
+        assert card.author.text == 'luis'
+        assert card.author.icon.source.startswith('atlas://')
+        assert card.date.text == 'ayer'
+
+    def test_navbar_unread_badge(self):
+        """Prueba que la campana muestra y oculta el contador de no leídas"""
+        navbar = NavBar()
+        bell = navbar.buttons['notifications']
+        original = bell.text
+
+        navbar.set_unread(3)
+        assert '3' in bell.text
+        navbar.set_unread(250)
+        assert '99+' in bell.text
+        navbar.set_unread(0)
+        assert bell.text == original
+
+    def test_icons_share_atlas_texture(self):
+        """Prueba que los íconos de distintas tarjetas usan la misma textura del atlas"""
+        story = {'id': 1, 'content': 'Historia', 'likes': 4, 'miedo': 1, 'username': 'ana'}
+        first = StoryCard(story)
+        second = StoryCard(dict(story, id=2))
+
+        def buttons(card):
+            return [w for w in card.walk(restrict=True) if isinstance(w, IconButton)]
+
+        assert [b.icon.source for b in buttons(first)][0] == icon_source('heart')
+        assert buttons(first)[0].text == '4'
+        assert buttons(first)[0].icon.texture is not None
+        assert buttons(first)[0].icon.texture.id == buttons(second)[0].icon.texture.id
+
+    def test_lazy_carousel_loads_neighbours_only(self):
+        """Prueba que el carrusel solo carga la diapositiva actual y sus vecinas"""
+        sources = [f'media/imagen{i}.jpg' for i in range(10)]
+        carousel = LazyCarousel(sources, loop=True)
+        assert len(carousel.slides) == 10
+        assert carousel.loaded_indices() == [0, 1, 9]
+
+        carousel.index = 5
+        assert carousel.loaded_indices() == [4, 5, 6]
+        assert carousel.slides[5].path == 'media/imagen5.jpg'
+        assert carousel.slides[0].path == ''
+
+        carousel.loop = False
+        carousel.index = 0
+        assert carousel.loaded_indices() == [0, 1]
+
+    def test_incremental_builder_spreads_frames(self):
+        """Prueba que las tarjetas se construyen por frames reemplazando placeholders"""
+        container = BoxLayout(orientation='vertical')
+        reports = []
+        # Presupuesto cero: una tarjeta por frame
+        builder = IncrementalBuilder(container, budget_ms=0, name='prueba', on_done=reports.append)
+
+        builder.add(['a', 'b', 'c'], lambda text: Label(text=text), 100)
+        assert all(isinstance(child, Placeholder) for child in container.children)
+        assert builder.pending == 3
+
+        builder._step(0)
+        assert builder.pending == 2
+        builder._step(0)
+        builder._step(0)
+
+        # Mismo orden que los datos (children está invertido)
+        assert [child.text for child in reversed(container.children)] == ['a', 'b', 'c']
+        assert reports == [{'name': 'prueba', 'items': 3, 'frames': 3, 'ms': reports[0]['ms']}]
+        builder.cancel()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas para la cola de escrituras con commit agrupado
+"""
+import pytest
+from write_queue import WriteQueue
+
+
+@pytest.fixture
+def story_setup(temp_db):
+    """Autor, lector y una historia del autor"""
+    temp_db.create_user('autor', 'autor@example.com', 'password123')
+    temp_db.create_user('lector', 'lector@example.com', 'password123')
+    author = temp_db.login_user('autor', 'password123')
+    reader = temp_db.login_user('lector', 'password123')
+    temp_db.create_story(author['id'], 'Historia para la cola', 'Arica', 'Leyenda')
+    story = temp_db.get_all_stories()[0]
+    return author, reader, story
+
+
+class TestWriteQueue:
+    """Clase de pruebas para WriteQueue"""
+
+    def test_batch_results(self, temp_db, story_setup):
+        """Prueba que cada escritura del lote recibe su propio resultado"""
+        author, reader, story = story_setup
+        queue = WriteQueue(temp_db, flush_interval=0.2)
+
+        like = queue.add_like(story['id'], reader['id'])
+        duplicate = queue.add_like(story['id'], reader['id'])
+        reaction = queue.add_reaction(story['id'], reader['id'], 'miedo')
+        comment = queue.add_comment(story['id'], reader['id'], 'Qué miedo')
+        queue.close()
+
+        assert like.result(timeout=5).ok is True
+        assert duplicate.result(timeout=5).ok is False
+        assert reaction.result(timeout=5).ok is True
+        assert comment.result(timeout=5).ok is True
+
+        # Todas ven los contadores finales del lote
+        counters = like.result().counters
+        assert counters == duplicate.result().counters
+        assert counters['likes'] == 1
+        assert counters['miedo'] == 1
+        assert counters['comentarios'] == 1
+
+        updated = temp_db.get_story_by_id(story['id'])
+        assert updated['likes'] == 1
+        assert updated['miedo'] == 1
+        assert len(temp_db.get_comments(story['id'])) == 1
+
+        # El comentario trae la fila creada; likes y reacciones no
+        assert like.result().row is None
+        row = comment.result().row
+        saved = temp_db.get_comments(story['id'])[0]
+        assert row['id'] == saved['id']
+        assert temp_db.format_date(row['created_at']) == saved['created_at']
+
+    def test_failed_item_does_not_abort_batch(self, temp_db, story_setup):
+        """Prueba que un elemento que falla se deshace sin afectar al resto"""
+        author, reader, story = story_setup
+        queue = WriteQueue(temp_db, flush_interval=0.2)
+
+        bad = queue.add_comment(9999, reader['id'], 'Historia inexistente')
+        good = queue.add_like(story['id'], reader['id'])
+        queue.close()
+
+        assert bad.result(timeout=5).ok is False
+        assert good.result(timeout=5).ok is True
+        assert temp_db.get_story_by_id(story['id'])['likes'] == 1
+
+    def test_close_drains_and_rejects(self, temp_db, story_setup):
+        """Prueba que close confirma lo pendiente y rechaza escrituras nuevas"""
+        author, reader, story = story_setup
+        queue = WriteQueue(temp_db, flush_interval=10)
+
+        future = queue.add_like(story['id'], reader['id'])
+        queue.close()
+
+        assert future.done()
+        assert future.result().ok is True
+        with pytest.raises(RuntimeError):
+            queue.add_like(story['id'], author['id'])
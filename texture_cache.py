@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Caché de texturas decodificadas compartida por todas las pantallas.
+
+Cada imagen (por ruta) se lee y decodifica una sola vez: el feed, el
+detalle y la pantalla de creación reciben la misma textura. El caché tiene
+un presupuesto en bytes (ancho x alto x 4 de cada textura) y al superarlo
+descarta las menos usadas recientemente. Las texturas que aún muestra un
+widget siguen vivas en ese widget; solo dejan de estar en el caché.
+
+    shared_cache.request(path, lambda texture: ...)   # inmediato si está
+    print(shared_cache.report())
+
+La decodificación la hace ``loader(ruta, on_done)``; por defecto el Loader
+de Kivy, que decodifica en hilos y sube la textura en el hilo principal.
+"""
+from collections import OrderedDict
+
+DEFAULT_BUDGET = 96 * 1024 * 1024
+
+
+def texture_bytes(texture):
+    width, height = texture.size
+    return int(width) * int(height) * 4
+
+
+def kivy_loader(source, on_done):
+    from kivy.loader import Loader
+
+    def texture_of(proxy):
+        # Si la lectura falla el Loader entrega su imagen de error
+        return None if proxy.image is Loader.error_image else proxy.image.texture
+
+    proxy = Loader.image(source)
+    if proxy.loaded:
+        on_done(texture_of(proxy))
+        return None
+    proxy.bind(on_load=lambda p: on_done(texture_of(p)))
+    # El proxy debe vivir hasta que termine la carga
+    return proxy
+
+
+class TextureCache:
+    def __init__(self, budget_bytes=DEFAULT_BUDGET, loader=None):
+        self.budget = budget_bytes
+        self.loader = loader or kivy_loader
+        self._textures = OrderedDict()  # ruta -> (textura, bytes), del más antiguo al más reciente
+        self._waiting = {}  # ruta -> callbacks de cargas en curso
+        self._proxies = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._textures)
+
+    def __contains__(self, source):
+        return source in self._textures
+
+    def get(self, source):
+        """Textura de source si está en el caché (cuenta acierto o fallo)."""
+        entry = self._textures.get(source)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._textures.move_to_end(source)
+        return entry[0]
+
+    def request(self, source, callback):
+        """Llama a callback(textura) ahora si está en caché, o al cargarla.
+
+        Varias peticiones de la misma ruta mientras carga comparten una sola
+        lectura. Si la imagen no se puede leer, callback recibe None.
+        """
+        texture = self.get(source)
+        if texture is not None:
+            callback(texture)
+            return True
+        waiting = self._waiting.get(source)
+        if waiting is not None:
+            waiting.append(callback)
+            return False
+        self._waiting[source] = [callback]
+        proxy = self.loader(source, lambda texture: self._loaded(source, texture))
+        if proxy is not None and source in self._waiting:
+            self._proxies[source] = proxy
+        return False
+
+    def put(self, source, texture):
+        size = texture_bytes(texture)
+        old = self._textures.pop(source, None)
+        if old is not None:
+            self.bytes -= old[1]
+        self._textures[source] = (texture, size)
+        self.bytes += size
+        self.trim(self.budget)
+
+    def discard(self, source):
+        entry = self._textures.pop(source, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+
+    def trim(self, max_bytes):
+        """Descarta las menos usadas hasta ocupar a lo más max_bytes.
+
+        La recién agregada se conserva aunque sola supere el presupuesto.
+        """
+        while self.bytes > max_bytes and len(self._textures) > 1:
+            _, (_, size) = self._textures.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+        if max_bytes <= 0 and self._textures:
+            self.evictions += len(self._textures)
+            self._textures.clear()
+            self.bytes = 0
+
+    def clear(self):
+        self.trim(0)
+
+    def _loaded(self, source, texture):
+        self._proxies.pop(source, None)
+        if texture is not None:
+            self.put(source, texture)
+        for callback in self._waiting.pop(source, []):
+            callback(texture)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'items': len(self._textures),
+            'bytes': self.bytes,
+            'budget': self.budget,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+    def report(self):
+        s = self.stats()
+        mb = 1024 * 1024
+        return (
+            f"Texturas: {s['items']} en caché, {s['bytes'] / mb:.1f} de {s['budget'] / mb:.0f} MB, "
+            f"{s['hits']} aciertos, {s['misses']} fallos ({s['hit_rate']:.0%}), "
+            f"{s['evictions']} descartadas"
+        )
+
+
+# Caché único del proceso (ver widgets/cached_image.py)
+shared_cache = TextureCache()
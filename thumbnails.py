@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Miniaturas de las imágenes de las historias.
+
+Al publicar, un hilo de fondo genera para cada imagen tres derivados de
+tamaño fijo (lado mayor en píxeles) y los registra en su fila de
+``story_images``. Cada vista pide con ``pick_source`` el más chico que
+cubra el espacio donde se dibuja, en vez de decodificar la foto original:
+
+    source = pick_source(story['image_variants'][0], dp(100))
+
+Los derivados quedan junto al original (``<hash>.grid.jpg``), así que una
+imagen repetida en el MediaStore comparte también sus miniaturas. Sin
+Pillow no se generan y las vistas usan el original.
+"""
+import os
+import queue
+import tempfile
+import threading
+
+try:
+    from PIL import Image, ImageOps  # opcional; sin Pillow se usa el original
+    HAS_PIL = True
+except Exception:
+    Image = ImageOps = None
+    HAS_PIL = False
+
+_STOP = object()
+
+# (nombre, lado mayor en px), de menor a mayor
+VARIANTS = (
+    ('grid', 640),
+    ('carousel', 1440),
+    ('full', 2560),
+)
+
+
+def variant_path(path, name, ext='.jpg'):
+    return f'{os.path.splitext(path)[0]}.{name}{ext}'
+
+
+def image_variants(story):
+    """Imágenes de una historia con sus miniaturas, aunque no las traiga."""
+    return story.get('image_variants') or [{'path': path} for path in story.get('images') or []]
+
+
+def pick_source(image, px):
+    """Ruta del derivado más chico cuyo lado mayor cubre px píxeles.
+
+    Si ese derivado no existe (la imagen original ya es más chica, o aún
+    no se genera) se usa el original.
+    """
+    for name, size in VARIANTS:
+        if px <= size:
+            return image.get(name) or image['path']
+    return image.get('full') or image['path']
+
+
+def make_thumbnails(path):
+    """Genera los derivados de path. Devuelve (ancho, alto, {nombre: ruta}).
+
+    Solo se generan los tamaños menores que el original; un derivado que
+    ya existe en disco no se vuelve a generar.
+    """
+    with Image.open(path) as original:
+        image = ImageOps.exif_transpose(original)
+        width, height = image.size
+        has_alpha = image.mode in ('RGBA', 'LA', 'P')
+        ext = '.png' if has_alpha else '.jpg'
+        variants = {}
+        for name, size in reversed(VARIANTS):
+            if max(width, height) <= size:
+                continue
+            dest = variant_path(path, name, ext)
+            if not os.path.exists(dest):
+                # exif_transpose devuelve una copia: cada tamaño se reduce
+                # desde el anterior (más grande), no desde el original
+                image.thumbnail((size, size), Image.LANCZOS)
+                _save(image, dest, has_alpha)
+            variants[name] = dest
+    return width, height, variants
+
+
+def _save(image, dest, has_alpha):
+    # Temporal + rename: un lector nunca ve un archivo a medio escribir
+    fd, tmp_path = tempfile.mkstemp(prefix='.thumb-', dir=os.path.dirname(dest))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            if has_alpha:
+                image.save(f, 'PNG', optimize=True)
+            else:
+                image.convert('RGB').save(f, 'JPEG', quality=85, optimize=True)
+        os.replace(tmp_path, dest)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class ThumbnailWorker:
+    """Hilo que genera las miniaturas de las historias recién publicadas.
+
+        worker = ThumbnailWorker(db)
+        worker.submit(story_id)
+        ...
+        worker.close()
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._queue = queue.Queue()
+        self._thread = None
+        if HAS_PIL:
+            self._thread = threading.Thread(target=self._run, name='thumbnails', daemon=True)
+            self._thread.start()
+
+    def submit(self, story_id=None):
+        """Encola las imágenes sin miniaturas de story_id (None: todas)."""
+        if self._thread is not None:
+            self._queue.put(story_id)
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    def join(self):
+        """Espera a que se procese lo encolado hasta ahora (para pruebas)."""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                self.process(item)
+            finally:
+                self._queue.task_done()
+
+    def process(self, story_id=None):
+        for row in self.db.get_pending_images(story_id):
+            try:
+                width, height, variants = make_thumbnails(row['path'])
+            except Exception as e:
+                print(f"Error generando miniaturas de {row['path']}: {e}")
+                # Ancho 0: imagen ilegible, no se vuelve a intentar
+                width, height, variants = 0, 0, {}
+            self.db.set_image_variants(row['id'], width, height, variants)
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""Compara los perfiles de almacenamiento en get_all_stories y add_like.
+
+Para cada perfil crea una base temporal con N historias y mide:
+  - get_all_stories(limit=20): lecturas repetidas del feed
+  - add_like: likes individuales, cada uno con su propio commit
+
+Uso:
+    python tools/bench_storage_profiles.py [historias] [likes]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database, STORAGE_PROFILES
+
+
+def seed(db, stories, users):
+    conn = db.get_connection()
+    with conn:
+        conn.executemany(
+            'INSERT INTO usuarios (username, email, password_hash) VALUES (?, ?, ?)',
+            [(f'usuario{i}', f'usuario{i}@example.com', 'x') for i in range(users)]
+        )
+        conn.executemany(
+            'INSERT INTO historias (user_id, content, location, category) VALUES (?, ?, ?, ?)',
+            [(1 + i % users, f'Historia de prueba número {i} ' * 8, 'Valparaíso', 'Leyenda')
+             for i in range(stories)]
+        )
+
+
+def bench(profile, stories, likes, reads=200):
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, 'bench.db')
+    try:
+        # Se siembra con el perfil por defecto: read-only-guest no puede escribir
+        with Database(path) as db:
+            seed(db, stories, users=likes)
+
+        writable = not STORAGE_PROFILES[profile]['query_only']
+        with Database(path, profile=profile) as db:
+            start = time.perf_counter()
+            for _ in range(reads):
+                db.get_all_stories(limit=20)
+            read_ms = (time.perf_counter() - start) * 1000 / reads
+
+            like_ms = None
+            if writable:
+                start = time.perf_counter()
+                for user_id in range(1, likes + 1):
+                    db.add_like(1 + user_id % stories, user_id)
+                like_ms = (time.perf_counter() - start) * 1000 / likes
+        return read_ms, like_ms
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main():
+    stories = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    likes = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+
+    print(f'{stories} historias, {likes} likes')
+    print(f"{'perfil':<18} {'get_all_stories':>16} {'add_like':>12}")
+    for profile in STORAGE_PROFILES:
+        read_ms, like_ms = bench(profile, stories, likes)
+        like = f'{like_ms:.3f} ms' if like_ms is not None else '(solo lectura)'
+        print(f'{profile:<18} {read_ms:>13.3f} ms {like:>12}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""Genera el atlas de íconos (assets/icons/icons.png + icons.atlas).
+
+Los íconos se dibujan con funciones de distancia (círculos, cápsulas,
+polígonos) y antialias analítico, sin depender de fuentes emoji ni de
+Pillow: el resultado es el mismo en Windows, Linux y Android. Kivy los
+carga como 'atlas://assets/icons/icons/<nombre>' (ver widgets/icons.py).
+
+Uso:
+    python tools/build_icon_atlas.py [tamaño_en_px]
+"""
+import json
+import math
+import os
+import struct
+import sys
+import zlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUTPUT_DIR = os.path.join(ROOT, 'assets', 'icons')
+
+PADDING = 2
+COLUMNS = 4
+
+GOLD = (255, 215, 0)
+RED = (233, 69, 96)
+TEAL = (78, 205, 196)
+FACE = (255, 211, 77)
+DARK = (45, 30, 30)
+WHITE = (250, 250, 250)
+
+
+# --- Funciones de distancia (negativas dentro de la figura) ---
+
+def circle(cx, cy, r):
+    return lambda x, y: math.hypot(x - cx, y - cy) - r
+
+
+def ring(cx, cy, r, width):
+    return lambda x, y: abs(math.hypot(x - cx, y - cy) - r) - width / 2
+
+
+def capsule(ax, ay, bx, by, r):
+    dx, dy = bx - ax, by - ay
+    length2 = dx * dx + dy * dy or 1
+
+    def sdf(x, y):
+        t = max(0.0, min(1.0, ((x - ax) * dx + (y - ay) * dy) / length2))
+        return math.hypot(x - ax - t * dx, y - ay - t * dy) - r
+    return sdf
+
+
+def box(x0, y0, x1, y1, r=0):
+    cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+    hx, hy = (x1 - x0) / 2 - r, (y1 - y0) / 2 - r
+
+    def sdf(x, y):
+        qx, qy = abs(x - cx) - hx, abs(y - cy) - hy
+        outside = math.hypot(max(qx, 0), max(qy, 0))
+        return outside + min(max(qx, qy), 0) - r
+    return sdf
+
+
+def polygon(*points):
+    def sdf(x, y):
+        d = float('inf')
+        inside = False
+        n = len(points)
+        for i in range(n):
+            (ax, ay), (bx, by) = points[i], points[(i + 1) % n]
+            ex, ey = bx - ax, by - ay
+            t = max(0.0, min(1.0, ((x - ax) * ex + (y - ay) * ey) / (ex * ex + ey * ey)))
+            d = min(d, math.hypot(x - ax - t * ex, y - ay - t * ey))
+            if (ay > y) != (by > y) and x < ax + (y - ay) * ex / ey:
+                inside = not inside
+        return -d if inside else d
+    return sdf
+
+
+def union(*shapes):
+    return lambda x, y: min(s(x, y) for s in shapes)
+
+
+def subtract(shape, hole):
+    return lambda x, y: max(shape(x, y), -hole(x, y))
+
+
+def intersect(a, b):
+    return lambda x, y: max(a(x, y), b(x, y))
+
+
+# --- Íconos en un lienzo de 64x64 (y hacia abajo); capas de (forma, color) ---
+
+def face(*features):
+    return [(circle(32, 32, 28), FACE)] + list(features)
+
+
+ICONS = {
+    'heart': [(union(circle(22, 25, 12), circle(42, 25, 12), polygon((11.5, 30), (52.5, 30), (32, 54))), RED)],
+    'fear': face(
+        (circle(22, 26, 7), WHITE), (circle(42, 26, 7), WHITE),
+        (circle(22, 27, 3), DARK), (circle(42, 27, 3), DARK),
+        (box(25, 38, 39, 54, 7), DARK),
+    ),
+    'surprise': face(
+        (circle(22, 25, 4), DARK), (circle(42, 25, 4), DARK),
+        (circle(32, 44, 7), DARK),
+    ),
+    'disbelief': face(
+        (circle(22, 26, 7), WHITE), (circle(42, 26, 7), WHITE),
+        (circle(22, 21.5, 3), DARK), (circle(42, 21.5, 3), DARK),
+        (capsule(22, 46, 42, 46, 2.5), DARK),
+    ),
+    'comment': [(union(box(8, 10, 56, 44, 10), polygon((18, 40), (32, 40), (14, 57))), TEAL)],
+    'pin': [(subtract(union(circle(32, 24, 16), polygon((17.5, 30), (46.5, 30), (32, 59))), circle(32, 24, 6)), GOLD)],
+    'user': [(union(circle(32, 21, 11), intersect(circle(32, 60, 23), box(0, 0, 64, 57))), GOLD)],
+    'home': [(subtract(union(polygon((6, 32), (32, 8), (58, 32)), box(15, 28, 49, 56)), box(27, 40, 37, 57)), GOLD)],
+    'search': [(union(ring(27, 27, 15, 7), capsule(38, 38, 54, 54, 5)), GOLD)],
+    'bell': [(union(circle(32, 29, 15), box(17, 29, 47, 46), box(11, 43, 53, 50, 3),
+                    circle(32, 54, 5.5), circle(32, 13, 4.5)), GOLD)],
+    'plus': [(union(capsule(32, 12, 32, 52, 5), capsule(12, 32, 52, 32, 5)), GOLD)],
+}
+
+
+def render(layers, size):
+    """Devuelve filas RGBA (y hacia abajo) del ícono escalado a size px."""
+    scale = 64.0 / size
+    rows = []
+    for py in range(size):
+        row = bytearray()
+        for px in range(size):
+            x, y = (px + 0.5) * scale, (py + 0.5) * scale
+            r = g = b = a = 0.0
+            for shape, color in layers:
+                # Antialias: cobertura según la distancia en píxeles al borde
+                coverage = max(0.0, min(1.0, 0.5 - shape(x, y) / scale))
+                if coverage <= 0:
+                    continue
+                out = coverage + a * (1 - coverage)
+                r = (color[0] * coverage + r * a * (1 - coverage)) / out
+                g = (color[1] * coverage + g * a * (1 - coverage)) / out
+                b = (color[2] * coverage + b * a * (1 - coverage)) / out
+                a = out
+            row += bytes((int(r + 0.5), int(g + 0.5), int(b + 0.5), int(a * 255 + 0.5)))
+        rows.append(row)
+    return rows
+
+
+def write_png(path, width, height, pixels):
+    """PNG RGBA de 8 bits; pixels es una lista de filas (bytearray)."""
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack('>I', len(data)) + body + struct.pack('>I', zlib.crc32(body) & 0xffffffff)
+
+    raw = b''.join(b'\x00' + bytes(row) for row in pixels)
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(raw, 9)))
+        f.write(chunk(b'IEND', b''))
+
+
+def build(size=64, output_dir=OUTPUT_DIR):
+    names = sorted(ICONS)
+    cell = size + 2 * PADDING
+    rows_count = math.ceil(len(names) / COLUMNS)
+    width, height = COLUMNS * cell, rows_count * cell
+    pixels = [bytearray(width * 4) for _ in range(height)]
+    regions = {}
+
+    for i, name in enumerate(names):
+        col, row = i % COLUMNS, i // COLUMNS
+        x0, y0 = col * cell + PADDING, row * cell + PADDING
+        for dy, icon_row in enumerate(render(ICONS[name], size)):
+            pixels[y0 + dy][x0 * 4:(x0 + size) * 4] = icon_row
+        # Kivy mide y desde abajo de la imagen
+        regions[name] = [x0, height - y0 - size, size, size]
+
+    os.makedirs(output_dir, exist_ok=True)
+    write_png(os.path.join(output_dir, 'icons.png'), width, height, pixels)
+    with open(os.path.join(output_dir, 'icons.atlas'), 'w') as f:
+        json.dump({'icons.png': regions}, f, indent=1, sort_keys=True)
+    return names
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    names = build(size)
+    print(f"Atlas con {len(names)} íconos de {size}px en {os.path.relpath(OUTPUT_DIR, ROOT)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""Recalcula los contadores de story_stats de una base de datos.
+
+Uso:
+    python tools/rebuild_story_stats.py [ruta/a/paranormal_stories.db]
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+
+
+def main():
+    db_name = sys.argv[1] if len(sys.argv) > 1 else 'paranormal_stories.db'
+    with Database(db_name=db_name) as db:
+        if not db.rebuild_story_stats():
+            return 1
+        count = db.get_connection().execute('SELECT COUNT(*) FROM story_stats').fetchone()[0]
+    print(f'Contadores recalculados para {count} historias en {db_name}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
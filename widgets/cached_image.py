@@ -0,0 +1,29 @@
+from kivy.uix.image import Image
+from kivy.properties import StringProperty
+
+from texture_cache import shared_cache
+
+
+class CachedImage(Image):
+    """Image que obtiene su textura del caché compartido (texture_cache.py).
+
+    Se usa path en lugar de source: una imagen ya vista se muestra en el
+    mismo frame, sin leer el disco ni decodificar de nuevo.
+    """
+
+    path = StringProperty('')
+
+    def __init__(self, cache=None, **kwargs):
+        self.cache = cache or shared_cache
+        super().__init__(**kwargs)
+
+    def on_path(self, instance, path):
+        if not path:
+            self.texture = None
+            return
+        self.cache.request(path, lambda texture: self._show(path, texture))
+
+    def _show(self, path, texture):
+        # Si mientras cargaba se reutilizó el widget para otra imagen, se ignora
+        if path == self.path and texture is not None:
+            self.texture = texture
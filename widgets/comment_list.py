@@ -0,0 +1,137 @@
+import math
+
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.label import Label
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from kivy.graphics import Color, RoundedRectangle
+from kivy.core.window import Window
+from kivy.metrics import dp, sp
+
+from widgets.icons import IconLabel
+
+COMMENT_FONT_SIZE = sp(13)
+COMMENT_HEADER_HEIGHT = dp(25)
+
+
+def comment_height(comment, width=None):
+    """Alto estimado de un comentario según las líneas que ocupa su texto.
+
+    Se estima sin crear la textura: el RecycleView necesita el alto de cada
+    fila antes de dibujarla.
+    """
+    width = width or (Window.width - dp(80))
+    chars_per_line = max(int(width / (COMMENT_FONT_SIZE * 0.55)), 1)
+    lines = sum(max(math.ceil(len(line) / chars_per_line), 1)
+                for line in (comment.get('content') or '').split('\n'))
+    text_height = lines * COMMENT_FONT_SIZE * 1.3
+    return COMMENT_HEADER_HEIGHT + text_height + dp(5) + dp(16)
+
+
+class CommentCard(RecycleDataViewBehavior, BoxLayout):
+    """Fila reciclable de la lista de comentarios."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.orientation = 'vertical'
+        self.spacing = dp(5)
+        self.padding = [dp(10), dp(8)]
+
+        with self.canvas.before:
+            Color(0.15, 0.15, 0.2, 1)
+            self.bg = RoundedRectangle(pos=self.pos, size=self.size, radius=[dp(8)])
+
+        self.bind(pos=self.update_bg, size=self.update_bg)
+
+        header = BoxLayout(
+            orientation='horizontal',
+            size_hint_y=None,
+            height=COMMENT_HEADER_HEIGHT,
+            spacing=dp(8)
+        )
+        self.author = IconLabel('user', icon_size=dp(14), font_size=sp(12), color=(0.8, 0.8, 0.8, 1), size_hint_x=0.7)
+        self.author.label.bold = True
+        self.date = Label(
+            font_size=sp(10),
+            color=(0.5, 0.5, 0.5, 1),
+            size_hint_x=0.3,
+            halign='right',
+            valign='middle'
+        )
+        self.date.bind(size=self.date.setter('text_size'))
+        header.add_widget(self.author)
+        header.add_widget(self.date)
+
+        self.content = Label(
+            font_size=COMMENT_FONT_SIZE,
+            color=(0.9, 0.9, 0.9, 1),
+            halign='left',
+            valign='top'
+        )
+        self.content.bind(size=self.content.setter('text_size'))
+
+        self.add_widget(header)
+        self.add_widget(self.content)
+
+    def refresh_view_attrs(self, rv, index, data):
+        # Sin super(): copiaría cada clave de data como atributo y la clave
+        # 'content' reemplazaría al Label self.content
+        self.author.text = data.get('username') or 'Usuario'
+        self.date.text = data.get('created_at') or ''
+        self.content.text = data.get('content') or ''
+
+    def update_bg(self, *args):
+        self.bg.pos = self.pos
+        self.bg.size = self.size
+
+
+class CommentList(RecycleView):
+    """Lista virtualizada de comentarios, del más nuevo al más antiguo.
+
+    on_near_end() se llama al acercarse al final para pedir la página
+    siguiente; add_comment agrega arriba uno recién publicado.
+    """
+
+    def __init__(self, prefetch_distance=None, **kwargs):
+        super().__init__(**kwargs)
+        self.prefetch_distance = prefetch_distance if prefetch_distance is not None else dp(400)
+        self.on_near_end = None
+
+        self.viewclass = CommentCard
+        layout = RecycleBoxLayout(
+            orientation='vertical',
+            size_hint_y=None,
+            default_size=(None, dp(80)),
+            default_size_hint=(1, None),
+            key_size='height',
+            spacing=dp(8),
+            padding=[0, dp(4)]
+        )
+        layout.bind(minimum_height=layout.setter('height'))
+        layout.bind(height=self._check_end)
+        self.add_widget(layout)
+        self.bind(scroll_y=self._check_end, height=self._check_end)
+
+    def set_comments(self, comments):
+        self.data = [self._item(comment) for comment in comments]
+        self.scroll_y = 1
+
+    def append_comments(self, comments):
+        self.data.extend(self._item(comment) for comment in comments)
+
+    def add_comment(self, comment):
+        """Inserta un comentario nuevo arriba sin recargar la lista."""
+        self.data.insert(0, self._item(comment))
+        self.scroll_y = 1
+
+    def _item(self, comment):
+        comment['height'] = comment_height(comment)
+        return comment
+
+    def _check_end(self, *args):
+        if not self.data or not self.on_near_end:
+            return
+        scrollable = max(self.layout_manager.height - self.height, 0)
+        if self.scroll_y * scrollable < self.prefetch_distance:
+            self.on_near_end()
@@ -0,0 +1,97 @@
+import os
+
+from kivy.uix.behaviors import ButtonBehavior
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.image import Image
+from kivy.uix.label import Label
+from kivy.properties import ListProperty, StringProperty
+from kivy.graphics import Color, Rectangle
+from kivy.metrics import dp, sp
+
+# Atlas generado por tools/build_icon_atlas.py
+ATLAS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'assets', 'icons', 'icons')
+
+# Ícono que corresponde a cada tipo de reacción
+REACTION_ICONS = {
+    'miedo': 'fear',
+    'sorpresa': 'surprise',
+    'incredulidad': 'disbelief',
+}
+
+
+def icon_source(name):
+    return f'atlas://{ATLAS}/{name}'
+
+
+class Icon(Image):
+    """Ícono del atlas. Todas las instancias comparten la misma textura."""
+
+    def __init__(self, name, size=dp(18), **kwargs):
+        super().__init__(
+            source=icon_source(name),
+            size_hint=(None, None),
+            size=(size, size),
+            allow_stretch=True,
+            keep_ratio=True,
+            **kwargs
+        )
+
+    def set_icon(self, name):
+        self.source = icon_source(name)
+
+
+class IconLabel(BoxLayout):
+    """Ícono seguido de un texto corto (ubicación, autor, contador)."""
+
+    text = StringProperty('')
+
+    def __init__(self, icon, icon_size=dp(16), font_size=sp(12), color=(0.9, 0.9, 0.9, 1), halign='left', **kwargs):
+        super().__init__(orientation='horizontal', spacing=dp(4), **kwargs)
+        self.icon = Icon(icon, size=icon_size, pos_hint={'center_y': 0.5})
+        self.label = Label(font_size=font_size, color=color, halign=halign, valign='middle', shorten=True)
+        self.label.bind(size=self.label.setter('text_size'))
+        self.bind(text=self.label.setter('text'))
+        self.add_widget(self.icon)
+        self.add_widget(self.label)
+
+
+class IconButton(ButtonBehavior, BoxLayout):
+    """Botón con ícono del atlas y un texto (p. ej. el contador de likes).
+
+    vertical=True pone el texto bajo el ícono, como en la barra de
+    navegación. El texto admite markup.
+    """
+
+    text = StringProperty('')
+    background_color = ListProperty([0, 0, 0, 0])
+
+    def __init__(self, icon, vertical=False, icon_size=dp(20), font_size=sp(13), color=(1, 1, 1, 1), **kwargs):
+        super().__init__(
+            orientation='vertical' if vertical else 'horizontal',
+            padding=[dp(4), dp(4)],
+            spacing=dp(2) if vertical else dp(6),
+            **kwargs
+        )
+        with self.canvas.before:
+            self._bg_color = Color(*self.background_color)
+            self._bg = Rectangle(pos=self.pos, size=self.size)
+        self.bind(pos=self._update_bg, size=self._update_bg, background_color=self._update_bg)
+
+        self.icon = Icon(icon, size=icon_size, pos_hint={'center_x': 0.5, 'center_y': 0.5})
+        self.label = Label(
+            font_size=font_size,
+            color=color,
+            markup=True,
+            halign='center' if vertical else 'left',
+            valign='middle'
+        )
+        self.label.bind(size=self.label.setter('text_size'))
+        self.bind(text=self.label.setter('text'))
+
+        self.add_widget(self.icon)
+        self.add_widget(self.label)
+
+    def _update_bg(self, *args):
+        self._bg_color.rgba = self.background_color
+        self._bg.pos = self.pos
+        self._bg.size = self.size
@@ -0,0 +1,104 @@
+import time
+
+from kivy.clock import Clock
+from kivy.uix.widget import Widget
+from kivy.graphics import Color, RoundedRectangle
+from kivy.metrics import dp
+
+
+class Placeholder(Widget):
+    """Hueco con la forma de la tarjeta mientras se construye la real."""
+
+    def __init__(self, height, **kwargs):
+        super().__init__(size_hint_y=None, height=height, **kwargs)
+        with self.canvas:
+            Color(0.12, 0.12, 0.17, 0.6)
+            self.bg = RoundedRectangle(pos=self.pos, size=self.size, radius=[dp(15)])
+        self.bind(pos=self.update_bg, size=self.update_bg)
+
+    def update_bg(self, *args):
+        self.bg.pos = self.pos
+        self.bg.size = self.size
+
+
+class IncrementalBuilder:
+    """Construye los elementos de una lista repartidos en varios frames.
+
+    add() pone de inmediato un Placeholder por elemento (el alto de la lista
+    y el scroll no saltan) y cada frame construye tarjetas reales hasta
+    gastar budget_ms; al terminar llama a on_done(reporte) con la cantidad
+    de elementos, frames y milisegundos que tomó.
+
+        builder = IncrementalBuilder(self.results_layout, name='search')
+        builder.add(stories, lambda story: StoryCard(story), dp(240))
+    """
+
+    def __init__(self, container, budget_ms=8, name='', on_done=None):
+        self.container = container
+        self.budget = budget_ms / 1000.0
+        self.name = name
+        self.on_done = on_done
+        self._queue = []  # (placeholder, item, factory)
+        self._event = None
+        self._frames = 0
+        self._items = 0
+        self._build_time = 0.0
+
+    @property
+    def pending(self):
+        return len(self._queue)
+
+    def add(self, items, factory, placeholder_height):
+        for item in items:
+            placeholder = Placeholder(placeholder_height)
+            self.container.add_widget(placeholder)
+            self._queue.append((placeholder, item, factory))
+            self._items += 1
+        if self._queue and self._event is None:
+            self._event = Clock.schedule_once(self._step, 0)
+
+    def cancel(self):
+        """Descarta lo pendiente (p. ej. al limpiar la lista)."""
+        if self._event is not None:
+            self._event.cancel()
+            self._event = None
+        self._queue = []
+        self._frames = 0
+        self._items = 0
+        self._build_time = 0.0
+
+    def _step(self, dt):
+        self._event = None
+        self._frames += 1
+        start = time.perf_counter()
+        # Siempre al menos una tarjeta por frame, aunque sola exceda el presupuesto
+        while self._queue:
+            placeholder, item, factory = self._queue.pop(0)
+            self._replace(placeholder, factory(item))
+            if time.perf_counter() - start >= self.budget:
+                break
+        self._build_time += time.perf_counter() - start
+
+        if self._queue:
+            self._event = Clock.schedule_once(self._step, 0)
+        else:
+            report = {
+                'name': self.name,
+                'items': self._items,
+                'frames': self._frames,
+                'ms': round(self._build_time * 1000, 1),
+            }
+            self._frames = 0
+            self._items = 0
+            self._build_time = 0.0
+            if self.on_done:
+                self.on_done(report)
+
+    def _replace(self, placeholder, widget):
+        children = self.container.children
+        if placeholder not in children:
+            # La lista se limpió mientras tanto
+            return
+        index = children.index(placeholder)
+        self.container.remove_widget(placeholder)
+        self.container.add_widget(widget, index=index)
@@ -0,0 +1,69 @@
+from kivy.uix.carousel import Carousel
+from kivy.graphics import Color, Rectangle
+
+from widgets.cached_image import CachedImage
+
+
+class LazySlide(CachedImage):
+    """Diapositiva que solo tiene textura mientras está cerca de la actual.
+
+    Mientras tanto se dibuja un fondo plano en lugar de la imagen.
+    """
+
+    def __init__(self, source, **kwargs):
+        super().__init__(allow_stretch=True, keep_ratio=True, **kwargs)
+        self.source_path = source
+        with self.canvas.before:
+            Color(0.12, 0.12, 0.17, 1)
+            self.bg = Rectangle(pos=self.pos, size=self.size)
+        self.bind(pos=self.update_bg, size=self.update_bg)
+
+    def load(self):
+        self.path = self.source_path
+
+    def release(self):
+        self.path = ''
+
+    def update_bg(self, *args):
+        self.bg.pos = self.pos
+        self.bg.size = self.size
+
+
+class LazyCarousel(Carousel):
+    """Carousel que decodifica solo la diapositiva actual y sus vecinas.
+
+    Al cambiar de diapositiva se cargan las que quedan a distancia
+    ``keep`` o menos y se sueltan las demás; abrir una historia con muchas
+    imágenes cuesta lo mismo que abrir una con tres.
+
+        carousel = LazyCarousel(rutas, loop=True, size_hint_y=None, height=dp(260))
+    """
+
+    def __init__(self, sources=(), keep=1, **kwargs):
+        super().__init__(**kwargs)
+        self.keep = keep
+        self.bind(index=self.update_slides)
+        self.set_sources(sources)
+
+    def set_sources(self, sources):
+        self.clear_widgets()
+        for source in sources:
+            self.add_widget(LazySlide(source))
+        self.update_slides()
+
+    def loaded_indices(self):
+        return [i for i, slide in enumerate(self.slides) if slide.path]
+
+    def update_slides(self, *args):
+        count = len(self.slides)
+        if not count:
+            return
+        current = self.index or 0
+        for i, slide in enumerate(self.slides):
+            distance = abs(i - current)
+            if self.loop:
+                distance = min(distance, count - distance)
+            if distance <= self.keep:
+                slide.load()
+            else:
+                slide.release()
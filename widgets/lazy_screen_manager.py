@@ -0,0 +1,97 @@
+from collections import OrderedDict
+
+from kivy.uix.screenmanager import ScreenManager, ScreenManagerException
+
+
+class LazyScreenManager(ScreenManager):
+    """ScreenManager que construye cada pantalla la primera vez que se usa.
+
+    Las pantallas se registran con una fábrica (normalmente la clase) y solo
+    se instancian al navegar a ellas o al pedirlas con get_screen. Con más de
+    max_screens construidas se descarta la usada hace más tiempo, salvo las
+    fijas (pinned) y la actual; trim() descarta todas las que se pueda ante
+    falta de memoria.
+
+    Eventos:
+        on_screen_built(screen): recién construida y agregada.
+        on_screen_evicted(screen): quitada del manager; liberar recursos.
+    """
+
+    __events__ = ('on_screen_built', 'on_screen_evicted')
+
+    def __init__(self, max_screens=6, pinned=(), **kwargs):
+        super().__init__(**kwargs)
+        self.max_screens = max_screens
+        self.pinned = set(pinned)
+        self._factories = {}
+        self._recent = OrderedDict()  # nombre -> None, de menos a más reciente
+
+    def register(self, name, factory, pinned=False):
+        self._factories[name] = factory
+        if pinned:
+            self.pinned.add(name)
+
+    def is_built(self, name):
+        return super().has_screen(name)
+
+    def has_screen(self, name):
+        return name in self._factories or super().has_screen(name)
+
+    def get_screen(self, name):
+        if not super().has_screen(name):
+            if name not in self._factories:
+                raise ScreenManagerException(f'No Screen with name "{name}".')
+            self._build(name)
+        return super().get_screen(name)
+
+    def _build(self, name):
+        screen = self._factories[name](name=name)
+        self.add_widget(screen)
+        self.dispatch('on_screen_built', screen)
+        return screen
+
+    def on_current(self, instance, value):
+        if value:
+            # get_screen construye la pantalla si todavía no existe
+            self.get_screen(value)
+            self._recent.pop(value, None)
+            self._recent[value] = None
+        super().on_current(instance, value)
+        self._trim(self.max_screens)
+
+    def evict(self, name):
+        """Quita una pantalla construida. Devuelve False si no se puede."""
+        if name == self.current or name not in self._factories or not self.is_built(name):
+            return False
+        screen = super().get_screen(name)
+        if screen.parent is not None:
+            # Sigue en pantalla (p. ej. saliendo en una transición)
+            return False
+        self.remove_widget(screen)
+        self._recent.pop(name, None)
+        self.dispatch('on_screen_evicted', screen)
+        return True
+
+    def trim(self):
+        """Descarta todas las pantallas que no sean fijas ni la actual."""
+        return self._trim(0)
+
+    def _trim(self, limit):
+        evicted = []
+        order = list(self._recent)
+        candidates = [s.name for s in self.screens
+                      if s.name not in self.pinned and s.name != self.current]
+        # Primero las que nunca se mostraron, luego de la menos reciente
+        candidates.sort(key=lambda n: order.index(n) if n in order else -1)
+        for name in candidates:
+            if len(self.screens) <= limit:
+                break
+            if self.evict(name):
+                evicted.append(name)
+        return evicted
+
+    def on_screen_built(self, screen):
+        pass
+
+    def on_screen_evicted(self, screen):
+        pass
@@ -1,8 +1,8 @@
 from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.button import Button
 from kivy.graphics import Color, Rectangle
 from kivy.metrics import dp, sp
-from kivy.core.text import LabelBase
+
+from widgets.icons import IconButton
 
 
 class NavBar(BoxLayout):
@@ -12,6 +12,8 @@ class NavBar(BoxLayout):
         self.size_hint = (1, None)
         self.height = dp(80)  # Aumentado de 65 a 80
         self.screen_manager = None
+        self.buttons = {}
+        self.unread = 0
         self.spacing = 0
         self.padding = [0, 0, 0, 0]
 
@@ -29,28 +31,34 @@ class NavBar(BoxLayout):
 
     def create_nav_buttons(self):
         buttons = [
-            ('[color=#FFD700]🏠[/color]\nInicio', 'feed'),
-            ('[color=#FFD700]🔍[/color]\nBuscar', 'search'),
-            ('[color=#FFD700]🔔[/color]\nNotificaciones', 'notifications'),
-            ('[color=#FFD700]+[/color]\nCrear', 'create'),
-            ('[color=#FFD700]👤[/color]\nPerfil', 'profile')
+            ('home', 'Inicio', 'feed'),
+            ('search', 'Buscar', 'search'),
+            ('bell', 'Notificaciones', 'notifications'),
+            ('plus', 'Crear', 'create'),
+            ('user', 'Perfil', 'profile')
         ]
 
-        for text, screen_name in buttons:
-            btn = Button(
-                text=text,
-                background_color=(0, 0, 0, 0),
-                background_normal='',
-                color=(0.7, 0.7, 0.7, 1),
-                font_size=sp(16),  # Aumentado de 11 a 16
-                halign='center',
-                valign='middle',
-                markup=True,
-                font_name='EmojiFont' if 'EmojiFont' in LabelBase._fonts else 'SegoeUIEmoji' if 'SegoeUIEmoji' in LabelBase._fonts else None
+        for icon, caption, screen_name in buttons:
+            btn = IconButton(
+                icon,
+                vertical=True,
+                icon_size=dp(28),
+                font_size=sp(12),
+                color=(0.7, 0.7, 0.7, 1)
             )
+            btn.text = caption
             btn.bind(on_press=lambda x, s=screen_name: self.change_screen(s))
+            self.buttons[screen_name] = btn
             self.add_widget(btn)
 
+    def set_unread(self, count):
+        """Muestra junto a la campana la cantidad de notificaciones no leídas"""
+        if count == self.unread:
+            return
+        self.unread = count
+        badge = f' [color=#FF4444]{count if count < 100 else "99+"}[/color]' if count else ''
+        self.buttons['notifications'].text = f'Notificaciones{badge}'
+
     def set_screen_manager(self, screen_manager):
         self.screen_manager = screen_manager
 
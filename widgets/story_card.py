@@ -1,12 +1,43 @@
 from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.button import Button
 from kivy.uix.label import Label
-from kivy.uix.image import AsyncImage
 from kivy.uix.gridlayout import GridLayout
-from kivy.core.text import LabelBase
 from kivy.graphics import Color, RoundedRectangle
 from kivy.core.window import Window
 from kivy.metrics import dp, sp
+from kivy.utils import escape_markup
+
+from widgets.icons import IconButton, IconLabel
+from widgets.cached_image import CachedImage
+from thumbnails import image_variants, pick_source
+
+# Mismos marcadores que Database.search_stories usa en 'snippet'
+SNIPPET_START = '\x02'
+SNIPPET_END = '\x03'
+
+
+def card_content_text(story):
+    """Texto que muestra una tarjeta y si usa markup.
+
+    Resultados de búsqueda: el fragmento con las coincidencias resaltadas.
+    Listas: el preview de la base. Si solo hay contenido, se recorta aquí.
+    """
+    snippet = story.get('snippet')
+    if snippet:
+        text = escape_markup(snippet)
+        text = text.replace(SNIPPET_START, '[b][color=#FFD700]')
+        text = text.replace(SNIPPET_END, '[/color][/b]')
+        return text, True
+    if story.get('preview') is not None:
+        return story['preview'], False
+    text = story.get('content', '')
+    if len(text) > 180:
+        text = text[:180] + '...'
+    return text, False
+
+
+def grid_tile_px():
+    """Lado mayor, en píxeles, de una celda de la grilla de imágenes."""
+    return max((Window.width - dp(50)) / 2, dp(100))
 
 
 class StoryCard(BoxLayout):
@@ -30,51 +61,21 @@ class StoryCard(BoxLayout):
 
         self.header = BoxLayout(size_hint_y=None, height=dp(35), spacing=dp(8))
 
-        username_text = story.get('username', 'Anónimo') if not story.get('is_anonymous') else '[color=#FFD700]👤[/color] Anónimo'
-        username = Label(
-            text=username_text,
-            font_size=sp(14),
-            bold=True,
-            color=(0.9, 0.9, 0.9, 1),
-            size_hint_x=0.5,
-            halign='left',
-            valign='middle',
-            markup=True,
-            font_name='EmojiFont' if 'EmojiFont' in LabelBase._fonts else 'SegoeUIEmoji' if 'SegoeUIEmoji' in LabelBase._fonts else None
-        )
-        username.bind(size=username.setter('text_size'))
-
-        category = Label(
-            text=f"[color=#FFD700]📍[/color] {story.get('category', 'Aparición')}",
-            font_size=sp(11),
-            color=(0.7, 0.7, 0.7, 1),
-            size_hint_x=0.5,
-            halign='right',
-            valign='middle',
-            markup=True,
-            font_name='EmojiFont' if 'EmojiFont' in LabelBase._fonts else 'SegoeUIEmoji' if 'SegoeUIEmoji' in LabelBase._fonts else None
-        )
-        category.bind(size=category.setter('text_size'))
+        # Íconos del atlas junto a textos simples: sin markup ni fuente emoji
+        username = IconLabel('user', font_size=sp(14), color=(0.9, 0.9, 0.9, 1), size_hint_x=0.5)
+        username.label.bold = True
+        username.text = (story.get('username') or 'Anónimo') if not story.get('is_anonymous') else 'Anónimo'
+
+        category = IconLabel('pin', icon_size=dp(14), font_size=sp(11), color=(0.7, 0.7, 0.7, 1), halign='right', size_hint_x=0.5)
+        category.text = story.get('category', 'Aparición')
 
         self.header.add_widget(username)
         self.header.add_widget(category)
 
-        self.location = Label(
-            text=f"[color=#FFD700]📍[/color] {story.get('location', 'Sin ubicación')}",
-            font_size=sp(12),
-            color=(0.6, 0.6, 0.7, 1),
-            size_hint_y=None,
-            height=dp(25),
-            halign='left',
-            valign='middle',
-            markup=True,
-            font_name='EmojiFont' if 'EmojiFont' in LabelBase._fonts else 'SegoeUIEmoji' if 'SegoeUIEmoji' in LabelBase._fonts else None
-        )
-        self.location.bind(size=self.location.setter('text_size'))
+        self.location = IconLabel('pin', font_size=sp(12), color=(0.6, 0.6, 0.7, 1), size_hint_y=None, height=dp(25))
+        self.location.text = story.get('location') or 'Sin ubicación'
 
-        content_text = story.get('content', '')
-        if len(content_text) > 180:
-            content_text = content_text[:180] + '...'
+        content_text, markup = card_content_text(story)
 
         self.content = Label(
             text=content_text,
@@ -84,85 +85,47 @@ class StoryCard(BoxLayout):
             height=dp(90),
             text_size=(Window.width - dp(50), None),
             halign='left',
-            valign='top'
+            valign='top',
+            markup=markup
         )
 
         # Imágenes (hasta 4) en grilla 2x2 si existen
-        images = story.get('images') or []
+        images = image_variants(story)
         if images:
             grid = GridLayout(cols=2, size_hint_y=None, spacing=dp(6))
             # altura proporcional: dos filas, cada una ~100dp
             grid.bind(minimum_height=grid.setter('height'))
-            for path in images[:4]:
-                img = AsyncImage(source=path, allow_stretch=True, keep_ratio=True, size_hint_y=None, height=dp(100))
+            tile = grid_tile_px()
+            for image in images[:4]:
+                img = CachedImage(path=pick_source(image, tile), allow_stretch=True, keep_ratio=True, size_hint_y=None, height=dp(100))
                 grid.add_widget(img)
             self.add_widget(grid)
 
         if show_actions:
             actions = BoxLayout(size_hint_y=None, height=dp(45), spacing=dp(5))
 
-            like_btn = Button(
-                text=f"[color=#FFD700]❤️[/color] {story.get('likes', 0)}",
-                size_hint_x=0.25,
-                background_normal='',
-                background_color=(0.3, 0.2, 0.4, 1),
-                color=(1, 1, 1, 1),
-                font_size=sp(12),
-                markup=True,
-                font_name='EmojiFont' if 'EmojiFont' in LabelBase._fonts else 'SegoeUIEmoji' if 'SegoeUIEmoji' in LabelBase._fonts else None
-            )
+            like_btn = IconButton('heart', size_hint_x=0.25, background_color=(0.3, 0.2, 0.4, 1), font_size=sp(12))
+            like_btn.text = str(story.get('likes', 0))
             if self.on_like:
                 like_btn.bind(on_press=lambda x: self.on_like(story))
 
-            comment_btn = Button(
-                text=f"[color=#4ECDC4]💬[/color] Comentar",
-                size_hint_x=0.25,
-                background_normal='',
-                background_color=(0.2, 0.3, 0.4, 1),
-                color=(1, 1, 1, 1),
-                font_size=sp(10),
-                markup=True,
-                font_name='EmojiFont' if 'EmojiFont' in LabelBase._fonts else 'SegoeUIEmoji' if 'SegoeUIEmoji' in LabelBase._fonts else None
-            )
+            comment_btn = IconButton('comment', size_hint_x=0.25, background_color=(0.2, 0.3, 0.4, 1), font_size=sp(10))
+            comment_btn.text = 'Comentar'
             if self.on_comment:
                 comment_btn.bind(on_press=lambda x: self.on_comment(story))
 
-            miedo_btn = Button(
-                text=f"[color=#FF6B6B]😱[/color] {story.get('miedo', 0)}",
-                size_hint_x=0.25,
-                background_normal='',
-                background_color=(0.35, 0.15, 0.25, 1),
-                color=(1, 1, 1, 1),
-                font_size=sp(12),
-                markup=True,
-                font_name='EmojiFont' if 'EmojiFont' in LabelBase._fonts else 'SegoeUIEmoji' if 'SegoeUIEmoji' in LabelBase._fonts else None
-            )
+            miedo_btn = IconButton('fear', size_hint_x=0.25, background_color=(0.35, 0.15, 0.25, 1), font_size=sp(12))
+            miedo_btn.text = str(story.get('miedo', 0))
             if self.on_reaction:
                 miedo_btn.bind(on_press=lambda x: self.on_reaction(story, 'miedo'))
 
-            sorpresa_btn = Button(
-                text=f"[color=#4ECDC4]😮[/color] {story.get('sorpresa', 0)}",
-                size_hint_x=0.25,
-                background_normal='',
-                background_color=(0.25, 0.25, 0.35, 1),
-                color=(1, 1, 1, 1),
-                font_size=sp(12),
-                markup=True,
-                font_name='EmojiFont' if 'EmojiFont' in LabelBase._fonts else 'SegoeUIEmoji' if 'SegoeUIEmoji' in LabelBase._fonts else None
-            )
+            sorpresa_btn = IconButton('surprise', size_hint_x=0.25, background_color=(0.25, 0.25, 0.35, 1), font_size=sp(12))
+            sorpresa_btn.text = str(story.get('sorpresa', 0))
             if self.on_reaction:
                 sorpresa_btn.bind(on_press=lambda x: self.on_reaction(story, 'sorpresa'))
 
-            incredulidad_btn = Button(
-                text=f"[color=#FFE66D]🙄[/color] {story.get('incredulidad', 0)}",
-                size_hint_x=0.25,
-                background_normal='',
-                background_color=(0.3, 0.3, 0.25, 1),
-                color=(1, 1, 1, 1),
-                font_size=sp(12),
-                markup=True,
-                font_name='EmojiFont' if 'EmojiFont' in LabelBase._fonts else 'SegoeUIEmoji' if 'SegoeUIEmoji' in LabelBase._fonts else None
-            )
+            incredulidad_btn = IconButton('disbelief', size_hint_x=0.25, background_color=(0.3, 0.3, 0.25, 1), font_size=sp(12))
+            incredulidad_btn.text = str(story.get('incredulidad', 0))
             if self.on_reaction:
                 incredulidad_btn.bind(on_press=lambda x: self.on_reaction(story, 'incredulidad'))
 
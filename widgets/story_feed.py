@@ -0,0 +1,316 @@
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.label import Label
+from kivy.uix.gridlayout import GridLayout
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from kivy.graphics import Color, RoundedRectangle
+from kivy.core.window import Window
+from kivy.metrics import dp, sp
+
+from widgets.story_card import card_content_text, grid_tile_px
+from thumbnails import image_variants, pick_source
+from widgets.icons import IconButton, IconLabel
+from widgets.cached_image import CachedImage
+
+CARD_HEIGHT = dp(240)
+IMAGE_ROW_HEIGHT = dp(106)  # 100dp de imagen + 6dp de separación
+PRESSED_COLOR = (0.55, 0.3, 0.65, 1)
+
+
+def card_height(story):
+    """Alto de la tarjeta: base más una fila de la grilla cada dos imágenes."""
+    images = story.get('images') or []
+    rows = (min(len(images), 4) + 1) // 2
+    return CARD_HEIGHT + rows * IMAGE_ROW_HEIGHT
+
+
+class FeedCard(RecycleDataViewBehavior, BoxLayout):
+    """Tarjeta reciclable del feed.
+
+    Los widgets se crean una sola vez; al reciclarla, refresh_view_attrs solo
+    cambia textos y fuentes de imagen con los datos de la nueva historia.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.orientation = 'vertical'
+        self.spacing = dp(8)
+        self.padding = [dp(12), dp(12)]
+        self.story = {}
+        self.feed = None
+        self.index = None
+
+        with self.canvas.before:
+            Color(0.12, 0.12, 0.17, 1)
+            self.bg = RoundedRectangle(pos=self.pos, size=self.size, radius=[dp(15)])
+
+        self.bind(pos=self.update_bg, size=self.update_bg)
+
+        # Cuatro imágenes reutilizables; solo se agregan a la grilla las usadas
+        self.grid = GridLayout(cols=2, size_hint_y=None, spacing=dp(6))
+        self.grid.bind(minimum_height=self.grid.setter('height'))
+        self.images = [
+            CachedImage(allow_stretch=True, keep_ratio=True, size_hint_y=None, height=dp(100))
+            for _ in range(4)
+        ]
+
+        # Íconos del atlas junto a textos simples: sin markup ni fuente emoji
+        self.header = BoxLayout(size_hint_y=None, height=dp(35), spacing=dp(8))
+        self.username = IconLabel('user', font_size=sp(14), color=(0.9, 0.9, 0.9, 1), size_hint_x=0.5)
+        self.username.label.bold = True
+        self.category = IconLabel('pin', icon_size=dp(14), font_size=sp(11), color=(0.7, 0.7, 0.7, 1), halign='right', size_hint_x=0.5)
+        self.header.add_widget(self.username)
+        self.header.add_widget(self.category)
+
+        self.location = IconLabel('pin', font_size=sp(12), color=(0.6, 0.6, 0.7, 1), size_hint_y=None, height=dp(25))
+
+        self.content = Label(
+            font_size=sp(13),
+            color=(0.85, 0.85, 0.85, 1),
+            size_hint_y=None,
+            height=dp(90),
+            text_size=(Window.width - dp(50), None),
+            halign='left',
+            valign='top'
+        )
+
+        self.actions = BoxLayout(size_hint_y=None, height=dp(45), spacing=dp(5))
+        self.like_btn = self._action_button('heart', (0.3, 0.2, 0.4, 1), sp(12))
+        self.comment_btn = self._action_button('comment', (0.2, 0.3, 0.4, 1), sp(10))
+        self.comment_btn.text = 'Comentar'
+        self.miedo_btn = self._action_button('fear', (0.35, 0.15, 0.25, 1), sp(12))
+        self.sorpresa_btn = self._action_button('surprise', (0.25, 0.25, 0.35, 1), sp(12))
+        self.incredulidad_btn = self._action_button('disbelief', (0.3, 0.3, 0.25, 1), sp(12))
+
+        # Los callbacks leen self.story al momento del toque: sirven para
+        # cualquier historia que la tarjeta muestre tras reciclarse
+        self.like_btn.bind(on_press=lambda x: self._call('on_like'))
+        self.comment_btn.bind(on_press=lambda x: self._call('on_comment'))
+        self.miedo_btn.bind(on_press=lambda x: self._call('on_reaction', 'miedo'))
+        self.sorpresa_btn.bind(on_press=lambda x: self._call('on_reaction', 'sorpresa'))
+        self.incredulidad_btn.bind(on_press=lambda x: self._call('on_reaction', 'incredulidad'))
+
+        for btn in (self.like_btn, self.comment_btn, self.miedo_btn, self.sorpresa_btn, self.incredulidad_btn):
+            self.actions.add_widget(btn)
+
+        self.date = Label(
+            font_size=sp(10),
+            color=(0.5, 0.5, 0.5, 1),
+            size_hint_y=None,
+            height=dp(20),
+            halign='right',
+            valign='middle'
+        )
+        self.date.bind(size=self.date.setter('text_size'))
+
+        self._shape = None
+
+    def _action_button(self, icon, background, font_size):
+        return IconButton(
+            icon,
+            size_hint_x=0.25,
+            background_color=background,
+            font_size=font_size
+        )
+
+    def _call(self, name, *args):
+        callback = getattr(self.feed, name, None) if self.feed else None
+        if callback:
+            callback(self.story, *args)
+
+    def refresh_view_attrs(self, rv, index, data):
+        self.feed = rv
+        self.index = index
+        self.story = data
+
+        if data.get('is_anonymous'):
+            self.username.text = 'Anónimo'
+        else:
+            self.username.text = data.get('username') or 'Anónimo'
+        self.category.text = data.get('category', 'Aparición')
+        self.location.text = data.get('location') or 'Sin ubicación'
+        self.content.text, self.content.markup = card_content_text(data)
+        self.date.text = data.get('created_at', '')
+        self.refresh_counters(data)
+
+        images = image_variants(data)[:4]
+        self.grid.clear_widgets()
+        tile = grid_tile_px()
+        for img, image in zip(self.images, images):
+            img.path = pick_source(image, tile)
+            self.grid.add_widget(img)
+
+        self._layout_children(bool(images), rv.show_actions)
+        self.height = data.get('height', CARD_HEIGHT)
+
+    def refresh_counters(self, data):
+        self.like_btn.text = str(data.get('likes', 0))
+        self.miedo_btn.text = str(data.get('miedo', 0))
+        self.sorpresa_btn.text = str(data.get('sorpresa', 0))
+        self.incredulidad_btn.text = str(data.get('incredulidad', 0))
+
+        # Estado presionado: like dado o reacción elegida por el usuario
+        self.like_btn.background_color = PRESSED_COLOR if data.get('liked') else (0.3, 0.2, 0.4, 1)
+        reaction = data.get('reaction')
+        self.miedo_btn.background_color = PRESSED_COLOR if reaction == 'miedo' else (0.35, 0.15, 0.25, 1)
+        self.sorpresa_btn.background_color = PRESSED_COLOR if reaction == 'sorpresa' else (0.25, 0.25, 0.35, 1)
+        self.incredulidad_btn.background_color = PRESSED_COLOR if reaction == 'incredulidad' else (0.3, 0.3, 0.25, 1)
+
+    def _layout_children(self, has_images, show_actions):
+        # Solo se rearma el árbol si cambia la forma de la tarjeta
+        shape = (has_images, show_actions)
+        if shape == self._shape:
+            return
+        self._shape = shape
+        self.clear_widgets()
+        if has_images:
+            self.add_widget(self.grid)
+        self.add_widget(self.header)
+        self.add_widget(self.location)
+        self.add_widget(self.content)
+        if show_actions:
+            self.add_widget(self.actions)
+            self.add_widget(self.date)
+
+    def on_touch_down(self, touch):
+        # Tocar el encabezado, la ubicación o el texto abre el detalle
+        for widget in (self.header, self.location, self.content):
+            if widget.parent is self and widget.collide_point(*touch.pos):
+                if self.feed and self.feed.on_open:
+                    self.feed.on_open(self.story)
+                    return True
+        return super().on_touch_down(touch)
+
+    def update_bg(self, *args):
+        self.bg.pos = self.pos
+        self.bg.size = self.size
+
+
+class StoryFeed(RecycleView):
+    """Lista virtualizada de historias.
+
+    Solo las tarjetas visibles existen como widgets; el resto son dicts en
+    self.data. on_like(story), on_reaction(story, tipo), on_comment(story) y
+    on_open(story) se asignan desde la pantalla.
+
+    Scroll infinito: on_near_end() y on_near_start() se llaman cuando faltan
+    menos de prefetch_distance píxeles para llegar al final o al inicio, de
+    modo que la página siguiente llegue antes de que se vea el borde.
+    """
+
+    def __init__(self, show_actions=True, prefetch_distance=None, **kwargs):
+        super().__init__(**kwargs)
+        self.show_actions = show_actions
+        self.prefetch_distance = prefetch_distance if prefetch_distance is not None else 4 * CARD_HEIGHT
+        self.on_like = None
+        self.on_reaction = None
+        self.on_comment = None
+        self.on_open = None
+        self.on_near_end = None
+        self.on_near_start = None
+        self._positions = {}  # id de historia -> índice en self.data
+
+        self.viewclass = FeedCard
+        layout = RecycleBoxLayout(
+            orientation='vertical',
+            size_hint_y=None,
+            default_size=(None, CARD_HEIGHT),
+            default_size_hint=(1, None),
+            key_size='height',
+            spacing=dp(12),
+            padding=[dp(12), dp(12)]
+        )
+        layout.bind(minimum_height=layout.setter('height'))
+        layout.bind(height=self._check_edges)
+        self.add_widget(layout)
+        self.bind(scroll_y=self._check_edges, height=self._check_edges)
+
+    def set_show_actions(self, show_actions):
+        if show_actions != self.show_actions:
+            self.show_actions = show_actions
+            self.refresh_from_data()
+
+    def set_stories(self, stories):
+        self._positions = {}
+        self.data = [self._item(i, story) for i, story in enumerate(stories)]
+
+    def append_stories(self, stories):
+        start = len(self.data)
+        self.data.extend(self._item(start + i, story) for i, story in enumerate(stories))
+
+    def prepend_stories(self, stories):
+        """Agrega historias arriba sin mover lo que el usuario está viendo."""
+        old_height = self._content_height()
+        items = [self._item(i, story) for i, story in enumerate(stories)]
+        added = sum(item['height'] for item in items) + self._spacing() * len(items)
+        # Lista nueva en vez de data[:0] = items: RecycleDataModel no acepta
+        # slices sin límites explícitos al asignar
+        self.data = items + list(self.data)
+        self._reindex()
+        self._keep_position(old_height, added)
+
+    def drop_front(self, count):
+        """Descarta las primeras historias (ya fuera de la vista)."""
+        old_height = self._content_height()
+        removed = sum(item['height'] for item in self.data[:count]) + self._spacing() * count
+        del self.data[:count]
+        self._reindex()
+        self._keep_position(old_height, -removed)
+
+    def drop_back(self, count):
+        """Descarta las últimas historias (ya fuera de la vista)."""
+        if count:
+            del self.data[-count:]
+            self._reindex()
+
+    def update_story(self, story_id, values):
+        """Cambia campos de una historia sin refrescar toda la lista.
+
+        Se modifica el dict en su lugar (no dispara refresh del RecycleView) y,
+        si la tarjeta está visible, solo se actualizan sus contadores.
+        """
+        index = self._positions.get(story_id)
+        if index is None:
+            return False
+        story = self.data[index]
+        story.update(values)
+        view = self.view_adapter.get_visible_view(index)
+        if view is not None:
+            view.refresh_counters(story)
+        return True
+
+    def _item(self, index, story):
+        story['height'] = card_height(story)
+        self._positions[story.get('id')] = index
+        return story
+
+    def _reindex(self):
+        self._positions = {story.get('id'): i for i, story in enumerate(self.data)}
+
+    def _spacing(self):
+        return self.layout_manager.spacing
+
+    def _content_height(self):
+        # Lo mismo que calculará el layout en el próximo frame
+        padding = self.layout_manager.padding
+        heights = sum(item['height'] for item in self.data)
+        return heights + self._spacing() * max(len(self.data) - 1, 0) + padding[1] + padding[3]
+
+    def _keep_position(self, old_height, delta_above):
+        """Ajusta scroll_y tras agregar (o quitar) delta_above píxeles arriba."""
+        old_scrollable = max(old_height - self.height, 0)
+        new_scrollable = max(self._content_height() - self.height, 0)
+        if not new_scrollable:
+            return
+        from_top = (1 - self.scroll_y) * old_scrollable + delta_above
+        self.scroll_y = min(max(1 - from_top / new_scrollable, 0), 1)
+
+    def _check_edges(self, *args):
+        scrollable = max(self.layout_manager.height - self.height, 0) if self.layout_manager else 0
+        if not self.data:
+            return
+        if self.on_near_end and self.scroll_y * scrollable < self.prefetch_distance:
+            self.on_near_end()
+        if self.on_near_start and (1 - self.scroll_y) * scrollable < self.prefetch_distance:
+            self.on_near_start()
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Cola de escrituras con commit agrupado para likes, reacciones y comentarios.
+
+Cada toque del usuario encola la escritura y recibe un Future. Un hilo
+escritor junta las escrituras pendientes y las confirma en una sola
+transacción (un único fsync) cada ``flush_interval`` segundos o al llegar a
+``max_batch`` elementos. Cada elemento va en su propio SAVEPOINT: si uno
+falla, se deshace solo ese y el resto del lote se confirma igual.
+
+    queue = WriteQueue(db)
+    future = queue.add_like(story_id, user_id)
+    future.add_done_callback(...)   # resultado: WriteResult(ok, counters)
+    ...
+    queue.close()                   # vacía lo pendiente antes de salir
+"""
+import queue
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future
+
+# ok: True/False como el método síncrono de Database.
+# counters: contadores de la historia leídos en la misma transacción que
+# confirmó el lote, para actualizar la tarjeta sin recargar nada.
+# row: lo que devolvió la escritura si es una fila (p. ej. el id y la fecha
+# del comentario nuevo); None en likes y reacciones.
+WriteResult = namedtuple('WriteResult', 'ok counters row', defaults=(None,))
+
+
+class WriteQueue:
+    def __init__(self, db, flush_interval=0.05, max_batch=64):
+        self.db = db
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='write-queue', daemon=True)
+        self._thread.start()
+
+    def add_like(self, story_id, user_id):
+        return self._submit(self.db._add_like, (story_id, user_id), sqlite3.IntegrityError)
+
+    def add_reaction(self, story_id, user_id, tipo):
+        return self._submit(self.db._add_reaction, (story_id, user_id, tipo), sqlite3.IntegrityError)
+
+    def add_comment(self, story_id, user_id, content):
+        return self._submit(self.db._add_comment, (story_id, user_id, content), Exception)
+
+    def _submit(self, fn, args, expected_errors):
+        future = Future()
+        with self._close_lock:
+            if self._closed:
+                raise RuntimeError('La cola de escrituras está cerrada')
+            # expected_errors se resuelven como False, igual que los métodos
+            # síncronos de Database
+            self._queue.put((fn, args, expected_errors, future))
+        return future
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stop = self._collect(batch)
+            self._flush(batch)
+            if stop:
+                return
+
+    def _collect(self, batch):
+        """Completa el lote hasta max_batch o hasta que pase flush_interval."""
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                return True
+            batch.append(item)
+        return False
+
+    def _flush(self, batch):
+        conn = self.db.get_connection()
+        results = []
+        try:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            for fn, args, expected_errors, future in batch:
+                cursor.execute('SAVEPOINT write_item')
+                try:
+                    results.append((future, args[0], fn(cursor, *args), None))
+                except expected_errors:
+                    cursor.execute('ROLLBACK TO write_item')
+                    results.append((future, args[0], False, None))
+                except Exception as e:
+                    cursor.execute('ROLLBACK TO write_item')
+                    results.append((future, args[0], None, e))
+                cursor.execute('RELEASE write_item')
+            counters = self.db._story_counters(cursor, [story_id for _f, story_id, _ok, _e in results])
+            conn.commit()
+        except Exception as e:
+            # El commit falló: nada del lote quedó guardado
+            if conn.in_transaction:
+                conn.rollback()
+            print(f"Error al confirmar lote de escrituras: {e}")
+            for _fn, _args, _errors, future in batch:
+                future.set_exception(e)
+            return
+
+        for future, story_id, ok, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                row = ok if isinstance(ok, dict) else None
+                future.set_result(WriteResult(bool(ok), counters[story_id], row))
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def close(self, timeout=None):
+        """Deja de aceptar escrituras y espera a que se confirmen las pendientes."""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join(timeout)